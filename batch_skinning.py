@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮批处理工具 - 在多个mayapy进程中批量绑定蒙皮、导出或导入权重，或增量重建绑定
+
+用法:
+    python batch_skinning.py <任务描述文件> [--mayapy <mayapy路径>] [--workers 8]
+
+任务描述格式见 core/skin_batch.py；中断后重新运行同一命令会跳过已完成的场景。
+"""
+
+import sys
+import argparse
+
+from core.skin_batch import run_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在多个mayapy进程中批量处理蒙皮和绑定场景")
+    parser.add_argument("job", help="任务描述文件（JSON或YAML）")
+    parser.add_argument("--mayapy", help="mayapy路径，默认自动查找")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认为CPU核数")
+    args = parser.parse_args()
+
+    try:
+        summary = run_batch(args.job, args.mayapy, args.workers)
+    except Exception as e:
+        print(f"批处理失败: {str(e)}")
+        return 1
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
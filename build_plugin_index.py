@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件仓库索引生成工具 - 从插件包目录生成仓库索引
+
+用法:
+    python build_plugin_index.py <插件包目录> [--output <输出目录>] [--keep-changes 50]
+"""
+
+import sys
+import argparse
+
+from core.plugin_repository import build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从插件ZIP包目录生成Nexus插件仓库索引")
+    parser.add_argument("packages_dir", help="存放插件ZIP包的目录")
+    parser.add_argument("--output", help="索引输出目录，默认与插件包目录相同")
+    parser.add_argument("--keep-changes", type=int, default=50, help="保留的增量修订数量")
+    args = parser.parse_args()
+
+    try:
+        build_index(args.packages_dir, args.output, args.keep_changes)
+    except Exception as e:
+        print(f"生成仓库索引失败: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+路径工具 - 解析Nexus配置中使用的路径变量
+"""
+
+import os
+
+# Nexus主目录
+NEXUS_HOME = os.environ.get("NEXUS_HOME", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = "${NEXUS_HOME}/cache"
+
+
+def resolve_path(path):
+    """解析路径中的变量"""
+    if not path:
+        return path
+
+    # 替换Nexus特殊变量（先于环境变量，避免NEXUS_HOME未设置时无法展开）
+    path = path.replace("${NEXUS_HOME}", NEXUS_HOME)
+
+    # 替换环境变量
+    path = os.path.expandvars(path)
+
+    return os.path.normpath(path)
+
+
+def get_cache_dir(settings=None, *parts):
+    """获取缓存目录（可选子目录），不存在时自动创建"""
+    settings = settings or {}
+    cache_dir = resolve_path(settings.get("cache_dir") or DEFAULT_CACHE_DIR)
+    path = os.path.join(cache_dir, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_local_data_dir(*parts):
+    """
+    获取当前用户的本地数据目录（可选子目录），不存在时自动创建
+
+    NEXUS_HOME和cache_dir可能位于共享盘上，SQLite等需要本地文件系统的数据放在这里:
+    Windows为 %LOCALAPPDATA%/Nexus，其他系统为 $XDG_DATA_HOME/nexus（默认 ~/.local/share/nexus）
+    """
+    if os.name == "nt":
+        base_dir = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/AppData/Local"), "Nexus")
+    else:
+        base_dir = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "nexus")
+    path = os.path.join(base_dir, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_settings():
+    """读取全局设置（settings.yaml），没有yaml模块（例如Maya中）或读取失败时返回空设置"""
+    try:
+        import yaml
+        with open(os.path.join(NEXUS_HOME, "config", "settings.yaml"), 'r', encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    except Exception:
+        return {}
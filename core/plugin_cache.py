@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件缓存服务 - 每个插件独立命名空间的两级缓存（内存LRU + 磁盘）
+
+磁盘缓存位于当前用户的本地数据目录 plugin_cache/<plugin_id>/，支持单插件和全局容量上限、过期时间、
+原子写入，超出容量时按最近最少使用的顺序淘汰。缓存文件用pickle读取，不能放在共享的cache_dir中:
+其他用户写入的文件可以在读取时执行任意代码，缓存的内容也可能包含用户自己的数据。
+"""
+
+import os
+import time
+import pickle
+import hashlib
+import functools
+import threading
+import collections
+
+from core.nexus_paths import get_local_data_dir
+
+MB = 1024 * 1024
+
+# 缓存文件扩展名
+CACHE_SUFFIX = ".cache"
+
+_MISSING = object()
+
+
+class PluginCache:
+    """单个插件的缓存命名空间"""
+
+    def __init__(self, service, namespace, directory, quota_bytes, memory_items=256, default_ttl=None):
+        self.service = service
+        self.namespace = namespace
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.memory_items = memory_items
+        self.default_ttl = default_ttl
+
+        self._lock = threading.RLock()
+        self._memory = collections.OrderedDict()  # key -> (expires_at, value)
+        self._disk = None  # 文件名 -> [size, last_access]，首次使用时加载
+        self._disk_total = 0
+        self._stats = collections.Counter()
+
+    # ---- 内部方法 ----
+
+    def _file_name(self, key):
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + CACHE_SUFFIX
+
+    def _disk_index(self):
+        """加载磁盘缓存索引（只扫描一次目录）"""
+        if self._disk is None:
+            self._disk = {}
+            os.makedirs(self.directory, exist_ok=True)
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(CACHE_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    self._disk[entry.name] = [stat.st_size, stat.st_mtime]
+                    self._disk_total += stat.st_size
+        return self._disk
+
+    @property
+    def disk_bytes(self):
+        with self._lock:
+            self._disk_index()
+            return self._disk_total
+
+    def _remember(self, key, expires_at, value):
+        """写入内存LRU"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def _remove_file(self, name):
+        size = self._disk_index().pop(name, [0])[0]
+        self._disk_total -= size
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+        return size
+
+    def _evict_disk(self, target_bytes):
+        """按最近最少使用顺序淘汰磁盘缓存，直到不超过target_bytes"""
+        index = self._disk_index()
+        if self._disk_total <= target_bytes:
+            return
+        for name, _ in sorted(index.items(), key=lambda item: item[1][1]):
+            if self._disk_total <= target_bytes:
+                break
+            self._remove_file(name)
+            self._stats["disk_evictions"] += 1
+
+    def _oldest_access(self):
+        """磁盘上最久未使用条目的访问时间（供全局淘汰使用）"""
+        with self._lock:
+            index = self._disk_index()
+            return min((access for _, access in index.values()), default=None)
+
+    def _evict_oldest(self):
+        """淘汰一个最久未使用的磁盘条目，返回释放的字节数"""
+        with self._lock:
+            index = self._disk_index()
+            if not index:
+                return 0
+            name = min(index, key=lambda n: index[n][1])
+            self._stats["disk_evictions"] += 1
+            return self._remove_file(name)
+
+    # ---- 公共接口 ----
+
+    def get(self, key, default=None):
+        """读取缓存，不存在或已过期时返回default"""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key, _MISSING)
+            if item is not _MISSING:
+                expires_at, value = item
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            name = self._file_name(key)
+            index = self._disk_index()
+            if name in index:
+                try:
+                    with open(os.path.join(self.directory, name), 'rb') as f:
+                        stored_key, expires_at, value = pickle.load(f)
+                except Exception:
+                    stored_key, expires_at, value = _MISSING, None, None
+
+                if stored_key == key and (expires_at is None or expires_at > now):
+                    index[name][1] = now
+                    self._remember(key, expires_at, value)
+                    self._stats["disk_hits"] += 1
+                    return value
+
+                self._remove_file(name)
+                self._stats["expired"] += 1
+
+            self._stats["misses"] += 1
+            return default
+
+    def set(self, key, value, ttl=None, persist=True):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键（可repr的对象）
+            value: 缓存值（写入磁盘时必须可以pickle）
+            ttl: 过期秒数，默认使用命名空间的默认值，None表示不过期
+            persist: 是否同时写入磁盘
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if not persist:
+                return True
+
+            data = pickle.dumps((key, expires_at, value), protocol=pickle.HIGHEST_PROTOCOL)
+            if len(data) > self.quota_bytes:
+                # 超过单插件容量的条目只保存在内存中
+                return False
+
+            name = self._file_name(key)
+            index = self._disk_index()
+            file_path = os.path.join(self.directory, name)
+            temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, file_path)
+            self._disk_total += len(data) - index.get(name, [0])[0]
+            index[name] = [len(data), time.time()]
+            self._stats["writes"] += 1
+
+            self._evict_disk(self.quota_bytes)
+
+        self.service.enforce_global_quota()
+        return True
+
+    def delete(self, key):
+        """删除缓存条目"""
+        with self._lock:
+            self._memory.pop(key, None)
+            name = self._file_name(key)
+            if name in self._disk_index():
+                self._remove_file(name)
+                return True
+        return False
+
+    def clear(self):
+        """清空该插件的全部缓存"""
+        with self._lock:
+            self._memory.clear()
+            for name in list(self._disk_index()):
+                self._remove_file(name)
+
+    def memoize(self, ttl=None, persist=True):
+        """
+        缓存函数结果的装饰器
+
+        用法:
+            @self.cache.memoize(ttl=3600)
+            def load_asset_list(project): ...
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    value = func(*args, **kwargs)
+                    self.set(key, value, ttl=ttl, persist=persist)
+                return value
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """命中、淘汰和容量统计"""
+        with self._lock:
+            result = dict(self._stats)
+            result.update({
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk_index()),
+                "disk_bytes": self.disk_bytes,
+                "quota_bytes": self.quota_bytes,
+            })
+            return result
+
+
+class CacheService:
+    """所有插件共享的缓存服务"""
+
+    def __init__(self, root, quota_mb=2048, plugin_quota_mb=256, memory_items=256):
+        self.root = root
+        self.quota_bytes = int(quota_mb * MB)
+        self.plugin_quota_bytes = int(plugin_quota_mb * MB)
+        self.memory_items = memory_items
+        self._namespaces = {}  # 目录名 -> PluginCache
+        self._discovered = set()  # 只从磁盘目录发现、本次还没有被插件使用的命名空间
+        self._lock = threading.RLock()
+        self._scanned = False
+
+    @staticmethod
+    def _directory_name(plugin_id):
+        return plugin_id.replace("/", "_")
+
+    def namespace(self, plugin_id, quota_mb=None, default_ttl=None):
+        """获取插件的缓存命名空间"""
+        with self._lock:
+            # 按磁盘目录名索引，全局淘汰时扫描到的目录与插件使用的命名空间是同一个对象
+            directory_name = self._directory_name(plugin_id)
+            quota_bytes = min(int(quota_mb * MB) if quota_mb else self.plugin_quota_bytes, self.quota_bytes)
+            cache = self._namespaces.get(directory_name)
+            if cache is None:
+                cache = PluginCache(self, plugin_id, os.path.join(self.root, directory_name),
+                                    quota_bytes, self.memory_items, default_ttl)
+                self._namespaces[directory_name] = cache
+            elif directory_name in self._discovered:
+                # 之前只从磁盘目录发现，现在由插件使用，改用真实的插件ID和设置
+                self._discovered.discard(directory_name)
+                cache.namespace = plugin_id
+                cache.quota_bytes = quota_bytes
+                cache.default_ttl = default_ttl
+            return cache
+
+    def _load_all_namespaces(self):
+        """全局淘汰时需要包含磁盘上所有插件的缓存（包括本次未使用的插件）"""
+        if not self._scanned:
+            self._scanned = True
+            if os.path.isdir(self.root):
+                for entry in os.scandir(self.root):
+                    if entry.is_dir() and entry.name not in self._namespaces:
+                        self.namespace(entry.name)
+                        self._discovered.add(entry.name)
+
+    def enforce_global_quota(self):
+        """超出全局容量时，在所有插件之间按最近最少使用顺序淘汰"""
+        with self._lock:
+            self._load_all_namespaces()
+            caches = list(self._namespaces.values())
+            total = sum(cache.disk_bytes for cache in caches)
+            while total > self.quota_bytes:
+                oldest = [(cache._oldest_access(), cache) for cache in caches]
+                oldest = [item for item in oldest if item[0] is not None]
+                if not oldest:
+                    break
+                _, cache = min(oldest, key=lambda item: item[0])
+                total -= cache._evict_oldest()
+
+    def stats(self):
+        """所有插件的缓存统计"""
+        with self._lock:
+            return {cache.namespace: cache.stats() for cache in self._namespaces.values()}
+
+
+_cache_service = None
+_cache_service_lock = threading.Lock()
+
+
+def configure_cache_service(settings=None):
+    """根据全局设置创建共享的缓存服务"""
+    global _cache_service
+    settings = settings or {}
+    with _cache_service_lock:
+        _cache_service = CacheService(
+            get_local_data_dir("plugin_cache"),
+            quota_mb=settings.get("cache_quota_mb", 2048),
+            plugin_quota_mb=settings.get("plugin_cache_quota_mb", 256),
+            memory_items=settings.get("plugin_cache_memory_items", 256)
+        )
+        return _cache_service
+
+
+def get_cache_service():
+    """获取共享的缓存服务（未配置时使用默认设置）"""
+    if _cache_service is None:
+        return configure_cache_service()
+    return _cache_service
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件后台任务执行器 - 所有插件共享的有界线程池（以及可选的进程池）
+
+每个插件通过自己的 PluginExecutor 提交任务，插件卸载时自动取消未开始的任务，
+并统计每个插件的队列深度和等待/执行耗时。任务完成回调在主线程中执行（PluginManager设置的调度函数、
+Maya的executeDeferred或Qt排队信号），都不可用时提交带回调的任务会失败。
+"""
+
+import os
+import time
+import threading
+import collections
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+# 正在执行的任务所属的取消事件（按线程记录）
+_task_state = threading.local()
+
+
+def current_cancel_event():
+    """
+    获取当前线程中正在执行的任务提交时的取消事件（不在任务中调用时返回None）
+
+    插件卸载后重新提交任务会创建新的取消事件，长时间运行的任务应检查这个事件，
+    而不是重新读取 PluginExecutor.cancel_event。
+    """
+    return getattr(_task_state, "cancel_event", None)
+
+
+def _qt_main_thread_dispatcher(app):
+    """通过Qt排队信号把调用转到QApplication所在线程的调度函数"""
+    from PyQt5.QtCore import QObject, Qt, pyqtSignal, pyqtSlot
+
+    class MainThreadCaller(QObject):
+        call = pyqtSignal(object, tuple)
+
+        @pyqtSlot(object, tuple)
+        def invoke(self, func, args):
+            func(*args)
+
+    caller = MainThreadCaller()
+    caller.moveToThread(app.thread())
+    caller.call.connect(caller.invoke, Qt.QueuedConnection)
+    return lambda func, *args: caller.call.emit(func, args)
+
+
+def _default_main_thread_dispatcher():
+    """
+    默认的主线程调度函数: Maya中使用executeDeferred，否则存在QApplication时通过Qt排队信号转发；
+    都没有时返回None（无法在主线程中调用回调）
+    """
+    try:
+        import maya.utils
+        return maya.utils.executeDeferred
+    except ImportError:
+        pass
+    try:
+        from PyQt5.QtCore import QCoreApplication
+    except ImportError:
+        return None
+    app = QCoreApplication.instance()
+    return _qt_main_thread_dispatcher(app) if app is not None else None
+
+
+class PluginExecutor:
+    """单个插件的任务提交接口"""
+
+    def __init__(self, service, plugin_id):
+        self.service = service
+        self.plugin_id = plugin_id
+        # 当前加载周期的取消事件，插件卸载时置位；取消后再次提交任务时创建新的事件，
+        # 已取消的任务仍然看到置位的旧事件（见 current_cancel_event）
+        self.cancel_event = threading.Event()
+
+        self._lock = threading.Lock()
+        self._futures = set()
+        self._stats = collections.Counter()
+        self._wait_ms = 0.0
+        self._run_ms = 0.0
+
+    def _track(self, future, submitted, timed=True):
+        """登记任务并在完成时更新统计（timed为False时以提交到完成的时间作为执行耗时）"""
+        with self._lock:
+            self._futures.add(future)
+            self._stats["submitted"] += 1
+
+        def done(f):
+            with self._lock:
+                self._futures.discard(f)
+                if f.cancelled():
+                    self._stats["cancelled"] += 1
+                elif f.exception() is not None:
+                    self._stats["failed"] += 1
+                else:
+                    self._stats["completed"] += 1
+                if not timed and not f.cancelled():
+                    self._run_ms += (time.perf_counter() - submitted) * 1000.0
+            self.service._release_slot()
+
+        future.add_done_callback(done)
+        return future
+
+    def _generation_event(self):
+        """获取当前加载周期的取消事件，上一个周期已取消时创建新的事件"""
+        with self._lock:
+            if self.cancel_event.is_set():
+                self.cancel_event = threading.Event()
+            return self.cancel_event
+
+    def _wrap(self, func, submitted, cancel_event):
+        """包装任务以记录等待和执行耗时，并记录任务所属的取消事件"""
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            with self._lock:
+                self._stats["running"] += 1
+                self._stats["started"] += 1
+                self._wait_ms += (started - submitted) * 1000.0
+            previous = getattr(_task_state, "cancel_event", None)
+            _task_state.cancel_event = cancel_event
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _task_state.cancel_event = previous
+                with self._lock:
+                    self._stats["running"] -= 1
+                    self._run_ms += (time.perf_counter() - started) * 1000.0
+        return run
+
+    def _on_done(self, future, on_done, dispatcher):
+        """在主线程中调用完成回调"""
+        if on_done is not None:
+            future.add_done_callback(lambda f: dispatcher(on_done, f))
+        return future
+
+    def submit(self, func, *args, on_done=None, **kwargs):
+        """
+        在共享线程池中执行任务
+
+        Args:
+            func: 任务函数
+            on_done: 完成回调 on_done(future)，在主线程中调用
+
+        Returns:
+            Future: 任务结果
+
+        Raises:
+            RuntimeError: 指定了on_done但无法在主线程中调用回调（没有设置调度函数，也不在Maya或Qt应用中）
+        """
+        dispatcher = self.service.get_main_thread_dispatcher() if on_done is not None else None
+        cancel_event = self._generation_event()
+        self.service._acquire_slot(self.plugin_id)
+        submitted = time.perf_counter()
+        try:
+            future = self.service._thread_pool.submit(self._wrap(func, submitted, cancel_event), *args, **kwargs)
+        except Exception:
+            self.service._release_slot()
+            raise
+        return self._on_done(self._track(future, submitted), on_done, dispatcher)
+
+    def map(self, func, iterable, on_done=None):
+        """对每个元素提交一个任务，返回Future列表（顺序与输入一致）"""
+        return [self.submit(func, item, on_done=on_done) for item in iterable]
+
+    def submit_process(self, func, *args, on_done=None, **kwargs):
+        """
+        在共享进程池中执行CPU密集型任务（func和参数必须可以pickle，func需要是模块级函数）
+        """
+        dispatcher = self.service.get_main_thread_dispatcher() if on_done is not None else None
+        self._generation_event()
+        self.service._acquire_slot(self.plugin_id)
+        submitted = time.perf_counter()
+        try:
+            future = self.service._get_process_pool().submit(func, *args, **kwargs)
+        except Exception:
+            self.service._release_slot()
+            raise
+        return self._on_done(self._track(future, submitted, timed=False), on_done, dispatcher)
+
+    def cancel_all(self):
+        """取消所有未开始的任务，并通知正在运行的任务退出"""
+        with self._lock:
+            self.cancel_event.set()
+        with self._lock:
+            futures = list(self._futures)
+        return sum(1 for future in futures if future.cancel())
+
+    def metrics(self):
+        """队列深度和耗时统计"""
+        with self._lock:
+            started = self._stats["started"]
+            finished = self._stats["completed"] + self._stats["failed"]
+            return {
+                "queued": len(self._futures) - self._stats["running"],
+                "running": self._stats["running"],
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "cancelled": self._stats["cancelled"],
+                "avg_wait_ms": round(self._wait_ms / started, 3) if started else 0.0,
+                "avg_run_ms": round(self._run_ms / finished, 3) if finished else 0.0,
+            }
+
+
+class ExecutorService:
+    """所有插件共享的任务执行服务"""
+
+    def __init__(self, max_workers=4, max_queue=256, process_workers=None):
+        """
+        Args:
+            max_workers: 线程池大小
+            max_queue: 最多允许排队的任务数（超出时提交失败）
+            process_workers: 进程池大小，默认为CPU核数
+        """
+        self.max_workers = max_workers
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self._thread_pool = ThreadPoolExecutor(max_workers, thread_name_prefix="NexusPluginWorker")
+        self._process_pool = None
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._executors = {}
+        # 主线程调度函数，未设置时在第一次需要时确定（QApplication可能在服务之后创建）
+        self._main_thread_dispatcher = None
+
+    def _acquire_slot(self, plugin_id):
+        if not self._slots.acquire(blocking=False):
+            raise RuntimeError(f"后台任务队列已满: {plugin_id}")
+
+    def _release_slot(self):
+        try:
+            self._slots.release()
+        except ValueError:
+            pass
+
+    def _get_process_pool(self):
+        """按需创建进程池"""
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    self.process_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+
+    def set_main_thread_dispatcher(self, dispatcher):
+        """设置主线程调度函数 dispatcher(func, *args)"""
+        self._main_thread_dispatcher = dispatcher
+
+    def get_main_thread_dispatcher(self):
+        """
+        获取主线程调度函数（未设置时使用默认的调度函数）
+
+        Raises:
+            RuntimeError: 没有设置调度函数，也不在Maya或Qt应用中
+        """
+        with self._lock:
+            if self._main_thread_dispatcher is None:
+                self._main_thread_dispatcher = _default_main_thread_dispatcher()
+            dispatcher = self._main_thread_dispatcher
+        if dispatcher is None:
+            raise RuntimeError("没有可用的主线程调度函数（不在Maya或Qt应用中），"
+                               "请先调用 set_main_thread_dispatcher")
+        return dispatcher
+
+    def call_in_main_thread(self, func, *args):
+        """在主线程中调用函数"""
+        self.get_main_thread_dispatcher()(func, *args)
+
+    def for_plugin(self, plugin_id):
+        """获取插件的任务执行器"""
+        with self._lock:
+            executor = self._executors.get(plugin_id)
+            if executor is None:
+                executor = PluginExecutor(self, plugin_id)
+                self._executors[plugin_id] = executor
+            return executor
+
+    def cancel_plugin(self, plugin_id):
+        """取消插件所有未开始的任务"""
+        executor = self._executors.get(plugin_id)
+        return executor.cancel_all() if executor else 0
+
+    def metrics(self):
+        """所有插件的任务统计"""
+        with self._lock:
+            executors = dict(self._executors)
+        return {plugin_id: executor.metrics() for plugin_id, executor in executors.items()}
+
+    def shutdown(self, wait=False):
+        """关闭线程池和进程池，取消未开始的任务"""
+        for executor in list(self._executors.values()):
+            executor.cancel_all()
+        self._thread_pool.shutdown(wait=wait)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait)
+
+
+_executor_service = None
+_executor_service_lock = threading.Lock()
+
+
+def configure_executor_service(settings=None):
+    """根据全局设置创建共享的任务执行服务"""
+    global _executor_service
+    settings = settings or {}
+    with _executor_service_lock:
+        if _executor_service is not None:
+            _executor_service.shutdown(wait=False)
+        _executor_service = ExecutorService(
+            max_workers=settings.get("plugin_executor_workers", 4),
+            max_queue=settings.get("plugin_executor_queue", 256),
+            process_workers=settings.get("plugin_process_workers")
+        )
+        return _executor_service
+
+
+def get_executor_service():
+    """获取共享的任务执行服务（未配置时使用默认设置）"""
+    if _executor_service is None:
+        return configure_executor_service()
+    return _executor_service
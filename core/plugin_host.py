@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件宿主进程 - 在独立进程中运行声明了 "isolation": "process" 的插件
+
+插件调用和事件通过 multiprocessing 管道（本地匿名管道/套接字对）传递:
+    父进程 -> 宿主: ("call", call_id, method, args, kwargs) / ("shutdown",)
+    宿主 -> 父进程: ("ready", info) / ("result", call_id, value) / ("error", call_id, message)
+                   ("event", name, payload)
+
+本模块不依赖Qt，宿主进程中不会导入PyQt5。
+"""
+
+import os
+import sys
+import itertools
+import threading
+import importlib
+import importlib.util
+import traceback
+import multiprocessing
+from concurrent.futures import Future
+
+# 宿主进程中与父进程通信的连接和发送锁
+_host_connection = None
+_host_send_lock = threading.Lock()
+
+
+def _host_send(message):
+    with _host_send_lock:
+        _host_connection.send(message)
+
+
+def emit_event(name, payload=None):
+    """
+    在宿主进程中向Nexus发送事件，可以在任意线程中调用
+
+    Args:
+        name: 事件名称
+        payload: 事件数据（必须可以pickle）
+    """
+    if _host_connection is None:
+        raise RuntimeError("当前不在插件宿主进程中")
+    _host_send(("event", name, payload))
+
+
+def _load_plugin_instance(plugin_path, entry_point, config):
+    """在宿主进程中加载插件（与PluginManager.load_plugin相同的入口点规则）"""
+    if "." in entry_point:
+        module_path, function_name = entry_point.rsplit(".", 1)
+    else:
+        module_path, function_name = "", entry_point
+
+    if plugin_path not in sys.path:
+        sys.path.insert(0, plugin_path)
+
+    if module_path:
+        if module_path.startswith("."):
+            module_path = f"{os.path.basename(plugin_path)}{module_path}"
+        module = importlib.import_module(module_path)
+    else:
+        module_spec = importlib.util.spec_from_file_location(
+            "__init__", os.path.join(plugin_path, "__init__.py"))
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+
+    return getattr(module, function_name)(config)
+
+
+def _host_main(connection, plugin_path, entry_point, config):
+    """宿主进程入口"""
+    global _host_connection
+    _host_connection = connection
+
+    try:
+        plugin_instance = _load_plugin_instance(plugin_path, entry_point, config)
+    except Exception as e:
+        _host_send(("error", None, f"{str(e)}\n{traceback.format_exc()}"))
+        return
+
+    # 插件可以通过实例方法发送事件
+    if not hasattr(plugin_instance, "emit_event"):
+        try:
+            plugin_instance.emit_event = emit_event
+        except Exception:
+            pass
+
+    _host_send(("ready", {"pid": os.getpid()}))
+
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            # 父进程已退出
+            break
+
+        if message[0] == "shutdown":
+            if hasattr(plugin_instance, "unload") and callable(plugin_instance.unload):
+                try:
+                    plugin_instance.unload()
+                except Exception as e:
+                    print(f"卸载插件失败: {str(e)}")
+            break
+
+        _, call_id, method, args, kwargs = message
+        try:
+            value = getattr(plugin_instance, method)(*args, **kwargs)
+            _host_send(("result", call_id, value))
+        except Exception as e:
+            _host_send(("error", call_id, f"{type(e).__name__}: {str(e)}"))
+
+
+class PluginHostProcess:
+    """插件宿主进程（父进程一侧）"""
+
+    def __init__(self, plugin_id, plugin_path, entry_point, config, on_event=None, on_exit=None):
+        """
+        Args:
+            plugin_id: 插件ID
+            plugin_path: 插件目录
+            entry_point: 插件入口点
+            config: 插件配置（必须可以pickle）
+            on_event: 事件回调 on_event(name, payload)，在读取线程中调用
+            on_exit: 进程意外退出回调 on_exit(exitcode)，在读取线程中调用
+        """
+        self.plugin_id = plugin_id
+        self.plugin_path = plugin_path
+        self.entry_point = entry_point
+        self.config = config
+        self.on_event = on_event
+        self.on_exit = on_exit
+
+        self.process = None
+        self.connection = None
+        self._send_lock = threading.Lock()
+        self._pending = {}  # call_id -> Future
+        self._call_ids = itertools.count(1)
+        self._ready = None
+        self._stopping = False
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def is_alive(self):
+        return bool(self.process and self.process.is_alive())
+
+    def start(self, timeout=60):
+        """启动宿主进程并等待插件加载完成"""
+        # 使用spawn方式，保证宿主进程中不继承父进程的Qt状态
+        context = multiprocessing.get_context("spawn")
+        parent_connection, child_connection = context.Pipe()
+        self.connection = parent_connection
+        self._ready = Future()
+        self._stopping = False
+
+        self.process = context.Process(
+            target=_host_main,
+            args=(child_connection, self.plugin_path, self.entry_point, self.config),
+            name=f"NexusPluginHost-{self.plugin_id}",
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+        reader = threading.Thread(target=self._read_loop, name=f"NexusPluginHostReader-{self.plugin_id}",
+                                  daemon=True)
+        reader.start()
+
+        return self._ready.result(timeout)
+
+    def _read_loop(self):
+        """读取宿主进程发来的消息"""
+        while True:
+            try:
+                message = self.connection.recv()
+            except (EOFError, OSError):
+                break
+
+            kind = message[0]
+            if kind == "ready":
+                self._ready.set_result(message[1])
+            elif kind == "event":
+                if self.on_event:
+                    try:
+                        self.on_event(message[1], message[2])
+                    except Exception as e:
+                        print(f"处理插件事件失败: {self.plugin_id}, 错误: {str(e)}")
+            elif kind in ("result", "error"):
+                call_id = message[1]
+                if call_id is None:
+                    # 插件加载失败
+                    if not self._ready.done():
+                        self._ready.set_exception(ImportError(message[2]))
+                    continue
+                future = self._pending.pop(call_id, None)
+                if future is not None:
+                    if kind == "result":
+                        future.set_result(message[2])
+                    else:
+                        future.set_exception(RuntimeError(message[2]))
+
+        # 连接断开: 宿主进程已退出
+        self.process.join(5)
+        error = RuntimeError(f"插件宿主进程已退出: {self.plugin_id}")
+        if not self._ready.done():
+            self._ready.set_exception(error)
+        for future in list(self._pending.values()):
+            future.set_exception(error)
+        self._pending.clear()
+
+        if not self._stopping and self.on_exit:
+            self.on_exit(self.process.exitcode)
+
+    def call_async(self, method, *args, **kwargs):
+        """异步调用插件方法，返回Future"""
+        if not self.is_alive():
+            raise RuntimeError(f"插件宿主进程未运行: {self.plugin_id}")
+
+        call_id = next(self._call_ids)
+        future = Future()
+        self._pending[call_id] = future
+        with self._send_lock:
+            self.connection.send(("call", call_id, method, args, kwargs))
+        return future
+
+    def call(self, method, *args, timeout=None, **kwargs):
+        """同步调用插件方法"""
+        return self.call_async(method, *args, **kwargs).result(timeout)
+
+    def stop(self, timeout=5):
+        """通知插件卸载并结束宿主进程"""
+        self._stopping = True
+        if self.is_alive():
+            try:
+                with self._send_lock:
+                    self.connection.send(("shutdown",))
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+        return True
+
+
+class ProcessPluginProxy:
+    """进程隔离插件的代理对象，把方法调用转发到宿主进程"""
+
+    # 插件已在宿主进程中初始化
+    initialized = True
+
+    def __init__(self, host):
+        self._host = host
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def remote_method(*args, **kwargs):
+            return self._host.call(name, *args, **kwargs)
+
+        remote_method.__name__ = name
+        return remote_method
+
+    def call_async(self, method, *args, **kwargs):
+        """异步调用插件方法，返回Future"""
+        return self._host.call_async(method, *args, **kwargs)
+
+    def unload(self):
+        """卸载插件并结束宿主进程"""
+        return self._host.stop()
@@ -9,60 +9,176 @@ import sys
 import json
 import importlib.util
 import shutil
-import zipfile
 import tempfile
 import requests
 from urllib.parse import urlparse
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtCore import QObject, Qt, QTimer, pyqtSignal
+
+from core.nexus_paths import get_cache_dir, get_local_data_dir
+from core.plugin_package import (CURRENT_POINTER, get_retention, install_delta, install_package,
+                                 list_versions, resolve_plugin_dir, rollback)
+from core.plugin_host import PluginHostProcess, ProcessPluginProxy
+from core.plugin_cache import configure_cache_service, get_cache_service
+from core.plugin_executor import configure_executor_service, get_executor_service
+from core.plugin_memory import MB, PluginMemoryTracker
+from core.plugin_profiler import PluginLoadProfiler
+from core.plugin_repository import PluginRepository, file_sha256
+from core.plugin_settings import configure_settings_store, flush_settings
+from core.plugin_state import PluginStateStore
+
+# 插件目录中表示管理员全局禁用的标记文件（只读取，不创建或删除）
+DISABLED_MARKER = "disabled"
 
 class PluginManager(QObject):
     # 信号
     plugin_loaded = pyqtSignal(str)  # 插件加载成功
     plugin_unloaded = pyqtSignal(str)  # 插件卸载成功
     plugin_error = pyqtSignal(str, str)  # 插件错误 (plugin_id, error_message)
+    plugin_updated = pyqtSignal(str, dict)  # 插件更新完成 (plugin_id, 更新统计)
+    plugin_profiled = pyqtSignal(str, dict)  # 插件加载耗时 (plugin_id, 加载分析结果)
+    plugin_memory_exceeded = pyqtSignal(str, float, float)  # 插件超出内存预算 (plugin_id, 当前MB, 预算MB)
+    plugin_event = pyqtSignal(str, str, object)  # 进程隔离插件发送的事件 (plugin_id, 事件名称, 数据)
+    _plugin_host_exited = pyqtSignal(str, object)  # 宿主进程意外退出 (plugin_id, 退出码)，跨线程转发
+    _main_thread_call = pyqtSignal(object, tuple)  # 后台任务回调 (函数, 参数)，转到主线程执行
     
-    def __init__(self, plugins_dir=None):
+    def __init__(self, plugins_dir=None, settings=None):
         super().__init__()
         self.plugins_dir = plugins_dir or os.path.join(os.path.dirname(os.path.dirname(__file__)), "plugins")
+        self.settings = settings or {}  # 全局设置（settings.yaml）
         self.plugins = {}  # 存储插件信息: plugin_id -> {config, path}
         self.loaded_plugins = {}  # 存储已加载的插件实例: plugin_id -> instance
+        self._loaded_paths = {}  # 已加载插件的代码目录: plugin_id -> path（卸载时清理导入路径和模块）
+        self.plugin_hosts = {}  # 进程隔离插件的宿主进程: plugin_id -> PluginHostProcess
+        self._host_restarts = {}  # 宿主进程的重启次数: plugin_id -> count
+        self._plugin_host_exited.connect(self._on_plugin_host_exited)
         
         # 确保插件目录存在
         os.makedirs(self.plugins_dir, exist_ok=True)
         
+        # 插件设置存储（BasePlugin的设置接口使用，延迟合并写入）
+        configure_settings_store(self.settings)
+        
+        # 插件缓存服务（BasePlugin.cache使用，位于本地数据目录的plugin_cache/<plugin_id>/）
+        configure_cache_service(self.settings)
+        
+        # 插件后台任务执行器（BasePlugin.executor使用，完成回调通过Qt信号转到主线程）
+        configure_executor_service(self.settings).set_main_thread_dispatcher(
+            lambda func, *args: self._main_thread_call.emit(func, args))
+        self._main_thread_call.connect(lambda func, args: func(*args), Qt.QueuedConnection)
+        
+        # 插件状态数据库（启用状态、安装信息、加载耗时和失败次数）
+        # WAL模式在网络文件系统上不可靠，默认放在用户的本地数据目录中
+        state_db = self.settings.get("plugin_state_db") or os.path.join(get_local_data_dir(), "plugin_state.db")
+        self._migrate_state_db(os.path.join(get_cache_dir(self.settings), "plugin_state.db"), state_db)
+        self.state_store = PluginStateStore(state_db)
+        
+        # 插件加载分析器（plugin_profiling开启时保存cProfile结果和JSON报告）
+        self.profiler = PluginLoadProfiler(
+            get_cache_dir(self.settings, "profiles"),
+            enabled=self.settings.get("plugin_profiling", False),
+            budget_ms=self.settings.get("plugin_load_budget_ms", 200),
+            keep_profiles=self.settings.get("plugin_profile_keep", 3)
+        )
+        
+        # 插件内存统计（plugin_memory_tracking开启时启用tracemalloc并定期检查内存预算）
+        self.memory_tracker = PluginMemoryTracker(self.settings.get("plugin_memory_frames", 10))
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(self.check_plugin_memory)
+        if self.settings.get("plugin_memory_tracking", False):
+            self.memory_tracker.start()
+            self.memory_timer.start(int(self.settings.get("plugin_memory_interval", 60) * 1000))
+        
+        # 插件仓库（索引缓存在本地缓存目录中）
+        repository_cache = get_cache_dir(self.settings, "repositories")
+        self.repositories = [
+            PluginRepository(url, repository_cache, self.settings.get("network_timeout", 30))
+            for url in self.settings.get("plugin_repositories", [])
+        ]
+        
         # 扫描插件
         self.scan_plugins()
     
+    @staticmethod
+    def _migrate_state_db(legacy_path, state_db):
+        """把旧版本放在缓存目录中的状态数据库复制到新位置（只在新位置没有数据库时）"""
+        if os.path.exists(state_db) or not os.path.exists(legacy_path):
+            return
+        try:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(legacy_path + suffix):
+                    shutil.copy2(legacy_path + suffix, state_db + suffix)
+        except OSError as e:
+            print(f"迁移插件状态数据库失败: {legacy_path}, 错误: {str(e)}")
+    
     def scan_plugins(self):
         """扫描所有可用插件"""
         self.plugins = {}
         
+        # 一次查询获取所有被禁用的插件
+        disabled = self.state_store.get_disabled()
+        
         for root, dirs, files in os.walk(self.plugins_dir):
-            if "plugin.json" in files:
-                plugin_config_path = os.path.join(root, "plugin.json")
-                try:
-                    with open(plugin_config_path, 'r', encoding='utf-8') as f:
-                        plugin_config = json.load(f)
-                    
-                    # 生成插件ID: 相对于插件目录的路径
-                    plugin_id = os.path.relpath(root, self.plugins_dir).replace('\\', '/')
-                    
-                    # 添加插件信息
-                    self.plugins[plugin_id] = {
-                        "config": plugin_config,
-                        "path": root,
-                        "active": True  # 默认启用
-                    }
-                    
-                    # 可选: 检查是否有禁用标记文件
-                    if os.path.exists(os.path.join(root, "disabled")):
-                        self.plugins[plugin_id]["active"] = False
-                    
-                except Exception as e:
-                    print(f"加载插件配置失败: {plugin_config_path}, 错误: {str(e)}")
+            # 跳过暂存目录等隐藏目录，以及旧版本遗留的备份目录
+            dirs[:] = [d for d in dirs
+                       if not d.startswith(".") and not d.endswith(".bak") and ".bak." not in d]
+            
+            # 生成插件ID: 相对于插件目录的路径
+            plugin_id = os.path.relpath(root, self.plugins_dir).replace('\\', '/')
+            
+            if CURRENT_POINTER in files:
+                # 多版本结构: 只加载当前版本，不再深入版本目录
+                dirs[:] = []
+                self._scan_plugin(plugin_id, disabled, DISABLED_MARKER in files)
+            elif "plugin.json" in files:
+                self._scan_plugin(plugin_id, disabled, DISABLED_MARKER in files)
         
         return len(self.plugins)
     
+    def _scan_plugin(self, plugin_id, disabled=None, root_marker=None):
+        """
+        读取单个插件当前版本的配置并更新插件列表
+        
+        Args:
+            plugin_id: 插件ID
+            disabled: 状态数据库中被当前用户禁用的插件ID集合，为None时单独查询
+            root_marker: 插件目录中是否有disabled标记文件（扫描时由目录列表得到，为None时检查文件）
+        """
+        plugin_root = os.path.join(self.plugins_dir, plugin_id)
+        root = resolve_plugin_dir(plugin_root)
+        if not root:
+            self.plugins.pop(plugin_id, None)
+            return False
+        
+        plugin_config_path = os.path.join(root, "plugin.json")
+        try:
+            with open(plugin_config_path, 'r', encoding='utf-8') as f:
+                plugin_config = json.load(f)
+            
+            # 插件目录（共享）中的disabled标记文件是管理员设置的全局禁用，只读取、不修改；
+            # 用户自己的启用状态保存在状态数据库中
+            if root_marker is None:
+                root_marker = os.path.exists(os.path.join(plugin_root, DISABLED_MARKER))
+            globally_disabled = root_marker or (
+                root != plugin_root and os.path.exists(os.path.join(root, DISABLED_MARKER)))
+            if disabled is None:
+                user_enabled = self.state_store.is_enabled(plugin_id)
+            else:
+                user_enabled = plugin_id not in disabled
+            
+            # 添加插件信息
+            self.plugins[plugin_id] = {
+                "config": plugin_config,
+                "path": root,
+                "root": plugin_root,
+                "active": user_enabled and not globally_disabled,
+                "globally_disabled": globally_disabled
+            }
+            
+            return True
+        except Exception as e:
+            print(f"加载插件配置失败: {plugin_config_path}, 错误: {str(e)}")
+            return False
+    
     def get_all_plugins(self):
         """获取所有插件信息"""
         result = []
@@ -71,6 +187,7 @@ class PluginManager(QObject):
             plugin_info["id"] = plugin_id
             plugin_info["path"] = info["path"]
             plugin_info["active"] = info["active"]
+            plugin_info["globally_disabled"] = info.get("globally_disabled", False)
             plugin_info["loaded"] = plugin_id in self.loaded_plugins
             result.append(plugin_info)
         return result
@@ -134,7 +251,8 @@ class PluginManager(QObject):
             raise ValueError(error_msg)
         
         plugin_path = plugin_info["path"]
-        config = plugin_info["config"]
+        # 传给插件的配置中带上插件ID（用于设置存储等按插件隔离的服务）
+        config = dict(plugin_info["config"], id=plugin_id)
         
         # 获取入口点
         entry_point = config.get("entry_point", "")
@@ -143,6 +261,12 @@ class PluginManager(QObject):
             self.plugin_error.emit(plugin_id, error_msg)
             raise ValueError(error_msg)
         
+        # 记录加载各阶段的耗时
+        record = self.profiler.begin(plugin_id)
+        
+        # 按插件目录统计内存，可选的内存预算来自plugin.json的memory_budget_mb
+        self.memory_tracker.register(plugin_id, plugin_path, config.get("memory_budget_mb"))
+        
         # 解析入口点，格式为: "module.submodule.function"
         try:
             if "." in entry_point:
@@ -150,42 +274,133 @@ class PluginManager(QObject):
             else:
                 module_path, function_name = "", entry_point
             
-            # 将插件目录添加到系统路径
-            if plugin_path not in sys.path:
-                sys.path.insert(0, plugin_path)
-            
-            # 导入插件模块
-            if module_path:
-                # 如果是相对导入，处理模块路径
-                if module_path.startswith("."):
-                    base_module = os.path.basename(plugin_path)
-                    module_path = f"{base_module}{module_path}"
-                
-                module = importlib.import_module(module_path)
+            if config.get("isolation") == "process":
+                # 在独立的宿主进程中运行插件，调用和事件通过IPC转发
+                with record.phase("entry"):
+                    plugin_instance = self._start_plugin_host(plugin_id, plugin_path, entry_point, config)
             else:
-                # 如果没有指定模块路径，尝试导入__init__.py
-                module_spec = importlib.util.spec_from_file_location(
-                    "__init__", os.path.join(plugin_path, "__init__.py"))
-                module = importlib.util.module_from_spec(module_spec)
-                module_spec.loader.exec_module(module)
+                # 将插件目录添加到系统路径
+                if plugin_path not in sys.path:
+                    sys.path.insert(0, plugin_path)
             
-            # 获取初始化函数
-            init_func = getattr(module, function_name)
+                # 导入插件模块
+                with record.phase("import"):
+                    if module_path:
+                        # 如果是相对导入，处理模块路径
+                        if module_path.startswith("."):
+                            base_module = os.path.basename(plugin_path)
+                            module_path = f"{base_module}{module_path}"
+                    
+                        module = importlib.import_module(module_path)
+                    else:
+                        # 如果没有指定模块路径，尝试导入__init__.py
+                        module_spec = importlib.util.spec_from_file_location(
+                            "__init__", os.path.join(plugin_path, "__init__.py"))
+                        module = importlib.util.module_from_spec(module_spec)
+                        module_spec.loader.exec_module(module)
+            
+                # 获取初始化函数
+                init_func = getattr(module, function_name)
+            
+                # 初始化插件（入口函数中的初始化计入entry阶段）
+                with record.phase("entry"):
+                    plugin_instance = init_func(config)
             
-            # 初始化插件
-            plugin_instance = init_func(config)
             self.loaded_plugins[plugin_id] = plugin_instance
+            self._loaded_paths[plugin_id] = plugin_path
+            self.memory_tracker.record_load(plugin_id)
             
             # 发送信号
+            result = self.profiler.finish(record)
+            self.state_store.record_load(plugin_id, result["total_ms"])
+            self.plugin_profiled.emit(plugin_id, result)
             self.plugin_loaded.emit(plugin_id)
             
             return plugin_instance
             
         except Exception as e:
             error_msg = f"加载插件失败: {plugin_id}, 错误: {str(e)}"
+            self.plugin_profiled.emit(plugin_id, self.profiler.finish(record, error=str(e)))
+            self.state_store.record_failure(plugin_id, str(e))
             self.plugin_error.emit(plugin_id, error_msg)
             raise ImportError(error_msg)
     
+    def _start_plugin_host(self, plugin_id, plugin_path, entry_point, config):
+        """启动进程隔离插件的宿主进程，返回代理对象"""
+        host = PluginHostProcess(
+            plugin_id, plugin_path, entry_point, dict(config),
+            on_event=lambda name, payload: self.plugin_event.emit(plugin_id, name, payload),
+            on_exit=lambda exitcode: self._plugin_host_exited.emit(plugin_id, exitcode)
+        )
+        try:
+            host.start(self.settings.get("plugin_host_timeout", 60))
+        except Exception:
+            host.stop()
+            raise
+        self.plugin_hosts[plugin_id] = host
+        return ProcessPluginProxy(host)
+    
+    def _on_plugin_host_exited(self, plugin_id, exitcode):
+        """宿主进程意外退出时重新启动（最多max_restarts次）"""
+        if plugin_id not in self.plugin_hosts:
+            return
+        
+        self.plugin_hosts.pop(plugin_id, None)
+        self.loaded_plugins.pop(plugin_id, None)
+        self.plugin_error.emit(plugin_id, f"插件宿主进程意外退出: {plugin_id}, 退出码: {exitcode}")
+        
+        max_restarts = self.plugins.get(plugin_id, {}).get("config", {}).get("max_restarts", 3)
+        restarts = self._host_restarts.get(plugin_id, 0)
+        if restarts >= max_restarts:
+            print(f"插件宿主进程重启次数过多，不再重启: {plugin_id}")
+            return
+        
+        self._host_restarts[plugin_id] = restarts + 1
+        try:
+            self.load_plugin(plugin_id)
+        except Exception as e:
+            print(f"重新启动插件宿主进程失败: {plugin_id}, 错误: {str(e)}")
+    
+    def check_plugin_memory(self):
+        """采样已加载插件的内存占用，卸载超出内存预算的插件"""
+        if not self.memory_tracker.enabled:
+            return {}
+        
+        usage = self.memory_tracker.measure(list(self.loaded_plugins))
+        for plugin_id, current_mb, budget_mb in self.memory_tracker.get_over_budget():
+            if plugin_id not in self.loaded_plugins:
+                continue
+            
+            print(f"警告: 插件超出内存预算，自动卸载: {plugin_id}, {current_mb:.1f}MB > {budget_mb}MB")
+            self.plugin_memory_exceeded.emit(plugin_id, current_mb, budget_mb)
+            try:
+                self.unload_plugin(plugin_id)
+            except Exception as e:
+                print(f"自动卸载插件失败: {plugin_id}, 错误: {str(e)}")
+        return usage
+    
+    def get_memory_usage(self, plugin_id=None):
+        """获取插件的当前和峰值内存占用（MB）"""
+        return self.memory_tracker.get_usage(plugin_id)
+    
+    def get_plugin_state(self, plugin_id=None):
+        """获取插件的状态记录（安装信息、最近加载耗时、失败次数）"""
+        if plugin_id is None:
+            return self.state_store.get_all()
+        return self.state_store.get_state(plugin_id)
+    
+    def get_cache_stats(self):
+        """获取各插件缓存的命中、淘汰和容量统计"""
+        return get_cache_service().stats()
+    
+    def get_executor_metrics(self):
+        """获取各插件后台任务的队列深度和等待/执行耗时"""
+        return get_executor_service().metrics()
+    
+    def get_load_report(self):
+        """获取插件加载耗时报告（按耗时从高到低排序）"""
+        return self.profiler.get_report()
+    
     def unload_plugin(self, plugin_id):
         """卸载指定插件"""
         if plugin_id in self.loaded_plugins:
@@ -195,8 +410,26 @@ class PluginManager(QObject):
                 if hasattr(plugin, "unload") and callable(plugin.unload):
                     plugin.unload()
                 
+                # 取消插件尚未开始的后台任务
+                get_executor_service().cancel_plugin(plugin_id)
+                
                 # 从已加载插件中移除
                 del self.loaded_plugins[plugin_id]
+                self.plugin_hosts.pop(plugin_id, None)
+                plugin = None
+                
+                # 移除导入路径和已导入的模块，更新、回滚或重新加载时导入新版本的代码
+                # （否则sys.modules中的旧模块会继续使用，旧版本目录被清理后也无法再导入）
+                plugin_path = self._loaded_paths.pop(plugin_id, None)
+                if plugin_path:
+                    if plugin_path in sys.path:
+                        sys.path.remove(plugin_path)
+                    self._purge_modules(plugin_path)
+                
+                # 检查插件占用的内存是否已经释放
+                remaining = self.memory_tracker.verify_release(plugin_id)
+                if remaining >= 0.1 * MB:
+                    print(f"警告: 插件卸载后仍占用内存: {plugin_id}, {remaining / MB:.2f}MB")
                 
                 # 发送信号
                 self.plugin_unloaded.emit(plugin_id)
@@ -209,16 +442,26 @@ class PluginManager(QObject):
         
         return False
     
+    def shutdown(self):
+        """程序退出时卸载所有插件并保存未写入的插件设置"""
+        for plugin_id in list(self.loaded_plugins):
+            try:
+                self.unload_plugin(plugin_id)
+            except Exception as e:
+                print(str(e))
+        get_executor_service().shutdown(wait=False)
+        flush_settings()
+    
     def enable_plugin(self, plugin_id):
-        """启用插件"""
+        """启用插件（被插件目录中的disabled标记全局禁用的插件不能启用）"""
         if plugin_id in self.plugins:
+            if self.plugins[plugin_id].get("globally_disabled"):
+                print(f"插件已被管理员全局禁用，无法启用: {plugin_id}")
+                return False
+            
             # 更新状态
             self.plugins[plugin_id]["active"] = True
-            
-            # 删除禁用标记文件
-            disabled_file = os.path.join(self.plugins[plugin_id]["path"], "disabled")
-            if os.path.exists(disabled_file):
-                os.remove(disabled_file)
+            self.state_store.set_enabled(plugin_id, True)
             
             return True
         return False
@@ -232,70 +475,23 @@ class PluginManager(QObject):
             
             # 更新状态
             self.plugins[plugin_id]["active"] = False
-            
-            # 创建禁用标记文件
-            with open(os.path.join(self.plugins[plugin_id]["path"], "disabled"), 'w') as f:
-                f.write("Plugin disabled")
+            self.state_store.set_enabled(plugin_id, False)
             
             return True
         return False
     
     def install_plugin(self, plugin_package_path):
         """安装插件包（ZIP文件）"""
-        # 检查文件是否存在
-        if not os.path.exists(plugin_package_path):
-            raise FileNotFoundError(f"插件包不存在: {plugin_package_path}")
-        
-        # 检查是否是ZIP文件
-        if not zipfile.is_zipfile(plugin_package_path):
-            raise ValueError(f"插件包不是有效的ZIP文件: {plugin_package_path}")
-        
-        # 创建临时目录解压插件
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 解压插件包
-            with zipfile.ZipFile(plugin_package_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # 查找plugin.json文件
-            plugin_json_path = None
-            for root, _, files in os.walk(temp_dir):
-                if "plugin.json" in files:
-                    plugin_json_path = os.path.join(root, "plugin.json")
-                    break
-            
-            if not plugin_json_path:
-                raise ValueError(f"插件包中未找到plugin.json文件")
-            
-            # 读取插件配置
-            with open(plugin_json_path, 'r', encoding='utf-8') as f:
-                plugin_config = json.load(f)
-            
-            # 获取插件ID
-            plugin_id = plugin_config.get("id")
-            if not plugin_id:
-                # 如果没有指定ID，使用插件名称作为ID
-                plugin_id = plugin_config.get("name", "unknown").lower().replace(" ", "_")
-            
-            # 确定目标目录
-            target_dir = os.path.join(self.plugins_dir, plugin_id)
-            
-            # 如果目标目录已存在，先备份
-            if os.path.exists(target_dir):
-                backup_dir = f"{target_dir}.bak"
-                # 删除旧的备份
-                if os.path.exists(backup_dir):
-                    shutil.rmtree(backup_dir)
-                # 备份当前版本
-                shutil.move(target_dir, backup_dir)
-            
-            # 拷贝插件文件到目标目录
-            plugin_root = os.path.dirname(plugin_json_path)
-            shutil.copytree(plugin_root, target_dir)
-            
-            # 重新扫描插件
-            self.scan_plugins()
-            
-            return plugin_id
+        # 流式解压到暂存目录，原子重命名为新版本目录并切换当前版本指针
+        # 多余的旧版本按backup_enabled/backup_count设置在后台清理
+        plugin_id, config, _ = install_package(plugin_package_path, self.plugins_dir,
+                                               get_retention(self.settings))
+        self.state_store.record_install(plugin_id, config.get("version"), source=plugin_package_path)
+        
+        # 只更新该插件的条目，无需重新扫描全部插件
+        self._scan_plugin(plugin_id)
+        
+        return plugin_id
     
     def download_plugin(self, url, target_path=None):
         """从URL下载插件"""
@@ -320,6 +516,122 @@ class PluginManager(QObject):
         except Exception as e:
             raise Exception(f"下载插件失败: {str(e)}")
     
+    def sync_repositories(self):
+        """同步所有插件仓库的索引，返回成功同步的仓库数量"""
+        count = 0
+        for repository in self.repositories:
+            try:
+                repository.sync()
+                count += 1
+            except Exception as e:
+                # 同步失败时继续使用本地缓存
+                print(f"同步插件仓库失败: {repository.url}, 错误: {str(e)}")
+        return count
+    
+    def get_repository_plugins(self):
+        """获取所有仓库中的插件条目（同一插件以先配置的仓库为准）"""
+        result = {}
+        for repository in self.repositories:
+            for entry in repository.get_plugins():
+                result.setdefault(entry["id"], entry)
+        return list(result.values())
+    
+    def check_plugin_updates(self):
+        """检查已安装插件的更新，返回 [(repository, entry)]"""
+        installed = {plugin_id: info["config"].get("version", "1.0.0")
+                     for plugin_id, info in self.plugins.items()}
+        
+        updates = []
+        for repository in self.repositories:
+            for entry in repository.check_updates(installed):
+                updates.append((repository, entry))
+                # 同一插件只报告一次
+                installed.pop(entry["id"], None)
+        return updates
+    
+    def install_from_repository(self, plugin_id):
+        """从仓库下载并安装（或更新）插件"""
+        for repository in self.repositories:
+            entry = repository.get_plugin(plugin_id)
+            if not entry:
+                continue
+            
+            package_url = repository.get_package_url(entry)
+            if os.path.exists(package_url):
+                package_path = package_url
+            else:
+                package_path = self.download_plugin(package_url)
+            
+            # 校验插件包
+            if file_sha256(package_path) != entry["sha256"]:
+                raise ValueError(f"插件包校验失败: {plugin_id}")
+            
+            if plugin_id in self.plugins:
+                return self.update_plugin(plugin_id, package_path)
+            return self.install_plugin(package_path)
+        
+        raise ValueError(f"仓库中不存在插件: {plugin_id}")
+    
+    def update_plugin_from_repository(self, plugin_id):
+        """
+        从仓库更新已安装的插件
+
+        优先按文件清单增量更新，只下载变化的文件；仓库没有清单或校验失败时回退到完整插件包。
+
+        Returns:
+            dict: 更新统计（mode, downloaded_bytes, package_bytes, saved_bytes, ...），
+                saved_bytes为完整插件包大小减去实际下载的字节数
+        """
+        if plugin_id not in self.plugins:
+            return {"mode": "full", "plugin_id": self.install_from_repository(plugin_id)}
+        
+        for repository in self.repositories:
+            entry = repository.get_plugin(plugin_id)
+            if not entry:
+                continue
+            
+            # 如果插件已加载，先卸载
+            was_loaded = plugin_id in self.loaded_plugins
+            if was_loaded:
+                self.unload_plugin(plugin_id)
+            
+            try:
+                try:
+                    target_files = repository.fetch_manifest(entry)
+                    if not target_files:
+                        raise ValueError("仓库没有提供文件清单")
+                    
+                    config, _, stats = install_delta(self.plugins_dir, plugin_id, target_files,
+                                                     repository.fetch_object, get_retention(self.settings))
+                    self.state_store.record_install(plugin_id, config.get("version"), entry["sha256"], repository.url)
+                    self._scan_plugin(plugin_id)
+                except Exception as e:
+                    print(f"增量更新失败，使用完整插件包: {plugin_id}, 原因: {str(e)}")
+                    self.install_from_repository(plugin_id)
+                    stats = {"mode": "full", "downloaded_bytes": entry["size"]}
+            except Exception:
+                # 更新失败时当前版本指针没有变化，重新加载原来的版本
+                if was_loaded:
+                    try:
+                        self.load_plugin(plugin_id)
+                    except Exception as e:
+                        print(f"更新失败后重新加载插件失败: {plugin_id}, 错误: {str(e)}")
+                raise
+            
+            # 与下载完整插件包（压缩后的大小）比较节省的下载量
+            stats["package_bytes"] = entry["size"]
+            stats["saved_bytes"] = max(entry["size"] - stats["downloaded_bytes"], 0)
+            
+            if was_loaded:
+                self.load_plugin(plugin_id)
+            
+            print(f"插件已更新: {plugin_id} -> {entry['version']}, "
+                  f"下载 {stats['downloaded_bytes']} 字节, 节省 {stats['saved_bytes']} 字节")
+            self.plugin_updated.emit(plugin_id, stats)
+            return stats
+        
+        raise ValueError(f"仓库中不存在插件: {plugin_id}")
+    
     def update_plugin(self, plugin_id, plugin_package_path):
         """更新插件"""
         # 如果插件已加载，先卸载
@@ -329,6 +641,40 @@ class PluginManager(QObject):
         # 安装新版本（会覆盖旧版本）
         return self.install_plugin(plugin_package_path)
     
+    def get_plugin_versions(self, plugin_id):
+        """获取插件已安装的所有版本"""
+        if plugin_id not in self.plugins:
+            raise ValueError(f"插件不存在: {plugin_id}")
+        return list_versions(self.plugins[plugin_id]["root"])
+    
+    def rollback_plugin(self, plugin_id, version=None):
+        """回滚插件到指定版本（默认为上一个版本），只切换当前版本指针"""
+        if plugin_id not in self.plugins:
+            raise ValueError(f"插件不存在: {plugin_id}")
+        
+        # 如果插件已加载，先卸载
+        was_loaded = plugin_id in self.loaded_plugins
+        if was_loaded:
+            self.unload_plugin(plugin_id)
+        
+        # 卸载时已移除旧版本的导入路径和模块
+        version = rollback(self.plugins[plugin_id]["root"], version)
+        self._scan_plugin(plugin_id)
+        
+        if was_loaded:
+            self.load_plugin(plugin_id)
+        
+        return version
+    
+    @staticmethod
+    def _purge_modules(path):
+        """从sys.modules中移除文件位于指定目录下的模块"""
+        prefix = os.path.normcase(os.path.abspath(path)) + os.sep
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, "__file__", None)
+            if module_file and os.path.normcase(os.path.abspath(module_file)).startswith(prefix):
+                del sys.modules[name]
+    
     def remove_plugin(self, plugin_id):
         """删除插件"""
         if plugin_id not in self.plugins:
@@ -338,12 +684,13 @@ class PluginManager(QObject):
         if plugin_id in self.loaded_plugins:
             self.unload_plugin(plugin_id)
         
-        # 删除插件目录
-        plugin_path = self.plugins[plugin_id]["path"]
+        # 删除插件目录（包括所有版本）
+        plugin_path = self.plugins[plugin_id]["root"]
         if os.path.exists(plugin_path):
             shutil.rmtree(plugin_path)
         
         # 从插件列表中移除
         del self.plugins[plugin_id]
+        self.state_store.remove(plugin_id)
         
         return True
\ No newline at end of file
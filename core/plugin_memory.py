@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件内存统计 - 使用tracemalloc按插件目录统计每个插件分配的内存
+"""
+
+import gc
+import os
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+class PluginMemoryTracker:
+    """
+    插件内存统计
+
+    一次快照中，只要调用栈中任意一帧位于插件目录内，该内存块就计入该插件。
+    tracemalloc只记录全局峰值，因此每个插件只记录各次采样中的最大值（max_sampled），
+    两次采样之间的短暂分配不会计入。
+    """
+
+    def __init__(self, frames=10):
+        self.frames = frames
+        self.plugins = {}  # plugin_id -> {path, budget_mb, current, max_sampled, load, after_unload}
+        self._owner_cache = {}  # 文件名 -> plugin_id（None表示不属于任何插件）
+
+    @property
+    def enabled(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """开始跟踪内存分配"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        """停止跟踪内存分配"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def register(self, plugin_id, path, budget_mb=None):
+        """登记插件目录和内存预算"""
+        info = self.plugins.setdefault(plugin_id, {"current": 0, "max_sampled": 0, "load": 0, "after_unload": None})
+        info["path"] = os.path.normcase(os.path.abspath(path)) + os.sep
+        info["budget_mb"] = budget_mb
+        self._owner_cache.clear()
+
+    def unregister(self, plugin_id):
+        """移除插件的统计"""
+        self.plugins.pop(plugin_id, None)
+        self._owner_cache.clear()
+
+    def _owner(self, filename):
+        """查找文件所属的插件"""
+        try:
+            return self._owner_cache[filename]
+        except KeyError:
+            normalized = os.path.normcase(os.path.abspath(filename))
+            owner = None
+            for plugin_id, info in self.plugins.items():
+                if normalized.startswith(info["path"]):
+                    owner = plugin_id
+                    break
+            self._owner_cache[filename] = owner
+            return owner
+
+    def measure(self, plugin_ids=None):
+        """
+        采样一次所有（或指定）插件的内存占用，未登记的插件ID被忽略
+
+        Returns:
+            dict: {plugin_id: 当前字节数}
+        """
+        if not self.enabled:
+            return {}
+
+        plugin_ids = set(self.plugins) if plugin_ids is None else set(plugin_ids) & set(self.plugins)
+        usage = dict.fromkeys(plugin_ids, 0)
+
+        snapshot = tracemalloc.take_snapshot()
+        for trace in snapshot.traces:
+            for frame in trace.traceback:
+                owner = self._owner(frame.filename)
+                if owner is not None:
+                    if owner in usage:
+                        usage[owner] += trace.size
+                    break
+
+        for plugin_id, size in usage.items():
+            info = self.plugins[plugin_id]
+            info["current"] = size
+            info["max_sampled"] = max(info["max_sampled"], size)
+        return usage
+
+    def record_load(self, plugin_id):
+        """记录插件加载完成后的内存占用"""
+        size = self.measure([plugin_id]).get(plugin_id, 0)
+        if plugin_id in self.plugins:
+            self.plugins[plugin_id]["load"] = size
+        return size
+
+    def verify_release(self, plugin_id):
+        """
+        插件卸载后检查内存是否释放
+
+        Returns:
+            int: 卸载后仍然由插件代码分配的字节数
+        """
+        if not self.enabled or plugin_id not in self.plugins:
+            return 0
+        gc.collect()
+        remaining = self.measure([plugin_id]).get(plugin_id, 0)
+        self.plugins[plugin_id]["after_unload"] = remaining
+        return remaining
+
+    def get_over_budget(self):
+        """获取超出内存预算的插件 [(plugin_id, current_mb, budget_mb)]"""
+        result = []
+        for plugin_id, info in self.plugins.items():
+            budget_mb = info.get("budget_mb")
+            if budget_mb and info["current"] > budget_mb * MB:
+                result.append((plugin_id, info["current"] / MB, budget_mb))
+        return result
+
+    def get_usage(self, plugin_id=None):
+        """获取内存统计（MB）"""
+        def to_mb(info):
+            return {
+                "current_mb": round(info["current"] / MB, 3),
+                "max_sampled_mb": round(info["max_sampled"] / MB, 3),
+                "load_mb": round(info["load"] / MB, 3),
+                "after_unload_mb": None if info["after_unload"] is None else round(info["after_unload"] / MB, 3),
+                "budget_mb": info.get("budget_mb"),
+            }
+
+        if plugin_id is not None:
+            info = self.plugins.get(plugin_id)
+            return to_mb(info) if info else None
+        return {pid: to_mb(info) for pid, info in self.plugins.items()}
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件包安装 - 从ZIP中央目录定位插件根目录，单次流式解压到插件目录
+
+本模块不依赖Qt，可同时被Nexus托盘程序和Maya中的插件加载器使用。
+
+插件目录结构（多版本）:
+    plugins/<plugin_id>/<version>/...   每个已安装的版本
+    plugins/<plugin_id>/current         当前版本指针（内容为版本目录名，原子替换）
+
+旧的单版本结构（plugins/<plugin_id>/plugin.json）在下次安装时自动迁移。
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import shutil
+import zipfile
+import tempfile
+import threading
+
+# 暂存目录，位于插件目录下以保证与目标目录处于同一卷，从而可以原子重命名
+STAGING_DIR = ".staging"
+
+# 当前版本指针文件
+CURRENT_POINTER = "current"
+
+# 流式复制的块大小
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 已安装版本的文件清单（相对路径 -> sha256/size），用于增量更新
+MANIFEST_FILE = ".nexus_manifest.json"
+
+
+def find_plugin_root(names):
+    """
+    根据ZIP成员列表定位插件根目录
+
+    Args:
+        names: ZIP中的成员名称列表
+
+    Returns:
+        str: 插件根目录前缀（如 "my_plugin/"，位于压缩包根部时为 ""）
+    """
+    candidates = [name for name in names if name.rsplit("/", 1)[-1] == "plugin.json"]
+    if not candidates:
+        raise ValueError("插件包中未找到plugin.json文件")
+    # 取层级最浅的plugin.json
+    config_name = min(candidates, key=lambda name: name.count("/"))
+    return config_name[:-len("plugin.json")]
+
+
+def read_package_config(zip_ref, root=None):
+    """直接从ZIP中读取plugin.json，无需解压"""
+    if root is None:
+        root = find_plugin_root(zip_ref.namelist())
+    return json.loads(zip_ref.read(root + "plugin.json").decode('utf-8'))
+
+
+def get_plugin_id(config, lower=False):
+    """
+    获取插件ID，未指定时使用插件名称
+
+    Args:
+        lower: 是否把ID转换为小写（Maya插件加载器的插件目录使用小写ID）
+    """
+    plugin_id = config.get("id")
+    if not plugin_id:
+        plugin_id = config.get("name", "unknown").lower().replace(" ", "_")
+    return plugin_id.lower() if lower else plugin_id
+
+
+def _safe_member_path(base_dir, relative_name):
+    """计算成员的目标路径，拒绝跳出插件目录的路径"""
+    target = os.path.normpath(os.path.join(base_dir, *relative_name.split("/")))
+    if os.path.commonpath([os.path.abspath(base_dir), os.path.abspath(target)]) != os.path.abspath(base_dir):
+        raise ValueError(f"插件包包含非法路径: {relative_name}")
+    return target
+
+
+class InstallCancelled(Exception):
+    """安装被用户取消"""
+
+
+def _copy_and_hash(source, dest, on_chunk=None):
+    """流式复制文件对象并同时计算SHA256，返回 (sha256, size)；on_chunk(字节数)在每块写入后调用"""
+    sha = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+        sha.update(chunk)
+        dest.write(chunk)
+        size += len(chunk)
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+    return sha.hexdigest(), size
+
+
+def write_manifest(version_dir, files):
+    """写入版本目录的文件清单"""
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(files, f, ensure_ascii=False, indent=0, sort_keys=True)
+
+
+def read_installed_manifest(version_dir):
+    """读取已安装版本的文件清单，旧版本没有清单时重新计算"""
+    manifest_path = os.path.join(version_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    files = {}
+    for root, dirs, names in os.walk(version_dir):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as source:
+                sha = hashlib.sha256()
+                for chunk in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+                    sha.update(chunk)
+            relative = os.path.relpath(path, version_dir).replace('\\', '/')
+            files[relative] = {"sha256": sha.hexdigest(), "size": os.path.getsize(path)}
+    files.pop(MANIFEST_FILE, None)
+    return files
+
+
+def stage_package(package_path, plugins_dir, progress=None, cancel_event=None, lower_id=False):
+    """
+    将插件包中的插件根目录流式解压到暂存目录
+
+    只读取ZIP中央目录定位插件根目录，然后只解压该目录下的成员，每个字节只写入一次。
+
+    Args:
+        package_path: 插件包路径
+        plugins_dir: 插件目录
+        progress: 进度回调 progress(已解压字节数, 总字节数)，在调用线程中调用
+        cancel_event: threading.Event，置位后中止解压并抛出InstallCancelled
+        lower_id: 是否使用小写的插件ID，见get_plugin_id
+
+    Returns:
+        tuple: (plugin_id, config, staging_path)
+    """
+    if not os.path.exists(package_path):
+        raise FileNotFoundError(f"插件包不存在: {package_path}")
+
+    if not zipfile.is_zipfile(package_path):
+        raise ValueError(f"插件包不是有效的ZIP文件: {package_path}")
+
+    staging_root = os.path.join(plugins_dir, STAGING_DIR)
+    os.makedirs(staging_root, exist_ok=True)
+
+    with zipfile.ZipFile(package_path, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        root = find_plugin_root([info.filename for info in members])
+        config = read_package_config(zip_ref, root)
+        plugin_id = get_plugin_id(config, lower_id)
+
+        members = [info for info in members if info.filename.startswith(root) and not info.is_dir()]
+        total_bytes = sum(info.file_size for info in members)
+        done_bytes = 0
+
+        def on_chunk(size):
+            nonlocal done_bytes
+            if cancel_event is not None and cancel_event.is_set():
+                raise InstallCancelled(f"安装已取消: {plugin_id}")
+            done_bytes += size
+            if progress is not None:
+                progress(done_bytes, total_bytes)
+
+        staging_path = tempfile.mkdtemp(prefix=f"{plugin_id.replace('/', '_')}-", dir=staging_root)
+        try:
+            files = {}
+            for info in members:
+                relative = info.filename[len(root):]
+                target = _safe_member_path(staging_path, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zip_ref.open(info) as source, open(target, 'wb') as dest:
+                    sha256, size = _copy_and_hash(source, dest, on_chunk)
+                files[relative] = {"sha256": sha256, "size": size}
+
+            if cancel_event is not None and cancel_event.is_set():
+                raise InstallCancelled(f"安装已取消: {plugin_id}")
+
+            # 记录文件清单，供之后的增量更新使用
+            write_manifest(staging_path, files)
+        except Exception:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+
+    return plugin_id, config, staging_path
+
+
+def stage_delta(plugins_dir, plugin_id, installed_dir, target_files, fetch_file):
+    """
+    根据目标版本的文件清单增量构建新版本
+
+    内容未变化的文件（按哈希匹配，允许改名）从已安装版本本地复制，只下载变化的文件，
+    最后按目标清单校验全部文件。
+
+    Args:
+        plugins_dir: 插件目录
+        plugin_id: 插件ID
+        installed_dir: 当前已安装版本的目录
+        target_files: 目标版本的文件清单 {相对路径: {"sha256", "size"}}
+        fetch_file: 下载函数 fetch_file(sha256) -> bytes
+
+    Returns:
+        tuple: (config, staging_path, stats)
+    """
+    installed_files = read_installed_manifest(installed_dir)
+    local_by_hash = {}
+    for relative, info in installed_files.items():
+        local_by_hash.setdefault(info["sha256"], relative)
+
+    staging_root = os.path.join(plugins_dir, STAGING_DIR)
+    os.makedirs(staging_root, exist_ok=True)
+    staging_path = tempfile.mkdtemp(prefix=f"{plugin_id.replace('/', '_')}-", dir=staging_root)
+
+    stats = {"mode": "delta", "total_bytes": 0, "downloaded_bytes": 0,
+             "changed_files": 0, "reused_files": 0}
+    try:
+        for relative, info in target_files.items():
+            target = _safe_member_path(staging_path, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            stats["total_bytes"] += info["size"]
+
+            local = local_by_hash.get(info["sha256"])
+            if local is not None:
+                shutil.copy2(_safe_member_path(installed_dir, local), target)
+                stats["reused_files"] += 1
+            else:
+                data = fetch_file(info["sha256"])
+                with open(target, 'wb') as f:
+                    f.write(data)
+                stats["downloaded_bytes"] += len(data)
+                stats["changed_files"] += 1
+
+        # 按目标清单校验结果
+        for relative, info in target_files.items():
+            with open(_safe_member_path(staging_path, relative), 'rb') as f:
+                sha256, size = _copy_and_hash(f, _NullWriter())
+            if sha256 != info["sha256"] or size != info["size"]:
+                raise ValueError(f"增量更新校验失败: {plugin_id} {relative}")
+
+        with open(os.path.join(staging_path, "plugin.json"), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        write_manifest(staging_path, target_files)
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    # 从已安装版本本地复制（未下载）的文件大小
+    stats["reused_bytes"] = stats["total_bytes"] - stats["downloaded_bytes"]
+    return config, staging_path, stats
+
+
+class _NullWriter:
+    """丢弃写入内容，用于只计算哈希"""
+
+    def write(self, data):
+        return len(data)
+
+
+def _version_dir_name(version):
+    """将版本号转换为安全的目录名"""
+    return re.sub(r'[^0-9A-Za-z._+-]', "_", str(version or "1.0.0"))
+
+
+def _version_key(version):
+    """版本目录的排序键"""
+    result = []
+    for part in version.replace("-", ".").split("."):
+        digits = "".join(c for c in part if c.isdigit())
+        result.append(int(digits) if digits else 0)
+    return tuple(result)
+
+
+def get_current_version(plugin_root):
+    """读取当前版本指针，非多版本结构时返回None"""
+    pointer = os.path.join(plugin_root, CURRENT_POINTER)
+    if not os.path.isfile(pointer):
+        return None
+    with open(pointer, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def resolve_plugin_dir(plugin_root):
+    """获取插件当前版本所在的目录，不是插件目录时返回None"""
+    version = get_current_version(plugin_root)
+    if version:
+        version_dir = os.path.join(plugin_root, version)
+        if os.path.isfile(os.path.join(version_dir, "plugin.json")):
+            return version_dir
+        return None
+    if os.path.isfile(os.path.join(plugin_root, "plugin.json")):
+        return plugin_root
+    return None
+
+
+def list_versions(plugin_root):
+    """列出已安装的所有版本（按版本号从低到高）"""
+    if not os.path.isdir(plugin_root) or get_current_version(plugin_root) is None:
+        return []
+    versions = [name for name in os.listdir(plugin_root)
+                if not name.startswith(".")
+                and os.path.isfile(os.path.join(plugin_root, name, "plugin.json"))]
+    return sorted(versions, key=_version_key)
+
+
+def activate_version(plugin_root, version):
+    """原子切换当前版本指针"""
+    if not os.path.isfile(os.path.join(plugin_root, version, "plugin.json")):
+        raise ValueError(f"插件版本不存在: {plugin_root} {version}")
+
+    pointer = os.path.join(plugin_root, CURRENT_POINTER)
+    temp_pointer = f"{pointer}.{os.getpid()}.tmp"
+    with open(temp_pointer, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(temp_pointer, pointer)
+    return version
+
+
+# 每个插件根目录一个锁，回滚和垃圾回收互斥，避免回收线程删除正在切换到的版本
+_root_locks = {}
+_root_locks_guard = threading.Lock()
+
+
+def _root_lock(plugin_root):
+    with _root_locks_guard:
+        return _root_locks.setdefault(os.path.normcase(os.path.abspath(plugin_root)), threading.RLock())
+
+
+def rollback(plugin_root, version=None):
+    """
+    回滚插件版本（只切换指针）
+
+    Args:
+        plugin_root: 插件根目录
+        version: 目标版本，默认为当前版本之前的最近一个版本
+
+    Returns:
+        str: 回滚后的版本
+    """
+    with _root_lock(plugin_root):
+        current = get_current_version(plugin_root)
+        if version is None:
+            candidates = [v for v in list_versions(plugin_root) if v != current]
+            older = [v for v in candidates if _version_key(v) < _version_key(current or "0")]
+            if not older and not candidates:
+                raise ValueError(f"没有可回滚的版本: {plugin_root}")
+            version = (older or candidates)[-1]
+        return activate_version(plugin_root, version)
+
+
+def _migrate_legacy_layout(plugin_root):
+    """将旧的单版本目录迁移为多版本结构"""
+    with open(os.path.join(plugin_root, "plugin.json"), 'r', encoding='utf-8') as f:
+        version = _version_dir_name(json.load(f).get("version"))
+
+    temp_root = f"{plugin_root}.migrating"
+    os.rename(plugin_root, temp_root)
+    os.makedirs(plugin_root)
+    os.rename(temp_root, os.path.join(plugin_root, version))
+    activate_version(plugin_root, version)
+
+
+def commit_staged(staging_path, plugin_root, version):
+    """
+    将暂存目录原子重命名为新的版本目录并切换当前版本指针
+
+    Args:
+        staging_path: 暂存目录
+        plugin_root: 插件根目录（plugins/<plugin_id>）
+        version: 插件版本
+
+    Returns:
+        str: 新版本目录
+    """
+    if os.path.isfile(os.path.join(plugin_root, "plugin.json")) and get_current_version(plugin_root) is None:
+        _migrate_legacy_layout(plugin_root)
+    os.makedirs(plugin_root, exist_ok=True)
+
+    version = _version_dir_name(version)
+    target_dir = os.path.join(plugin_root, version)
+
+    with _root_lock(plugin_root):
+        # 重新安装同一版本时，旧目录改名为隐藏目录，由垃圾回收删除
+        if os.path.exists(target_dir):
+            os.rename(target_dir, os.path.join(plugin_root, f".{version}.replaced.{int(time.time() * 1000)}"))
+
+        os.rename(staging_path, target_dir)
+        activate_version(plugin_root, version)
+    return target_dir
+
+
+def collect_garbage(plugin_root, keep=5):
+    """
+    删除多余的旧版本
+
+    Args:
+        plugin_root: 插件根目录
+        keep: 除当前版本外保留的旧版本数量（0表示不保留备份）
+
+    Returns:
+        list: 被删除的目录
+    """
+    removed = []
+    if not os.path.isdir(plugin_root):
+        return removed
+
+    with _root_lock(plugin_root):
+        current = get_current_version(plugin_root)
+        if current is not None:
+            # 保留当前版本和最近的keep个旧版本
+            old_versions = [v for v in list_versions(plugin_root) if v != current]
+            expired = old_versions[:max(len(old_versions) - keep, 0)]
+
+            # 被替换的同版本目录
+            expired += [name for name in os.listdir(plugin_root) if name.startswith(".") and ".replaced." in name]
+
+            for name in expired:
+                path = os.path.join(plugin_root, name)
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+
+    # 旧版本遗留的备份目录（<id>.bak 和 <id>.bak.<时间戳>）
+    parent_dir, name = os.path.split(plugin_root)
+    for sibling in os.listdir(parent_dir):
+        if sibling == f"{name}.bak" or sibling.startswith(f"{name}.bak."):
+            path = os.path.join(parent_dir, sibling)
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+
+    return removed
+
+
+def collect_garbage_async(plugin_root, keep=5):
+    """在后台线程中删除多余的旧版本"""
+    thread = threading.Thread(target=collect_garbage, args=(plugin_root, keep),
+                              name="NexusPluginGC", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_retention(settings):
+    """根据设置中的backup_enabled/backup_count计算保留的旧版本数量"""
+    settings = settings or {}
+    if not settings.get("backup_enabled", True):
+        return 0
+    return max(int(settings.get("backup_count", 5)), 0)
+
+
+def install_delta(plugins_dir, plugin_id, target_files, fetch_file, keep=5):
+    """
+    增量安装插件的新版本
+
+    Returns:
+        tuple: (config, version_dir, stats)
+    """
+    plugin_root = os.path.join(plugins_dir, plugin_id)
+    installed_dir = resolve_plugin_dir(plugin_root)
+    if not installed_dir:
+        raise ValueError(f"插件未安装，无法增量更新: {plugin_id}")
+
+    config, staging_path, stats = stage_delta(plugins_dir, plugin_id, installed_dir, target_files, fetch_file)
+    try:
+        version_dir = commit_staged(staging_path, plugin_root, config.get("version"))
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    collect_garbage_async(plugin_root, keep)
+    return config, version_dir, stats
+
+
+def activate_staged(plugins_dir, plugin_id, config, staging_path, keep=5):
+    """
+    将暂存目录提交为插件的新版本并切换当前版本，然后在后台清理多余的旧版本
+
+    只包含目录重命名和指针文件替换，可以放在主线程中执行。
+
+    Returns:
+        str: 新版本目录
+    """
+    plugin_root = os.path.join(plugins_dir, plugin_id)
+    try:
+        version_dir = commit_staged(staging_path, plugin_root, config.get("version"))
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+
+    collect_garbage_async(plugin_root, keep)
+    return version_dir
+
+
+def install_package(package_path, plugins_dir, keep=5, progress=None, cancel_event=None):
+    """
+    安装插件包为新版本，并在后台清理多余的旧版本
+
+    Args:
+        package_path: 插件包路径
+        plugins_dir: 插件目录
+        keep: 保留的旧版本数量
+        progress: 解压进度回调，见stage_package
+        cancel_event: 取消安装的threading.Event，见stage_package
+
+    Returns:
+        tuple: (plugin_id, config, version_dir)
+    """
+    plugin_id, config, staging_path = stage_package(package_path, plugins_dir, progress, cancel_event)
+    version_dir = activate_staged(plugins_dir, plugin_id, config, staging_path, keep)
+    return plugin_id, config, version_dir
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件加载分析器 - 记录每个插件导入和入口函数（包括其中的初始化）的耗时
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+from contextlib import contextmanager
+
+
+class PluginLoadRecord:
+    """单个插件一次加载过程的计时记录"""
+
+    def __init__(self, plugin_id, profile=False):
+        self.plugin_id = plugin_id
+        self.timings = {}  # 阶段 -> 毫秒
+        self.modules_before = set(sys.modules)
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile() if profile else None
+        if self.profile:
+            self.profile.enable()
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个加载阶段的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000.0
+
+    def stop(self):
+        """停止计时，返回总耗时（毫秒）"""
+        if self.profile:
+            self.profile.disable()
+        return (time.perf_counter() - self.started) * 1000.0
+
+
+class PluginLoadProfiler:
+    """插件加载分析器"""
+
+    REPORT_FILE = "plugin_load_report.json"
+
+    def __init__(self, report_dir, enabled=False, budget_ms=200.0, keep_profiles=3):
+        """
+        Args:
+            report_dir: 报告和cProfile结果的保存目录
+            enabled: 是否启用分析模式（cProfile采样并保存报告）
+            budget_ms: 单个插件的加载耗时预算，超出时标记
+            keep_profiles: 保留多少个最慢插件的cProfile结果
+        """
+        self.report_dir = report_dir
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.keep_profiles = keep_profiles
+        self.results = {}  # plugin_id -> 最近一次的加载结果
+
+    def begin(self, plugin_id):
+        """开始记录插件加载"""
+        return PluginLoadRecord(plugin_id, profile=self.enabled)
+
+    def finish(self, record, error=None):
+        """
+        结束记录并生成结果
+
+        Returns:
+            dict: {plugin_id, total_ms, import_ms, entry_ms, modules, over_budget, ...}
+        """
+        total_ms = record.stop()
+        new_modules = set(sys.modules) - record.modules_before
+
+        result = {
+            "plugin_id": record.plugin_id,
+            "total_ms": round(total_ms, 3),
+            "modules": len(new_modules),
+            "over_budget": bool(self.budget_ms) and total_ms > self.budget_ms,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        for phase, elapsed in record.timings.items():
+            result[f"{phase}_ms"] = round(elapsed, 3)
+        if error:
+            result["error"] = error
+
+        if result["over_budget"]:
+            print(f"警告: 插件加载超出预算: {record.plugin_id}, "
+                  f"耗时 {total_ms:.1f}ms > {self.budget_ms}ms")
+
+        self.results[record.plugin_id] = result
+
+        if self.enabled:
+            self._save_profile(record, result)
+            self.save_report()
+
+        return result
+
+    def _profile_path(self, plugin_id):
+        return os.path.join(self.report_dir, plugin_id.replace("/", "_") + ".prof")
+
+    def _save_profile(self, record, result):
+        """只保留最慢的几个插件的cProfile结果"""
+        slowest = sorted(self.results.values(), key=lambda r: r["total_ms"], reverse=True)
+        slowest_ids = {r["plugin_id"] for r in slowest[:self.keep_profiles]}
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        if record.plugin_id in slowest_ids:
+            profile_path = self._profile_path(record.plugin_id)
+            pstats.Stats(record.profile).dump_stats(profile_path)
+            result["profile"] = profile_path
+
+        # 删除已经不在最慢列表中的结果
+        for other in self.results.values():
+            if other["plugin_id"] not in slowest_ids and other.pop("profile", None):
+                profile_path = self._profile_path(other["plugin_id"])
+                if os.path.exists(profile_path):
+                    os.remove(profile_path)
+
+    def get_report(self):
+        """获取按总耗时排序的加载报告"""
+        plugins = sorted(self.results.values(), key=lambda r: r["total_ms"], reverse=True)
+        return {
+            "budget_ms": self.budget_ms,
+            "total_ms": round(sum(r["total_ms"] for r in plugins), 3),
+            "over_budget": [r["plugin_id"] for r in plugins if r["over_budget"]],
+            "plugins": plugins,
+        }
+
+    def save_report(self):
+        """保存JSON报告"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        report_path = os.path.join(self.report_dir, self.REPORT_FILE)
+        temp_path = f"{report_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_report(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, report_path)
+        return report_path
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件仓库 - 仓库索引格式、本地缓存同步和索引生成
+
+仓库目录结构:
+    index.json.gz           完整索引
+    changes/<N>.json.gz     从修订号N到当前修订号的增量变更
+    <package>.zip           插件包（路径记录在索引的package字段中）
+    manifests/<id>/<version>.json.gz    插件包的文件清单（路径记录在manifest字段中）
+    objects/<sha256前2位>/<sha256>      按内容寻址的单个文件，供增量更新下载
+
+索引格式:
+    {
+        "format": 1,
+        "revision": 12,
+        "generated": "2023-01-01T00:00:00",
+        "plugins": {
+            "<plugin_id>": {
+                "id", "name", "version", "software", "software_versions",
+                "departments", "size", "sha256", "package", "manifest", "mtime", "revision"
+            }
+        },
+        "removed": {"<plugin_id>": <删除时的修订号>}
+    }
+
+增量变更格式:
+    {"format": 1, "since": N, "revision": 12, "updated": {...}, "removed": [...]}
+"""
+
+import os
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import zipfile
+import tempfile
+from urllib.parse import urlparse, quote
+
+from core.plugin_package import COPY_BUFFER_SIZE, find_plugin_root, get_plugin_id, read_package_config
+
+INDEX_FORMAT = 1
+INDEX_FILE = "index.json.gz"
+CHANGES_DIR = "changes"
+MANIFESTS_DIR = "manifests"
+OBJECTS_DIR = "objects"
+
+# 写入索引的兼容性字段
+COMPATIBILITY_FIELDS = ("software", "software_versions", "departments")
+
+
+def parse_version(version):
+    """将版本号解析为可比较的元组，如 "1.10.2" -> (1, 10, 2)"""
+    result = []
+    for part in str(version or "0").replace("-", ".").split("."):
+        digits = "".join(c for c in part if c.isdigit())
+        result.append(int(digits) if digits else 0)
+    return tuple(result)
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """计算文件的SHA256"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _read_package_config(package_path):
+    """直接从ZIP中央目录读取plugin.json，无需解压"""
+    with zipfile.ZipFile(package_path, 'r') as zip_ref:
+        return read_package_config(zip_ref)
+
+
+def _object_path(sha256):
+    """按内容寻址的文件在仓库中的相对路径"""
+    return f"{OBJECTS_DIR}/{sha256[:2]}/{sha256}"
+
+
+def _build_manifest(package_path, output_dir, manifest):
+    """生成插件包的文件清单，并把其中的文件写入按内容寻址的对象目录"""
+    files = {}
+    with zipfile.ZipFile(package_path, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        root = find_plugin_root([info.filename for info in members])
+        for info in members:
+            if not info.filename.startswith(root) or info.is_dir():
+                continue
+
+            sha = hashlib.sha256()
+            with zip_ref.open(info) as source:
+                for chunk in iter(lambda: source.read(COPY_BUFFER_SIZE), b""):
+                    sha.update(chunk)
+            sha256 = sha.hexdigest()
+            files[info.filename[len(root):]] = {"sha256": sha256, "size": info.file_size}
+
+            object_path = os.path.join(output_dir, *_object_path(sha256).split("/"))
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                temp_path = f"{object_path}.tmp"
+                with zip_ref.open(info) as source, open(temp_path, 'wb') as dest:
+                    shutil.copyfileobj(source, dest, COPY_BUFFER_SIZE)
+                os.replace(temp_path, object_path)
+
+    _dump_gzip_json({"format": INDEX_FORMAT, "files": files},
+                    os.path.join(output_dir, *manifest.split("/")))
+
+
+def _dump_gzip_json(data, file_path):
+    """原子写入gzip压缩的JSON文件"""
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _load_gzip_json(data_or_path):
+    """读取gzip压缩的JSON（文件路径或字节串）"""
+    if isinstance(data_or_path, bytes):
+        return json.loads(gzip.decompress(data_or_path).decode('utf-8'))
+    with gzip.open(data_or_path, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def build_index(packages_dir, output_dir=None, keep_changes=50):
+    """
+    从插件包目录生成仓库索引（参考实现）
+
+    未变化的插件包（大小和修改时间相同）直接复用上一版索引中的哈希，
+    只有内容发生变化时修订号才会递增。
+
+    Args:
+        packages_dir: 存放插件ZIP包的目录
+        output_dir: 索引输出目录，默认与packages_dir相同
+        keep_changes: 保留多少个历史修订号的增量文件
+
+    Returns:
+        dict: 生成的索引
+    """
+    output_dir = output_dir or packages_dir
+    index_path = os.path.join(output_dir, INDEX_FILE)
+
+    previous = {"revision": 0, "plugins": {}, "removed": {}}
+    if os.path.exists(index_path):
+        previous = _load_gzip_json(index_path)
+    previous_plugins = previous.get("plugins", {})
+    revision = previous.get("revision", 0) + 1
+
+    plugins = {}
+    for root, _, files in os.walk(packages_dir):
+        for filename in sorted(files):
+            if not filename.lower().endswith(".zip"):
+                continue
+
+            package_path = os.path.join(root, filename)
+            package = os.path.relpath(package_path, packages_dir).replace('\\', '/')
+            stat = os.stat(package_path)
+
+            try:
+                config = _read_package_config(package_path)
+            except Exception as e:
+                print(f"跳过无效插件包: {package_path}, 错误: {str(e)}")
+                continue
+
+            plugin_id = get_plugin_id(config)
+            old = previous_plugins.get(plugin_id)
+
+            # 文件未变化时复用旧的哈希，避免每次重新读取全部插件包
+            if old and old.get("package") == package and old.get("size") == stat.st_size \
+                    and old.get("mtime") == int(stat.st_mtime):
+                sha256 = old["sha256"]
+            else:
+                sha256 = file_sha256(package_path)
+
+            entry = {
+                "id": plugin_id,
+                "name": config.get("name", plugin_id),
+                "version": config.get("version", "1.0.0"),
+                "description": config.get("description", ""),
+                "size": stat.st_size,
+                "sha256": sha256,
+                "package": package,
+                "manifest": f"{MANIFESTS_DIR}/{plugin_id}/{config.get('version', '1.0.0')}.json.gz",
+                "mtime": int(stat.st_mtime),
+            }
+            for field in COMPATIBILITY_FIELDS:
+                entry[field] = config.get(field, [])
+
+            # 同一插件存在多个包时保留版本最高的
+            current = plugins.get(plugin_id)
+            if current and parse_version(current["version"]) >= parse_version(entry["version"]):
+                continue
+
+            # 生成文件清单（内容变化或清单缺失时）
+            manifest_path = os.path.join(output_dir, *entry["manifest"].split("/"))
+            if not old or old.get("sha256") != sha256 or not os.path.exists(manifest_path):
+                _build_manifest(package_path, output_dir, entry["manifest"])
+
+            # 内容未变化的条目保留原修订号（修改时间不计入变化）
+            if old and all(old.get(k) == v for k, v in entry.items() if k != "mtime"):
+                entry["revision"] = old["revision"]
+            else:
+                entry["revision"] = revision
+            plugins[plugin_id] = entry
+
+    # 记录删除的插件（墓碑），供增量同步使用
+    oldest_revision = max(revision - keep_changes, 0)
+    removed = {plugin_id: rev for plugin_id, rev in previous.get("removed", {}).items()
+               if rev > oldest_revision and plugin_id not in plugins}
+    for plugin_id in previous_plugins:
+        if plugin_id not in plugins:
+            removed[plugin_id] = revision
+
+    changed = any(entry["revision"] == revision for entry in plugins.values()) or \
+        any(rev == revision for rev in removed.values())
+    if not changed and os.path.exists(index_path):
+        # 没有变化，不递增修订号（仍然保存新的修改时间，避免下次重新计算哈希）
+        previous["plugins"] = plugins
+        _dump_gzip_json(previous, index_path)
+        print(f"仓库索引无变化，修订号: {previous['revision']}")
+        return previous
+
+    index = {
+        "format": INDEX_FORMAT,
+        "revision": revision,
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "plugins": plugins,
+        "removed": removed,
+    }
+    _dump_gzip_json(index, index_path)
+
+    # 为最近的修订号生成增量文件（包括当前修订号对应的空变更）
+    changes_dir = os.path.join(output_dir, CHANGES_DIR)
+    for since in range(oldest_revision, revision + 1):
+        _dump_gzip_json({
+            "format": INDEX_FORMAT,
+            "since": since,
+            "revision": revision,
+            "updated": {pid: e for pid, e in plugins.items() if e["revision"] > since},
+            "removed": [pid for pid, rev in removed.items() if rev > since],
+        }, os.path.join(changes_dir, f"{since}.json.gz"))
+
+    # 清理过期的增量文件
+    if os.path.isdir(changes_dir):
+        for filename in os.listdir(changes_dir):
+            name = filename.split(".", 1)[0]
+            if name.isdigit() and int(name) < oldest_revision:
+                os.remove(os.path.join(changes_dir, filename))
+
+    print(f"已生成仓库索引: {index_path}, 修订号: {revision}, 插件数: {len(plugins)}")
+    return index
+
+
+class PluginRepository:
+    """插件仓库客户端 - 负责同步和缓存仓库索引"""
+
+    def __init__(self, url, cache_dir, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.cache_file = os.path.join(
+            cache_dir, hashlib.sha1(self.url.encode('utf-8')).hexdigest()[:16] + ".json.gz")
+        self.index = None
+
+    def _is_remote(self):
+        return urlparse(self.url).scheme in ("http", "https")
+
+    def _fetch(self, relative_path):
+        """获取仓库中的文件内容，文件不存在时返回None"""
+        if self._is_remote():
+            import requests
+            response = requests.get(f"{self.url}/{quote(relative_path)}", timeout=self.timeout)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.content
+
+        # 本地目录或共享盘路径
+        file_path = os.path.join(self.url, *relative_path.split("/"))
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def load_cache(self):
+        """加载本地缓存的索引"""
+        if self.index is None and os.path.exists(self.cache_file):
+            try:
+                self.index = _load_gzip_json(self.cache_file)
+            except Exception as e:
+                print(f"读取仓库索引缓存失败: {self.cache_file}, 错误: {str(e)}")
+        return self.index
+
+    def sync(self):
+        """
+        同步仓库索引
+
+        已有缓存时只请求从缓存修订号开始的增量变更；增量不可用时回退到完整索引。
+
+        Returns:
+            dict: 最新的索引
+        """
+        index = self.load_cache()
+
+        if index and index.get("format") == INDEX_FORMAT:
+            data = self._fetch(f"{CHANGES_DIR}/{index['revision']}.json.gz")
+            if data is not None:
+                changes = _load_gzip_json(data)
+                if changes["revision"] != index["revision"]:
+                    plugins = index["plugins"]
+                    plugins.update(changes.get("updated", {}))
+                    for plugin_id in changes.get("removed", []):
+                        plugins.pop(plugin_id, None)
+                    index["revision"] = changes["revision"]
+                    _dump_gzip_json(index, self.cache_file)
+                return index
+
+        data = self._fetch(INDEX_FILE)
+        if data is None:
+            raise FileNotFoundError(f"仓库索引不存在: {self.url}/{INDEX_FILE}")
+        self.index = _load_gzip_json(data)
+        _dump_gzip_json(self.index, self.cache_file)
+        return self.index
+
+    def get_plugins(self):
+        """获取仓库中的所有插件条目"""
+        index = self.load_cache() or {}
+        return list(index.get("plugins", {}).values())
+
+    def get_plugin(self, plugin_id):
+        """获取指定插件的条目"""
+        index = self.load_cache() or {}
+        return index.get("plugins", {}).get(plugin_id)
+
+    def search(self, text):
+        """按名称、ID或描述搜索插件"""
+        text = text.lower()
+        return [entry for entry in self.get_plugins()
+                if text in entry["id"].lower() or text in entry.get("name", "").lower()
+                or text in entry.get("description", "").lower()]
+
+    def get_compatible_plugins(self, software, version, department):
+        """获取与指定环境兼容的插件条目"""
+        result = []
+        for entry in self.get_plugins():
+            softwares = entry.get("software", [])
+            versions = entry.get("software_versions", [])
+            departments = entry.get("departments", [])
+            if (not softwares or software in softwares) and \
+               (not versions or version in versions) and \
+               (not departments or department in departments):
+                result.append(entry)
+        return result
+
+    def check_updates(self, installed_versions):
+        """
+        检查插件更新
+
+        Args:
+            installed_versions: 已安装插件的版本 {plugin_id: version}
+
+        Returns:
+            list: 有新版本的插件条目
+        """
+        updates = []
+        for plugin_id, version in installed_versions.items():
+            entry = self.get_plugin(plugin_id)
+            if entry and parse_version(entry["version"]) > parse_version(version):
+                updates.append(entry)
+        return updates
+
+    def fetch_manifest(self, entry):
+        """获取插件版本的文件清单 {相对路径: {"sha256", "size"}}"""
+        if not entry.get("manifest"):
+            return None
+        data = self._fetch(entry["manifest"])
+        if data is None:
+            return None
+        return _load_gzip_json(data)["files"]
+
+    def fetch_object(self, sha256):
+        """下载按内容寻址的单个文件"""
+        data = self._fetch(_object_path(sha256))
+        if data is None:
+            raise FileNotFoundError(f"仓库中不存在文件: {sha256}")
+        return data
+
+    def get_package_url(self, entry):
+        """获取插件包的下载地址或本地路径"""
+        if self._is_remote():
+            return f"{self.url}/{quote(entry['package'])}"
+        return os.path.join(self.url, *entry["package"].split("/"))
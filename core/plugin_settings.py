@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件设置存储 - 持久化插件设置，合并写入并在后台延迟保存
+
+每个插件的设置保存为 <settings_dir>/<plugin_id>.json，只保存与plugin.json默认值不同的部分。
+读取时按需加载；修改后在防抖计时器到期（或程序退出）时统一写入磁盘。
+
+合并规则: 以plugin.json中的settings为默认值，用户保存的值逐项覆盖；
+两边都是字典的项递归合并，其它类型直接覆盖；默认值中没有的键同样保留。
+"""
+
+import os
+import copy
+import json
+import time
+import atexit
+import threading
+
+from core.nexus_paths import get_cache_dir, resolve_path
+
+
+def merge_settings(defaults, overrides):
+    """按合并规则把用户设置合并到默认设置上，返回新的字典"""
+    result = copy.deepcopy(defaults) if defaults else {}
+    for key, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_settings(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+_MISSING = object()
+
+
+def strip_defaults(values, defaults):
+    """去掉与默认值相同的项（两边都是字典的项递归比较），返回新的字典"""
+    defaults = defaults or {}
+    result = {}
+    for key, value in values.items():
+        default = defaults.get(key, _MISSING)
+        if isinstance(value, dict) and isinstance(default, dict):
+            nested = strip_defaults(value, default)
+            if nested:
+                result[key] = nested
+        elif default is _MISSING or value != default:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class PluginSettingsStore:
+    """插件设置存储"""
+
+    def __init__(self, settings_dir, flush_delay=1.0, max_delay=5.0):
+        """
+        Args:
+            settings_dir: 设置文件目录
+            flush_delay: 最后一次修改后延迟多少秒写入
+            max_delay: 持续修改时最长多少秒必须写入一次
+        """
+        self.settings_dir = settings_dir
+        self.flush_delay = flush_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.RLock()
+        self._overrides = {}  # plugin_id -> 用户设置（已加载的插件）
+        self._dirty = set()
+        self._dirty_since = None
+        self._timer = None
+
+    def _file_path(self, plugin_id):
+        return os.path.join(self.settings_dir, plugin_id.replace("/", "_") + ".json")
+
+    def _load(self, plugin_id):
+        """按需加载插件的用户设置"""
+        with self._lock:
+            if plugin_id not in self._overrides:
+                overrides = {}
+                file_path = self._file_path(plugin_id)
+                if os.path.exists(file_path):
+                    try:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            overrides = json.load(f)
+                    except Exception as e:
+                        print(f"加载插件设置失败: {file_path}, 错误: {str(e)}")
+                self._overrides[plugin_id] = overrides
+            return self._overrides[plugin_id]
+
+    def get(self, plugin_id, defaults=None):
+        """获取合并后的插件设置"""
+        with self._lock:
+            return merge_settings(defaults, self._load(plugin_id))
+
+    def update(self, plugin_id, values, defaults=None):
+        """
+        修改插件设置（延迟写入）
+
+        Args:
+            defaults: plugin.json中的默认设置，与默认值相同的项不保存
+        """
+        with self._lock:
+            overrides = merge_settings(self._load(plugin_id), values)
+            self._overrides[plugin_id] = strip_defaults(overrides, defaults)
+            self._mark_dirty(plugin_id)
+        return True
+
+    def reset(self, plugin_id, keys=None):
+        """恢复默认设置（全部或指定的键）"""
+        with self._lock:
+            overrides = self._load(plugin_id)
+            if keys is None:
+                overrides.clear()
+            else:
+                for key in keys:
+                    overrides.pop(key, None)
+            self._mark_dirty(plugin_id)
+        return True
+
+    def _mark_dirty(self, plugin_id):
+        """标记需要写入，并重新开始防抖计时"""
+        self._dirty.add(plugin_id)
+        now = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = now
+
+        if self._timer is not None:
+            # 持续修改时不再推迟，保证最长延迟
+            if now - self._dirty_since >= self.max_delay:
+                return
+            self._timer.cancel()
+
+        delay = min(self.flush_delay, max(self.max_delay - (now - self._dirty_since), 0))
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """把所有修改过的插件设置写入磁盘"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty = {plugin_id: copy.deepcopy(self._overrides[plugin_id]) for plugin_id in self._dirty}
+            self._dirty.clear()
+            self._dirty_since = None
+
+        if not dirty:
+            return 0
+
+        os.makedirs(self.settings_dir, exist_ok=True)
+        for plugin_id, overrides in dirty.items():
+            file_path = self._file_path(plugin_id)
+            try:
+                if not overrides:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                    continue
+                temp_path = f"{file_path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(overrides, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, file_path)
+            except Exception as e:
+                print(f"保存插件设置失败: {file_path}, 错误: {str(e)}")
+        return len(dirty)
+
+
+_settings_store = None
+_settings_store_lock = threading.Lock()
+
+
+def configure_settings_store(settings=None):
+    """根据全局设置创建共享的插件设置存储"""
+    global _settings_store
+    settings = settings or {}
+    settings_dir = settings.get("plugin_settings_dir")
+    settings_dir = resolve_path(settings_dir) if settings_dir else get_cache_dir(settings, "plugin_settings")
+
+    with _settings_store_lock:
+        if _settings_store is not None:
+            _settings_store.flush()
+        _settings_store = PluginSettingsStore(settings_dir, settings.get("plugin_settings_flush_delay", 1.0))
+        return _settings_store
+
+
+def get_settings_store():
+    """获取共享的插件设置存储（未配置时使用默认设置）"""
+    if _settings_store is None:
+        return configure_settings_store()
+    return _settings_store
+
+
+def flush_settings():
+    """立即写入所有未保存的插件设置"""
+    if _settings_store is not None:
+        return _settings_store.flush()
+    return 0
+
+
+# 程序退出时保存未写入的设置
+atexit.register(flush_settings)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+插件状态存储 - 使用本地SQLite数据库保存插件的启用状态、安装信息、加载耗时和失败次数
+
+数据库使用WAL模式和忙等待超时，托盘程序和批处理进程可以同时访问。
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plugin_state (
+    plugin_id TEXT PRIMARY KEY,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    version TEXT,
+    installed_at REAL,
+    package_sha256 TEXT,
+    source TEXT,
+    last_load_ms REAL,
+    last_loaded_at REAL,
+    load_count INTEGER NOT NULL DEFAULT 0,
+    failure_count INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_plugin_state_enabled ON plugin_state (enabled);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class PluginStateStore:
+    """插件状态存储"""
+
+    def __init__(self, db_path, timeout=10.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()  # 每个线程使用独立的连接
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                               (str(SCHEMA_VERSION),))
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=self.timeout)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """关闭当前线程的连接"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _upsert(self, plugin_id, **fields):
+        """插入或更新插件状态的部分字段"""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self._connect() as connection:
+            connection.execute(
+                f"INSERT INTO plugin_state (plugin_id, {columns}) VALUES (?, {placeholders}) "
+                f"ON CONFLICT(plugin_id) DO UPDATE SET {updates}",
+                (plugin_id, *fields.values())
+            )
+
+    def get_meta(self, key, default=None):
+        """读取元数据"""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        """写入元数据"""
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def get_disabled(self):
+        """获取所有被禁用的插件ID（一次索引查询）"""
+        rows = self._connect().execute("SELECT plugin_id FROM plugin_state WHERE enabled = 0").fetchall()
+        return {row["plugin_id"] for row in rows}
+
+    def is_enabled(self, plugin_id):
+        """插件是否启用（没有记录时默认启用）"""
+        row = self._connect().execute(
+            "SELECT enabled FROM plugin_state WHERE plugin_id = ?", (plugin_id,)).fetchone()
+        return bool(row["enabled"]) if row else True
+
+    def set_enabled(self, plugin_id, enabled):
+        """设置插件的启用状态"""
+        self._upsert(plugin_id, enabled=1 if enabled else 0)
+
+    def record_install(self, plugin_id, version, package_sha256=None, source=None):
+        """记录插件安装信息"""
+        self._upsert(plugin_id, version=version, installed_at=time.time(),
+                     package_sha256=package_sha256, source=source)
+
+    def record_load(self, plugin_id, elapsed_ms):
+        """记录一次成功加载的耗时"""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO plugin_state (plugin_id, last_load_ms, last_loaded_at, load_count, updated_at) "
+                "VALUES (?, ?, ?, 1, ?) ON CONFLICT(plugin_id) DO UPDATE SET "
+                "last_load_ms = excluded.last_load_ms, last_loaded_at = excluded.last_loaded_at, "
+                "load_count = load_count + 1, updated_at = excluded.updated_at",
+                (plugin_id, elapsed_ms, time.time(), time.time())
+            )
+
+    def record_failure(self, plugin_id, error):
+        """记录一次加载失败"""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO plugin_state (plugin_id, failure_count, last_error, updated_at) "
+                "VALUES (?, 1, ?, ?) ON CONFLICT(plugin_id) DO UPDATE SET "
+                "failure_count = failure_count + 1, last_error = excluded.last_error, "
+                "updated_at = excluded.updated_at",
+                (plugin_id, error, time.time())
+            )
+
+    def get_state(self, plugin_id):
+        """获取单个插件的状态"""
+        row = self._connect().execute(
+            "SELECT * FROM plugin_state WHERE plugin_id = ?", (plugin_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_all(self):
+        """获取所有插件的状态 {plugin_id: state}"""
+        rows = self._connect().execute("SELECT * FROM plugin_state").fetchall()
+        return {row["plugin_id"]: dict(row) for row in rows}
+
+    def remove(self, plugin_id):
+        """删除插件的状态记录"""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM plugin_state WHERE plugin_id = ?", (plugin_id,))
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮批处理 - 在多个mayapy进程中对大量场景批量绑定蒙皮、导出或导入权重，或增量重建绑定
+
+任务描述文件（JSON或YAML）:
+    operation   "bind", "export", "import" 或 "rig"
+    scenes      场景文件或通配符列表（相对路径相对于任务文件所在目录）
+    meshes, joints, bind, weights_dir, output_dir, rig_build, force
+                见 scripts/maya/character/skin_batch_worker.py
+    mayapy      mayapy路径（可选）
+    workers     工作进程数（可选，默认为CPU核数）
+    timeout     单个场景的超时时间（秒，可选）
+
+weights_dir和output_dir中保留场景相对于所有场景的共同目录的子目录结构，
+不同目录中的同名场景不会互相覆盖。
+
+每个工作进程只启动一次Maya，依次处理分配给它的场景；进程崩溃或超时后自动重启。
+每个场景的结果追加写入任务文件旁的日志（<任务文件名>.journal.jsonl），
+重新运行同一任务时跳过已完成的场景，因此中断后可以继续。
+"""
+
+import os
+import glob
+import json
+import time
+import queue
+import shutil
+import threading
+import subprocess
+
+from core.nexus_paths import NEXUS_HOME
+
+# 工作进程脚本
+WORKER_SCRIPT = os.path.join(NEXUS_HOME, "scripts", "maya", "character", "skin_batch_worker.py")
+
+# 与工作进程约定的结果行前缀（见 skin_batch_worker.RESULT_PREFIX）
+RESULT_PREFIX = "NEXUS_BATCH_RESULT "
+
+OPERATIONS = ("bind", "export", "import", "rig")
+
+# 传给工作进程的任务字段
+TASK_FIELDS = ("operation", "meshes", "joints", "bind", "weights_dir", "output_dir", "rig_build", "force",
+               "scene_root")
+
+
+def load_job(job_path):
+    """读取任务描述文件（.yaml/.yml需要yaml模块）"""
+    with open(job_path, 'r', encoding='utf-8') as f:
+        if job_path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            job = yaml.safe_load(f) or {}
+        else:
+            job = json.load(f)
+
+    if job.get("operation") not in OPERATIONS:
+        raise ValueError(f"不支持的批处理操作: {job.get('operation')}")
+    if job["operation"] in ("export", "import") and not job.get("weights_dir"):
+        raise ValueError("导出和导入权重需要设置weights_dir")
+    if job["operation"] == "rig" and not job.get("rig_build"):
+        raise ValueError("重建绑定需要设置rig_build")
+
+    # 相对路径相对于任务文件所在目录
+    base_dir = os.path.dirname(os.path.abspath(job_path))
+    for key in ("weights_dir", "output_dir", "rig_build"):
+        if job.get(key):
+            job[key] = os.path.join(base_dir, job[key])
+    job["scenes"] = expand_scenes(job.get("scenes", []), base_dir)
+    job["scene_root"] = scene_root(job["scenes"])
+    return job
+
+
+def expand_scenes(patterns, base_dir):
+    """展开场景通配符，返回去重后的绝对路径列表"""
+    scenes = []
+    for pattern in patterns:
+        pattern = os.path.join(base_dir, os.path.expandvars(pattern))
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            path = os.path.normpath(os.path.abspath(path))
+            if path not in scenes:
+                scenes.append(path)
+    return scenes
+
+
+def scene_root(scenes):
+    """所有场景所在目录的共同目录（场景在不同盘符上时为None，输出中保留完整路径）"""
+    if not scenes:
+        return None
+    try:
+        return os.path.commonpath([os.path.dirname(scene) for scene in scenes])
+    except ValueError:
+        return None
+
+
+def find_mayapy(job=None, explicit=None):
+    """
+    查找mayapy: 参数 > 任务描述 > 环境变量NEXUS_MAYAPY > environments.yaml中Maya所在目录 > PATH
+    """
+    candidates = [explicit, (job or {}).get("mayapy"), os.environ.get("NEXUS_MAYAPY")]
+    try:
+        import yaml
+        with open(os.path.join(NEXUS_HOME, "config", "environments.yaml"), 'r', encoding='utf-8') as f:
+            environments = yaml.safe_load(f) or []
+        for environment in environments:
+            if environment.get("software") == "Maya" and environment.get("executable_path"):
+                bin_dir = os.path.dirname(environment["executable_path"])
+                candidates.append(os.path.join(bin_dir, "mayapy.exe" if os.name == "nt" else "mayapy"))
+    except Exception:
+        pass
+
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    found = shutil.which("mayapy")
+    if found:
+        return found
+    raise FileNotFoundError("找不到mayapy，请通过--mayapy或任务描述中的mayapy指定")
+
+
+class BatchJournal:
+    """批处理日志: 每个场景一行JSON，只追加写入，崩溃时最多丢失正在处理的场景"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取每个场景最后一次的结果"""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的行
+                records[record["scene"]] = record
+        return records
+
+    def append(self, record):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class WorkerProcess:
+    """一个mayapy工作进程"""
+
+    def __init__(self, mayapy, log_path):
+        self.mayapy = mayapy
+        self.log_path = log_path
+        self.process = None
+        self._log = None
+
+    def start(self):
+        environment = dict(os.environ)
+        environment["NEXUS_HOME"] = NEXUS_HOME
+        environment["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [os.path.dirname(WORKER_SCRIPT), NEXUS_HOME, environment.get("PYTHONPATH")]))
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        self.process = subprocess.Popen(
+            [self.mayapy, "-u", WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self._log,
+            env=environment, text=True, encoding='utf-8', errors='replace', bufsize=1)
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, task, timeout=None):
+        """发送一个任务并等待结果，进程无法启动、退出或超时时返回失败结果"""
+        if not self.alive:
+            try:
+                self.start()
+            except OSError as e:
+                return {"id": task["id"], "status": "failed", "error": f"无法启动工作进程: {str(e)}",
+                        "timings": {}}
+
+        expired = threading.Event()
+
+        def expire():
+            expired.set()
+            self.process.kill()
+
+        timer = threading.Timer(timeout, expire) if timeout else None
+        try:
+            if timer:
+                timer.start()
+            self.process.stdin.write(json.dumps(task, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if line.startswith(RESULT_PREFIX):
+                    return json.loads(line[len(RESULT_PREFIX):])
+                self._log.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if timer:
+                timer.cancel()
+
+        # 没有收到结果: 进程崩溃、被超时终止，或结果无法解析（此时进程仍在运行，结束后重启）
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        reason = "超时" if expired.is_set() else f"退出码 {self.process.returncode}"
+        return {"id": task["id"], "status": "failed", "error": f"工作进程异常结束（{reason}）", "timings": {}}
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._log:
+            self._log.close()
+
+
+def _format_timings(timings):
+    labels = {"open": "打开", "operation": "处理", "save": "保存"}
+    return ", ".join(f"{labels.get(name, name)} {seconds:.1f}秒" for name, seconds in timings.items())
+
+
+def run_batch(job_path, mayapy=None, workers=None, progress=print):
+    """
+    运行批处理任务
+
+    Args:
+        job_path: 任务描述文件
+        mayapy: mayapy路径，默认自动查找
+        workers: 工作进程数，默认为任务描述中的workers或CPU核数
+        progress: 输出进度的函数
+
+    Returns:
+        dict: {"done", "failed", "skipped", "seconds", "journal"}
+    """
+    job = load_job(job_path)
+    mayapy = find_mayapy(job, mayapy)
+    job_base = os.path.splitext(os.path.abspath(job_path))[0]
+    journal = BatchJournal(job_base + ".journal.jsonl")
+
+    finished = {scene for scene, record in journal.load().items() if record.get("status") == "done"}
+    scenes = [scene for scene in job["scenes"] if scene not in finished]
+    skipped = len(job["scenes"]) - len(scenes)
+    if skipped:
+        progress(f"跳过已完成的场景: {skipped}个")
+
+    workers = max(1, min(workers or job.get("workers") or os.cpu_count() or 1, len(scenes) or 1))
+    tasks = queue.Queue()
+    for index, scene in enumerate(scenes):
+        task = {key: job[key] for key in TASK_FIELDS if job.get(key) is not None}
+        task.update({"id": index, "scene": scene})
+        tasks.put(task)
+
+    counts = {"done": 0, "failed": 0}
+    lock = threading.Lock()
+    started = time.time()
+
+    def record_result(task, result):
+        record = {"scene": task["scene"], "operation": job["operation"], "status": result["status"],
+                  "seconds": result.get("seconds"), "timings": result.get("timings", {}),
+                  "details": result.get("details"), "error": result.get("error"), "time": time.time()}
+        try:
+            journal.append(record)
+        except OSError as e:
+            progress(f"写入批处理日志失败: {journal.path}, 错误: {str(e)}")
+        with lock:
+            counts[result["status"]] += 1
+            number = counts["done"] + counts["failed"]
+        name = os.path.basename(task["scene"])
+        if result["status"] == "done":
+            progress(f"[{number}/{len(scenes)}] {name} 完成 {result.get('seconds', 0):.1f}秒 "
+                     f"({_format_timings(result['timings'])})")
+        else:
+            progress(f"[{number}/{len(scenes)}] {name} 失败: {(result['error'] or '').splitlines()[0]}")
+
+    def work(worker_index):
+        log_path = f"{job_base}.worker{worker_index}.log"
+        worker = WorkerProcess(mayapy, log_path)
+        try:
+            while True:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                # 单个场景的任何异常都记为失败，不能让线程退出而留下未处理的场景
+                try:
+                    result = worker.run(task, job.get("timeout"))
+                except Exception as e:
+                    result = {"id": task["id"], "status": "failed", "error": f"调度工作进程失败: {str(e)}",
+                              "timings": {}}
+                record_result(task, result)
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=work, args=(index,), daemon=True) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 所有工作线程都异常退出时队列中剩下的场景记为失败
+    while True:
+        try:
+            task = tasks.get_nowait()
+        except queue.Empty:
+            break
+        record_result(task, {"id": task["id"], "status": "failed", "error": "没有被处理（工作线程异常退出）",
+                             "timings": {}})
+
+    summary = {"done": counts["done"], "failed": counts["failed"], "skipped": skipped,
+               "seconds": time.time() - started, "journal": journal.path}
+    progress(f"批处理完成: 完成 {summary['done']}, 失败 {summary['failed']}, 跳过 {skipped}, "
+             f"{workers}个进程, 总耗时 {summary['seconds']:.1f}秒")
+    return summary
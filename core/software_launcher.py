@@ -73,6 +73,10 @@ class SoftwareLauncher:
             else:
                 env[key] = value
         
+        # 部门信息供启动脚本记录使用统计和选择自动加载配置
+        if environment.get("department"):
+            env["NEXUS_DEPARTMENT"] = environment["department"]
+        
         # 处理启动脚本
         cmd_args = []
         startup_script = environment.get("startup_script")
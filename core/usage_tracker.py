@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+使用统计 - 按部门和用户记录每次启动中实际使用的Maya插件和菜单工具，并生成自动加载配置
+
+每次启动软件记为一个会话；同一会话中多次使用同一项只记一次会话命中。
+生成配置时，最近若干天内在足够比例的会话中用到的项会在启动时立即加载，其余按需加载。
+用户自己的会话数不足时使用整个部门的统计。
+
+数据保存在每个用户本机的SQLite数据库中（WAL模式，多个软件进程可以同时写入；WAL不能用于网络共享，
+因此数据库不能放在共享盘上）。部门统计不共享数据库: 每个用户把自己最近的会话导出为共享目录中的一个
+JSON文件（export_usage），统计部门时汇总这些文件和本机数据库。
+"""
+
+import os
+import re
+import json
+import time
+import getpass
+import sqlite3
+import threading
+
+# 使用项类型
+MAYA_PLUGIN = "maya_plugin"
+MENU_TOOL = "menu_tool"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage_session (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    department TEXT NOT NULL,
+    username TEXT NOT NULL,
+    software TEXT,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_session_department ON usage_session (department, started_at);
+CREATE TABLE IF NOT EXISTS usage_item (
+    session_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    last_used REAL,
+    PRIMARY KEY (session_id, kind, name)
+);
+"""
+
+
+def get_current_user():
+    """当前用户名（优先使用Nexus启动时设置的NEXUS_USER）"""
+    return os.environ.get("NEXUS_USER") or getpass.getuser()
+
+
+def usage_export_path(export_dir, username=None):
+    """用户的使用统计导出文件路径（共享目录中每个用户一个文件）"""
+    name = re.sub(r"[^\w.-]", "_", username or get_current_user())
+    return os.path.join(export_dir, f"{name}.json")
+
+
+class UsageTracker:
+    """使用统计"""
+
+    def __init__(self, db_path, timeout=10.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()  # 每个线程使用独立的连接
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=self.timeout)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def start_session(self, department, username=None, software=None):
+        """开始一个会话，返回会话ID"""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO usage_session (department, username, software, started_at) VALUES (?, ?, ?, ?)",
+                (department, username or get_current_user(), software, time.time())
+            )
+            return cursor.lastrowid
+
+    def record_use(self, session_id, kind, name):
+        """记录一次使用"""
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO usage_item (session_id, kind, name, use_count, last_used) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT(session_id, kind, name) DO UPDATE SET "
+                "use_count = use_count + 1, last_used = excluded.last_used",
+                (session_id, kind, name, time.time())
+            )
+
+    def _local_counts(self, department, username, since):
+        """本机数据库中的 (会话数, {(kind, name): 命中会话数})"""
+        conditions = "department = ? AND started_at >= ?"
+        params = [department, since]
+        if username:
+            conditions += " AND username = ?"
+            params.append(username)
+
+        connection = self._connect()
+        sessions = connection.execute(
+            f"SELECT COUNT(*) FROM usage_session WHERE {conditions}", params).fetchone()[0]
+        if not sessions:
+            return 0, {}
+
+        rows = connection.execute(
+            "SELECT kind, name, COUNT(*) AS hits FROM usage_item WHERE session_id IN "
+            f"(SELECT session_id FROM usage_session WHERE {conditions}) GROUP BY kind, name",
+            params
+        ).fetchall()
+        return sessions, {(row["kind"], row["name"]): row["hits"] for row in rows}
+
+    @staticmethod
+    def _exported_counts(export_dir, department, since, exclude_user=None):
+        """其他用户导出文件中的 (会话数, {(kind, name): 命中会话数})，读取失败的文件跳过"""
+        sessions = 0
+        hits = {}
+        if not export_dir or not os.path.isdir(export_dir):
+            return sessions, hits
+        for file_name in sorted(os.listdir(export_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(export_dir, file_name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取使用统计文件失败: {file_name}, 错误: {str(e)}")
+                continue
+            if exclude_user and data.get("username") == exclude_user:
+                continue  # 自己的会话已在本机数据库中
+            for session in data.get("sessions", []):
+                if session.get("department") != department or session.get("started_at", 0) < since:
+                    continue
+                sessions += 1
+                for kind, name in {tuple(item) for item in session.get("items", [])}:
+                    hits[(kind, name)] = hits.get((kind, name), 0) + 1
+        return sessions, hits
+
+    def get_usage(self, department, username=None, window_days=30, export_dir=None):
+        """
+        统计最近window_days天内各项被使用的会话比例
+
+        Args:
+            department: 部门
+            username: 只统计该用户（本机数据库），为None时统计整个部门
+            window_days: 统计最近多少天
+            export_dir: 统计部门时汇总的共享导出目录（见export_usage），为None时只统计本机数据库
+
+        Returns:
+            tuple: (会话数, {(kind, name): 会话比例})
+        """
+        since = time.time() - window_days * 86400
+        sessions, hits = self._local_counts(department, username, since)
+        if username is None and export_dir:
+            other_sessions, other_hits = self._exported_counts(export_dir, department, since, get_current_user())
+            sessions += other_sessions
+            for key, count in other_hits.items():
+                hits[key] = hits.get(key, 0) + count
+        if not sessions:
+            return 0, {}
+        return sessions, {key: count / sessions for key, count in hits.items()}
+
+    def export_usage(self, file_path, username=None, window_days=30):
+        """
+        把用户最近window_days天的会话导出为JSON文件（原子替换），供其他用户统计部门时汇总
+
+        Returns:
+            int: 导出的会话数
+        """
+        username = username or get_current_user()
+        since = time.time() - window_days * 86400
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT session_id, department, software, started_at FROM usage_session "
+            "WHERE username = ? AND started_at >= ? ORDER BY session_id", (username, since)).fetchall()
+        items = {}
+        for row in connection.execute(
+                "SELECT session_id, kind, name FROM usage_item WHERE session_id IN "
+                "(SELECT session_id FROM usage_session WHERE username = ? AND started_at >= ?)", (username, since)):
+            items.setdefault(row["session_id"], []).append([row["kind"], row["name"]])
+
+        data = {
+            "username": username,
+            "exported_at": time.time(),
+            "sessions": [{"department": row["department"], "software": row["software"],
+                          "started_at": row["started_at"], "items": items.get(row["session_id"], [])}
+                         for row in rows],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+        return len(rows)
+
+    def build_profile(self, department, username=None, candidates=None, min_ratio=0.3,
+                      window_days=30, min_sessions=5, export_dir=None):
+        """
+        生成自动加载配置
+
+        Args:
+            department: 部门
+            username: 用户名，用户的会话数不足min_sessions时使用部门统计
+            candidates: {kind: [name]} 需要划分的全部项，不在统计中的项按需加载
+            min_ratio: 使用比例达到多少时启动时立即加载
+            window_days: 统计最近多少天
+            min_sessions: 统计至少需要的会话数，不足时返回None（调用方应全部立即加载）
+            export_dir: 部门统计汇总的共享导出目录，见get_usage
+
+        Returns:
+            dict: {"source": "user"|"department", "sessions": n,
+                   "eager": {kind: [name]}, "lazy": {kind: [name]}}
+        """
+        source = "user"
+        sessions, usage = self.get_usage(department, username, window_days) if username else (0, {})
+        if sessions < min_sessions:
+            source = "department"
+            sessions, usage = self.get_usage(department, None, window_days, export_dir)
+        if sessions < min_sessions:
+            return None
+
+        candidates = candidates or {}
+        kinds = set(candidates) | {kind for kind, _ in usage}
+        profile = {"source": source, "sessions": sessions, "eager": {}, "lazy": {}}
+        for kind in kinds:
+            names = list(candidates.get(kind, [])) + sorted(
+                name for item_kind, name in usage if item_kind == kind and name not in candidates.get(kind, []))
+            profile["eager"][kind] = [name for name in names if usage.get((kind, name), 0) >= min_ratio]
+            profile["lazy"][kind] = [name for name in names if usage.get((kind, name), 0) < min_ratio]
+        return profile
+
+    def prune(self, keep_days=180):
+        """删除过期的会话记录"""
+        since = time.time() - keep_days * 86400
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM usage_item WHERE session_id IN "
+                "(SELECT session_id FROM usage_session WHERE started_at < ?)", (since,))
+            connection.execute("DELETE FROM usage_session WHERE started_at < ?", (since,))
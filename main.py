@@ -7,6 +7,7 @@ Nexus - 3D软件环境管理和工具启动器
 import sys
 import os
 import yaml
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import QObject
@@ -27,7 +28,7 @@ class NexusApp(QObject):
         self.environments = self.config_manager.get_environments()
         
         # 创建插件管理器
-        self.plugin_manager = PluginManager()
+        self.plugin_manager = PluginManager(settings=self.config_manager.settings)
         
         # 创建启动器
         self.launcher = SoftwareLauncher()
@@ -123,6 +124,9 @@ class NexusApp(QObject):
         )
 
 def main():
+    # 打包为可执行文件时，插件宿主进程需要
+    multiprocessing.freeze_support()
+    
     # 创建应用
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)  # 关闭窗口时不退出应用
@@ -140,6 +144,9 @@ def main():
     # 创建主应用
     nexus = NexusApp()
     
+    # 退出时卸载插件并保存插件设置
+    app.aboutToQuit.connect(nexus.plugin_manager.shutdown)
+    
     # 运行应用
     sys.exit(app.exec_())
 
@@ -4,6 +4,12 @@
 Nexus基础插件类 - 所有插件应该继承这个类
 """
 
+import copy
+
+from core.plugin_cache import get_cache_service
+from core.plugin_executor import get_executor_service
+from core.plugin_settings import get_settings_store
+
 class BasePlugin:
     def __init__(self, config):
         """
@@ -14,6 +20,7 @@ class BasePlugin:
         """
         self.config = config
         self.name = config.get("name", "未命名插件")
+        self.plugin_id = config.get("id") or self.name.lower().replace(" ", "_")
         self.version = config.get("version", "1.0.0")
         self.author = config.get("author", "未知作者")
         self.description = config.get("description", "")
@@ -21,6 +28,42 @@ class BasePlugin:
         self.versions = config.get("software_versions", [])
         self.departments = config.get("departments", [])
         self.initialized = False
+        self._cache = None
+        self._executor = None
+        
+        # plugin.json中的默认设置；config["settings"]始终为合并了用户设置后的当前值
+        self._default_settings = copy.deepcopy(config.get("settings", {}))
+        self.config["settings"] = get_settings_store().get(self.plugin_id, self._default_settings)
+    
+    @property
+    def cache(self):
+        """
+        插件的缓存命名空间（内存LRU + 当前用户本地磁盘），首次访问时创建
+        
+        可在plugin.json中用cache_quota_mb指定磁盘容量上限，cache_ttl指定默认过期秒数
+        """
+        if self._cache is None:
+            self._cache = get_cache_service().namespace(
+                self.plugin_id,
+                quota_mb=self.config.get("cache_quota_mb"),
+                default_ttl=self.config.get("cache_ttl")
+            )
+        return self._cache
+    
+    @property
+    def executor(self):
+        """
+        插件的后台任务执行器（所有插件共享的有界线程池）
+        
+        用法:
+            self.executor.submit(self.scan_assets, project, on_done=self.on_scan_done)
+        
+        on_done回调在主线程中调用；插件卸载时未开始的任务会被自动取消，
+        长时间运行的任务应定期检查 current_cancel_event()（core.plugin_executor，任务提交时的取消事件）
+        """
+        if self._executor is None:
+            self._executor = get_executor_service().for_plugin(self.plugin_id)
+        return self._executor
     
     def initialize(self):
         """
@@ -51,21 +94,36 @@ class BasePlugin:
         Returns:
             bool: 卸载是否成功
         """
+        if self._executor is not None:
+            self._executor.cancel_all()
         self.initialized = False
         return True
     
     def get_settings(self):
         """
-        获取插件设置
+        获取插件设置（plugin.json中的默认值合并已保存的用户设置）
         
         Returns:
             dict: 插件设置
         """
-        return self.config.get("settings", {})
+        return get_settings_store().get(self.plugin_id, self._default_settings)
+    
+    def get_setting(self, key, default=None):
+        """
+        获取单个设置项
+        
+        Args:
+            key: 设置项名称
+            default: 设置项不存在时的默认值
+            
+        Returns:
+            设置项的值
+        """
+        return self.get_settings().get(key, default)
     
     def update_settings(self, settings):
         """
-        更新插件设置
+        更新插件设置，修改会合并后延迟写入磁盘（只保存与默认值不同的项）
         
         Args:
             settings: 新的设置值
@@ -73,11 +131,23 @@ class BasePlugin:
         Returns:
             bool: 更新是否成功
         """
-        if "settings" not in self.config:
-            self.config["settings"] = {}
+        result = get_settings_store().update(self.plugin_id, settings, self._default_settings)
+        self.config["settings"] = self.get_settings()
+        return result
+    
+    def reset_settings(self, keys=None):
+        """
+        恢复默认设置
         
-        self.config["settings"].update(settings)
-        return True
+        Args:
+            keys: 要恢复的设置项，默认恢复全部
+            
+        Returns:
+            bool: 恢复是否成功
+        """
+        result = get_settings_store().reset(self.plugin_id, keys)
+        self.config["settings"] = self.get_settings()
+        return result
     
     def is_compatible(self, software, version, department):
         """
@@ -4,134 +4,76 @@
 角色绑定工具 - 提供角色绑定相关功能
 """
 
+import os
+import time
 import maya.cmds as cmds
 import maya.mel as mel
 
+from rig_build_steps import build_rig
+from skeleton_builder import build_skeleton, mirror_joints, read_skeleton
+from skeleton_template import list_templates, load_template, save_template, template_dirs
+
+# 骨架模板菜单中的自定义项（从文件选择模板）
+CUSTOM_TEMPLATE = "自定义..."
+
+# 记录上次使用的构建描述文件
+RIG_BUILD_OPTION = "nexusRigBuildFile"
+
 def create_skeleton():
     """创建基础骨架"""
     # 显示一个简单的UI窗口
     if cmds.window("createSkeletonWindow", exists=True):
         cmds.deleteUI("createSkeletonWindow")
     
-    window = cmds.window("createSkeletonWindow", title="创建骨架", widthHeight=(300, 200))
+    window = cmds.window("createSkeletonWindow", title="创建骨架", widthHeight=(320, 220))
     cmds.columnLayout(adjustableColumn=True, rowSpacing=10, columnOffset=["both", 10])
     
-    cmds.text(label="选择骨架类型:")
-    cmds.radioButtonGrp("skeletonType", label="骨架类型", labelArray3=["人形", "四足", "自定义"], numberOfRadioButtons=3, select=1)
+    cmds.text(label="选择骨架模板:")
+    cmds.optionMenu("skeletonTemplate", label="骨架模板")
+    for name in list_templates():
+        cmds.menuItem(label=name)
+    cmds.menuItem(label=CUSTOM_TEMPLATE)
+    cmds.textFieldGrp("skeletonPrefix", label="名称前缀", text="")
     
     cmds.separator(height=10, style="in")
     
     cmds.button(label="创建", command=lambda x: _create_skeleton_cmd())
+    cmds.button(label="保存选中骨架为模板", command=lambda x: _save_skeleton_template_cmd())
     cmds.button(label="关闭", command=lambda x: cmds.deleteUI(window))
     
     cmds.showWindow(window)
 
 def _create_skeleton_cmd():
     """创建骨架的具体命令"""
-    skeleton_type = cmds.radioButtonGrp("skeletonType", query=True, select=True)
-    
-    # 根据选择的类型创建不同的骨架
-    if skeleton_type == 1:  # 人形
-        # 创建一个简单的人形骨架
-        cmds.select(clear=True)
-        root = cmds.joint(p=(0, 0, 0), name="root")
-        spine1 = cmds.joint(p=(0, 5, 0), name="spine1")
-        spine2 = cmds.joint(p=(0, 10, 0), name="spine2")
-        neck = cmds.joint(p=(0, 15, 0), name="neck")
-        head = cmds.joint(p=(0, 20, 0), name="head")
-        
-        # 返回到spine2
-        cmds.select("spine2")
-        
-        # 创建左臂
-        cmds.joint(p=(5, 10, 0), name="l_clavicle")
-        l_shoulder = cmds.joint(p=(10, 10, 0), name="l_shoulder")
-        l_elbow = cmds.joint(p=(15, 10, 0), name="l_elbow")
-        l_wrist = cmds.joint(p=(20, 10, 0), name="l_wrist")
-        
-        # 返回到spine2
-        cmds.select("spine2")
-        
-        # 创建右臂
-        cmds.joint(p=(-5, 10, 0), name="r_clavicle")
-        r_shoulder = cmds.joint(p=(-10, 10, 0), name="r_shoulder")
-        r_elbow = cmds.joint(p=(-15, 10, 0), name="r_elbow")
-        r_wrist = cmds.joint(p=(-20, 10, 0), name="r_wrist")
-        
-        # 返回到root
-        cmds.select("root")
-        
-        # 创建左腿
-        cmds.joint(p=(2, 0, 0), name="l_hip")
-        l_knee = cmds.joint(p=(2, -10, 0), name="l_knee")
-        l_ankle = cmds.joint(p=(2, -20, 0), name="l_ankle")
-        l_foot = cmds.joint(p=(2, -20, 5), name="l_foot")
-        
-        # 返回到root
-        cmds.select("root")
-        
-        # 创建右腿
-        cmds.joint(p=(-2, 0, 0), name="r_hip")
-        r_knee = cmds.joint(p=(-2, -10, 0), name="r_knee")
-        r_ankle = cmds.joint(p=(-2, -20, 0), name="r_ankle")
-        r_foot = cmds.joint(p=(-2, -20, 5), name="r_foot")
-        
-        cmds.select(clear=True)
-        
-    elif skeleton_type == 2:  # 四足
-        # 创建一个简单的四足骨架
-        cmds.select(clear=True)
-        root = cmds.joint(p=(0, 10, 0), name="root")
-        spine1 = cmds.joint(p=(0, 10, 5), name="spine1")
-        spine2 = cmds.joint(p=(0, 10, 10), name="spine2")
-        spine3 = cmds.joint(p=(0, 10, 15), name="spine3")
-        neck = cmds.joint(p=(0, 12, 20), name="neck")
-        head = cmds.joint(p=(0, 15, 25), name="head")
-        
-        # 前腿
-        cmds.select("spine1")
-        
-        # 创建左前腿
-        cmds.joint(p=(5, 10, 5), name="l_frontLeg1")
-        l_frontLeg2 = cmds.joint(p=(5, 5, 5), name="l_frontLeg2")
-        l_frontFoot = cmds.joint(p=(5, 0, 5), name="l_frontFoot")
-        
-        # 创建右前腿
-        cmds.select("spine1")
-        cmds.joint(p=(-5, 10, 5), name="r_frontLeg1")
-        r_frontLeg2 = cmds.joint(p=(-5, 5, 5), name="r_frontLeg2")
-        r_frontFoot = cmds.joint(p=(-5, 0, 5), name="r_frontFoot")
-        
-        # 后腿
-        cmds.select("spine3")
-        
-        # 创建左后腿
-        cmds.joint(p=(5, 10, 15), name="l_backLeg1")
-        l_backLeg2 = cmds.joint(p=(5, 5, 15), name="l_backLeg2")
-        l_backFoot = cmds.joint(p=(5, 0, 15), name="l_backFoot")
-        
-        # 创建右后腿
-        cmds.select("spine3")
-        cmds.joint(p=(-5, 10, 15), name="r_backLeg1")
-        r_backLeg2 = cmds.joint(p=(-5, 5, 15), name="r_backLeg2")
-        r_backFoot = cmds.joint(p=(-5, 0, 15), name="r_backFoot")
-        
-        # 尾巴
-        cmds.select("spine3")
-        tail1 = cmds.joint(p=(0, 10, 20), name="tail1")
-        tail2 = cmds.joint(p=(0, 10, 25), name="tail2")
-        tail3 = cmds.joint(p=(0, 10, 30), name="tail3")
-        
-        cmds.select(clear=True)
-        
-    else:  # 自定义
-        # 显示提示信息
+    template_name = cmds.optionMenu("skeletonTemplate", query=True, value=True)
+    prefix = cmds.textFieldGrp("skeletonPrefix", query=True, text=True).strip()
+    
+    # 自定义模板从文件读取
+    if template_name == CUSTOM_TEMPLATE:
+        paths = cmds.fileDialog2(
+            fileFilter="骨架模板 (*.json *.yaml *.yml)",
+            dialogStyle=2,
+            caption="选择骨架模板",
+            fileMode=1
+        )
+        if not paths:
+            return
+        template_path = paths[0]
+    else:
+        template_path = list_templates().get(template_name)
+    
+    try:
+        start_time = time.time()
+        joints = build_skeleton(load_template(template_path), prefix=prefix)
+        print(f"骨架创建完成: {len(joints)}个骨骼，耗时 {(time.time() - start_time) * 1000.0:.1f}ms")
+    except Exception as e:
         cmds.confirmDialog(
-            title="自定义骨架",
-            message="暂不支持自定义骨架，请手动创建或联系技术支持。",
+            title="错误",
+            message=f"创建骨架失败: {str(e)}",
             button=["确定"],
             defaultButton="确定"
         )
+        return
     
     # 关闭窗口
     if cmds.window("createSkeletonWindow", exists=True):
@@ -145,6 +87,47 @@ def _create_skeleton_cmd():
         fadeOutTime=2.0
     )
 
+def _save_skeleton_template_cmd():
+    """把选中的根骨骼及其子骨骼保存为模板"""
+    selection = cmds.ls(selection=True, type="joint", long=True)
+    
+    if not selection:
+        cmds.confirmDialog(
+            title="错误",
+            message="请先选择要保存的根骨骼！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    paths = cmds.fileDialog2(
+        fileFilter="骨架模板 (*.json)",
+        dialogStyle=2,
+        caption="保存骨架模板",
+        fileMode=0,
+        startingDirectory=template_dirs()[-1]
+    )
+    if not paths:
+        return
+    
+    try:
+        name = os.path.splitext(os.path.basename(paths[0]))[0]
+        template = read_skeleton(selection[0], name)
+        save_template(template, paths[0])
+        cmds.inViewMessage(
+            amg=f"骨架模板已保存: {len(template.joints)}个骨骼",
+            pos="midCenter",
+            fade=True,
+            fadeOutTime=2.0
+        )
+    except Exception as e:
+        cmds.confirmDialog(
+            title="错误",
+            message=f"保存骨架模板失败: {str(e)}",
+            button=["确定"],
+            defaultButton="确定"
+        )
+
 def mirror_skeleton():
     """镜像骨骼"""
     # 显示一个简单的UI窗口
@@ -196,14 +179,7 @@ def _mirror_skeleton_cmd():
     
     # 执行镜像操作
     try:
-        cmds.select(selection[0])
-        cmds.mirrorJoint(
-            mirrorYZ=(mirror_across=="YZ"),
-            mirrorXZ=(mirror_across=="XZ"),
-            mirrorXY=(mirror_across=="XY"),
-            mirrorBehavior=mirror_behavior,
-            searchReplace=["l_", "r_"]
-        )
+        mirror_joints([selection[0]], mirror_across, mirror_behavior)
         
         # 显示成功消息
         cmds.inViewMessage(
@@ -225,6 +201,77 @@ def _mirror_skeleton_cmd():
     if cmds.window("mirrorSkeletonWindow", exists=True):
         cmds.deleteUI("mirrorSkeletonWindow")
 
+def rig_build():
+    """按构建描述增量构建绑定"""
+    if cmds.window("rigBuildWindow", exists=True):
+        cmds.deleteUI("rigBuildWindow")
+    
+    window = cmds.window("rigBuildWindow", title="绑定构建", widthHeight=(420, 180))
+    cmds.columnLayout(adjustableColumn=True, rowSpacing=10, columnOffset=["both", 10])
+    
+    last_path = cmds.optionVar(query=RIG_BUILD_OPTION) if cmds.optionVar(exists=RIG_BUILD_OPTION) else ""
+    cmds.textFieldButtonGrp(
+        "rigBuildFile",
+        label="构建描述",
+        text=last_path,
+        buttonLabel="浏览",
+        buttonCommand=lambda: _browse_rig_build_cmd()
+    )
+    
+    cmds.separator(height=10, style="in")
+    
+    cmds.button(label="构建（只执行有变化的步骤）", command=lambda x: _rig_build_cmd(False))
+    cmds.button(label="完全重建", command=lambda x: _rig_build_cmd(True))
+    cmds.button(label="关闭", command=lambda x: cmds.deleteUI(window))
+    
+    cmds.showWindow(window)
+
+def _browse_rig_build_cmd():
+    """选择构建描述文件"""
+    paths = cmds.fileDialog2(
+        fileFilter="构建描述 (*.json *.yaml *.yml)",
+        dialogStyle=2,
+        caption="选择构建描述",
+        fileMode=1
+    )
+    if paths:
+        cmds.textFieldButtonGrp("rigBuildFile", edit=True, text=paths[0])
+
+def _rig_build_cmd(force):
+    """构建绑定的具体命令"""
+    description_path = cmds.textFieldButtonGrp("rigBuildFile", query=True, text=True).strip()
+    
+    if not description_path or not os.path.isfile(description_path):
+        cmds.confirmDialog(
+            title="错误",
+            message="请先选择构建描述文件！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    cmds.optionVar(stringValue=(RIG_BUILD_OPTION, description_path))
+    
+    try:
+        start_time = time.time()
+        report = build_rig(description_path, force=force)
+        print(f"绑定构建完成，耗时 {(time.time() - start_time) * 1000.0:.1f}ms")
+    except Exception as e:
+        cmds.confirmDialog(
+            title="错误",
+            message=f"绑定构建失败: {str(e)}",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    executed = sum(1 for item in report if item["status"] == "executed")
+    cmds.inViewMessage(
+        amg=f"绑定构建完成: 执行{executed}个步骤，跳过{len(report) - executed}个步骤",
+        pos="midCenter",
+        fade=True,
+        fadeOutTime=2.0
+    )
+
 # 当脚本被直接执行时的入口点
 if __name__ == "__main__":
     create_skeleton()
\ No newline at end of file
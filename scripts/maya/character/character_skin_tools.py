@@ -4,9 +4,22 @@
 角色蒙皮工具 - 提供角色蒙皮相关功能
 """
 
+import os
+import time
 import maya.cmds as cmds
 import maya.mel as mel
 
+from skin_api import SkinCluster, find_skin_cluster
+from skin_snapshots import SnapshotStore
+from skin_weight_io import FILE_EXTENSION, read_weights, write_weights
+from skin_weight_ops import (build_influence_pairs, clean_weight_matrix, get_symmetry_map, interpolate_weights,
+                             match_influences, mirror_weight_matrix, remap_weights, reorder_influences, short_name,
+                             topology_hash)
+from spatial_index import SurfaceIndex
+
+# 当前会话的权重快照
+_snapshot_store = None
+
 def skin_tools_ui():
     """显示蒙皮工具UI"""
     # 创建窗口
@@ -36,7 +49,8 @@ def skin_tools_ui():
     
     cmds.button(label="打开组件编辑器", command=lambda x: mel.eval("ComponentEditor"))
     cmds.button(label="打开绘制权重工具", command=lambda x: mel.eval("ArtPaintSkinWeightsTool"))
-    cmds.button(label="均匀权重分布", command=lambda x: cmds.skinPercent(transformValue=[(0.25, 0.25, 0.25, 0.25)], normalize=True))
+    cmds.button(label="清理权重", command=lambda x: clean_weights())
+    cmds.button(label="权重快照", command=lambda x: weight_snapshots())
     
     cmds.setParent(main_layout)
     
@@ -56,6 +70,35 @@ def skin_tools_ui():
     # 显示窗口
     cmds.showWindow(window)
 
+def bind_skin(meshes, joints, suffix="_skinCluster", **options):
+    """
+    把每个模型分别绑定到同一组骨骼（已有蒙皮的模型跳过）
+    
+    Args:
+        meshes: 模型（变换节点或网格形状）列表
+        joints: 骨骼列表
+        suffix: 蒙皮节点名称后缀
+        options: 传给 cmds.skinCluster 的其他参数，例如 maxInfluences
+        
+    Returns:
+        list: 新建的蒙皮节点
+    """
+    transforms = []
+    for mesh in meshes:
+        if cmds.objectType(mesh, isAType="shape"):
+            mesh = cmds.listRelatives(mesh, parent=True, fullPath=True)[0]
+        if mesh not in transforms:
+            transforms.append(mesh)
+    
+    skin_clusters = []
+    for transform in transforms:
+        if find_skin_cluster(transform):
+            cmds.warning(f"{transform} 已有蒙皮，跳过")
+            continue
+        name = f"{transform.split('|')[-1]}{suffix}"
+        skin_clusters.append(cmds.skinCluster(joints, transform, toSelectedBones=True, name=name, **options)[0])
+    return skin_clusters
+
 def create_smooth_skin():
     """创建平滑蒙皮"""
     selection = cmds.ls(selection=True)
@@ -85,13 +128,11 @@ def create_smooth_skin():
         )
         return
     
-    # 创建平滑蒙皮
-    mesh_transform = cmds.listRelatives(meshes[0], parent=True)[0] if meshes[0] != selection[0] else meshes[0]
-    
+    # 为每个选中的模型创建平滑蒙皮
     try:
-        cmds.skinCluster(joints, mesh_transform, tsb=True, name=f"{mesh_transform}_skinCluster")
+        skin_clusters = bind_skin(meshes, joints)
         cmds.inViewMessage(
-            amg="已创建平滑蒙皮",
+            amg=f"已创建平滑蒙皮: {len(skin_clusters)}个模型",
             pos="midCenter",
             fade=True,
             fadeOutTime=2.0
@@ -133,13 +174,11 @@ def create_rigid_skin():
         )
         return
     
-    # 创建刚性蒙皮
-    mesh_transform = cmds.listRelatives(meshes[0], parent=True)[0] if meshes[0] != selection[0] else meshes[0]
-    
+    # 为每个选中的模型创建刚性蒙皮
     try:
-        cmds.skinCluster(joints, mesh_transform, toSelectedBones=True, bindMethod=0, skinMethod=0, normalizeWeights=0, name=f"{mesh_transform}_rigidSkin")
+        skin_clusters = bind_skin(meshes, joints, suffix="_rigidSkin", bindMethod=0, skinMethod=0, normalizeWeights=0)
         cmds.inViewMessage(
-            amg="已创建刚性蒙皮",
+            amg=f"已创建刚性蒙皮: {len(skin_clusters)}个模型",
             pos="midCenter",
             fade=True,
             fadeOutTime=2.0
@@ -152,8 +191,61 @@ def create_rigid_skin():
             defaultButton="确定"
         )
 
+def transfer_skin_weights(source, targets):
+    """
+    把一个源模型的权重一次性传递到多个目标模型
+    
+    源模型的权重、表面索引只读取和建立一次；每个目标顶点在源模型表面上找最近点，
+    按所在三角形的重心坐标插值权重。没有蒙皮的目标先统一用源骨骼创建蒙皮，
+    每个目标的权重一次写入，整个操作在一个撤销块中。
+    
+    Args:
+        source: 源模型名称
+        targets: 目标模型名称列表
+        
+    Returns:
+        dict: {目标模型: 到源表面的最大距离}，源模型没有蒙皮时返回None
+    """
+    source_skin = find_skin_cluster(source)
+    if not source_skin:
+        return None
+    
+    skin = SkinCluster(source_skin)
+    influences = skin.get_influences()
+    weights = skin.get_weights()
+    surface = SurfaceIndex(skin.get_points(), skin.get_triangles())
+    
+    results = {}
+    cmds.undoInfo(openChunk=True, chunkName="nexusTransferSkinWeights")
+    try:
+        # 先为没有蒙皮的目标创建蒙皮
+        target_skins = {}
+        for target in targets:
+            target_skin = find_skin_cluster(target)
+            if not target_skin:
+                target_skin = cmds.skinCluster(influences, target, toSelectedBones=True,
+                                               name=f"{short_name(target)}_skinCluster")[0]
+            target_skins[target] = target_skin
+        
+        for target, target_skin in target_skins.items():
+            target_cluster = SkinCluster(target_skin)
+            _, missing = match_influences(influences, target_cluster.get_influences())
+            if missing:
+                target_cluster.add_influences(missing)
+                target_cluster = SkinCluster(target_skin)
+            
+            vertices, barycentric, distances = surface.query(target_cluster.get_points())
+            target_weights = reorder_influences(interpolate_weights(weights, vertices, barycentric),
+                                                influences, target_cluster.get_influences())
+            target_cluster.set_weights(target_weights)
+            results[target] = float(distances.max()) if len(distances) else 0.0
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    
+    return results
+
 def copy_skin_weights():
-    """复制蒙皮权重"""
+    """复制蒙皮权重（第一个选择的模型为源，其余为目标）"""
     selection = cmds.ls(selection=True)
     
     if len(selection) < 2:
@@ -169,42 +261,24 @@ def copy_skin_weights():
     source = selection[0]
     targets = selection[1:]
     
-    # 检查源模型是否有蒙皮
-    source_skin = mel.eval(f'findRelatedSkinCluster("{source}")')
-    
-    if not source_skin:
-        cmds.confirmDialog(
-            title="错误",
-            message="源模型没有蒙皮！",
-            button=["确定"],
-            defaultButton="确定"
-        )
-        return
-    
     try:
-        # 复制权重到每个目标模型
-        for target in targets:
-            # 检查目标是否有蒙皮
-            target_skin = mel.eval(f'findRelatedSkinCluster("{target}")')
-            
-            if not target_skin:
-                # 获取源模型的骨骼
-                source_joints = cmds.skinCluster(source_skin, query=True, influence=True)
-                
-                # 为目标创建蒙皮
-                target_skin = cmds.skinCluster(source_joints, target, tsb=True, name=f"{target}_skinCluster")[0]
-            
-            # 复制权重
-            cmds.copySkinWeights(
-                sourceSkin=source_skin,
-                destinationSkin=target_skin,
-                noMirror=True,
-                surfaceAssociation="closestPoint",
-                influenceAssociation=["name", "closestJoint"]
+        start_time = time.time()
+        results = transfer_skin_weights(source, targets)
+        if results is None:
+            cmds.confirmDialog(
+                title="错误",
+                message="源模型没有蒙皮！",
+                button=["确定"],
+                defaultButton="确定"
             )
+            return
+        
+        for target, distance in results.items():
+            print(f"{target}: 最大距离 {distance:.4f}")
+        print(f"权重传递完成: {len(results)}个模型，耗时 {time.time() - start_time:.2f}秒")
         
         cmds.inViewMessage(
-            amg="已复制蒙皮权重",
+            amg=f"已复制蒙皮权重: {len(results)}个模型",
             pos="midCenter",
             fade=True,
             fadeOutTime=2.0
@@ -243,7 +317,9 @@ def mirror_weights():
     cmds.radioButtonGrp("mirrorDirection", label="镜像方向", labelArray3=["X轴", "Y轴", "Z轴"], numberOfRadioButtons=3, select=1)
     
     cmds.checkBox("mirrorInfluences", label="镜像骨骼", value=True)
+    cmds.checkBox("mirrorPositiveToNegative", label="从正方向镜像到负方向", value=True)
     cmds.textFieldGrp("searchReplace", label="骨骼名称替换", text="l_:r_")
+    cmds.floatFieldGrp("mirrorTolerance", label="对称容差", value1=0.001, precision=4)
     
     cmds.separator(height=10, style="in")
     
@@ -252,6 +328,37 @@ def mirror_weights():
     
     cmds.showWindow(window)
 
+def mirror_skin_weights(obj, axis=0, search="l_", replace="r_", positive_to_negative=True, tolerance=0.001):
+    """
+    镜像模型的蒙皮权重
+    
+    顶点对称映射按拓扑哈希缓存，同一模型（或拓扑相同的模型）再次镜像时不需要重新查找；
+    整个权重矩阵一次读取、向量化镜像后一次写入（可撤销）。
+    
+    Args:
+        obj: 模型名称
+        axis: 镜像轴 0=X, 1=Y, 2=Z
+        search, replace: 左右骨骼的名称替换规则，为空时不交换骨骼
+        positive_to_negative: 从正方向镜像到负方向
+        tolerance: 对称顶点的位置容差
+        
+    Returns:
+        tuple: (被修改的顶点数, 找不到对称顶点的顶点数)，模型没有蒙皮时返回None
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        return None
+    
+    skin = SkinCluster(skin_cluster)
+    points = skin.get_points()
+    symmetry_map = get_symmetry_map(topology_hash(*skin.get_topology()), points, axis, tolerance)
+    influence_pairs = build_influence_pairs(skin.get_influences(), search, replace)
+    
+    weights, changed, unmatched = mirror_weight_matrix(
+        skin.get_weights(), points, symmetry_map, influence_pairs, axis, positive_to_negative, tolerance)
+    skin.set_weights(weights)
+    return changed, unmatched
+
 def _mirror_weights_cmd():
     """执行镜像权重操作"""
     selection = cmds.ls(selection=True)
@@ -268,46 +375,26 @@ def _mirror_weights_cmd():
     # 获取镜像设置
     mirror_direction = cmds.radioButtonGrp("mirrorDirection", query=True, select=True)
     mirror_influences = cmds.checkBox("mirrorInfluences", query=True, value=True)
+    positive_to_negative = cmds.checkBox("mirrorPositiveToNegative", query=True, value=True)
     search_replace = cmds.textFieldGrp("searchReplace", query=True, text=True).split(":")
+    tolerance = cmds.floatFieldGrp("mirrorTolerance", query=True, value1=True)
     
-    # 设置镜像方向
-    mirror_x = (mirror_direction == 1)
-    mirror_y = (mirror_direction == 2)
-    mirror_z = (mirror_direction == 3)
+    # 骨骼名称替换规则
+    search, replace = search_replace if (mirror_influences and len(search_replace) == 2) else ("", "")
     
+    cmds.undoInfo(openChunk=True, chunkName="nexusMirrorSkinWeights")
     try:
         # 对每个选中的模型执行镜像
         for obj in selection:
-            # 检查是否有蒙皮
-            skin_cluster = mel.eval(f'findRelatedSkinCluster("{obj}")')
+            result = mirror_skin_weights(obj, mirror_direction - 1, search, replace, positive_to_negative, tolerance)
             
-            if not skin_cluster:
+            if result is None:
                 cmds.warning(f"{obj} 没有蒙皮，跳过")
                 continue
             
-            # 执行镜像
-            cmds.copySkinWeights(
-                sourceSkin=skin_cluster,
-                destinationSkin=skin_cluster,
-                mirrorMode="YZ" if mirror_x else ("XZ" if mirror_y else "XY"),
-                mirrorInverse=False,
-                surfaceAssociation="closestPoint",
-                influenceAssociation=["label", "name", "oneToOne"],
-                normalize=True
-            )
-            
-            # 如果需要镜像骨骼影响
-            if mirror_influences and len(search_replace) == 2:
-                search, replace = search_replace
-                cmds.copySkinWeights(
-                    sourceSkin=skin_cluster,
-                    destinationSkin=skin_cluster,
-                    noMirror=True,
-                    surfaceAssociation="closestPoint",
-                    influenceAssociation=["name", "closestJoint"],
-                    normalize=True,
-                    influenceSearchAndReplace=[search, replace]
-                )
+            changed, unmatched = result
+            if unmatched:
+                cmds.warning(f"{obj}: {unmatched}个顶点在容差内找不到对称顶点，保持原权重")
         
         cmds.inViewMessage(
             amg="权重镜像完成",
@@ -322,13 +409,391 @@ def _mirror_weights_cmd():
             button=["确定"],
             defaultButton="确定"
         )
+    finally:
+        cmds.undoInfo(closeChunk=True)
     
     # 关闭窗口
     if cmds.window("mirrorWeightsWindow", exists=True):
         cmds.deleteUI("mirrorWeightsWindow")
 
+def clean_weights():
+    """清理权重"""
+    selection = cmds.ls(selection=True)
+    
+    if not selection:
+        cmds.confirmDialog(
+            title="错误",
+            message="请先选择要清理权重的模型！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    # 创建窗口
+    if cmds.window("cleanWeightsWindow", exists=True):
+        cmds.deleteUI("cleanWeightsWindow")
+    
+    window = cmds.window("cleanWeightsWindow", title="清理权重", widthHeight=(300, 150))
+    cmds.columnLayout(adjustableColumn=True, rowSpacing=10, columnOffset=["both", 10])
+    
+    cmds.text(label="清理权重设置")
+    cmds.separator(height=5, style="in")
+    
+    cmds.floatFieldGrp("cleanPruneThreshold", label="最小权重", value1=0.01, precision=4)
+    cmds.intFieldGrp("cleanMaxInfluences", label="最大骨骼数", value1=4)
+    
+    cmds.separator(height=10, style="in")
+    
+    cmds.button(label="清理", command=lambda x: _clean_weights_cmd())
+    cmds.button(label="关闭", command=lambda x: cmds.deleteUI(window))
+    
+    cmds.showWindow(window)
+
+def clean_skin_weights(obj, prune_threshold=0.01, max_influences=4):
+    """
+    清理模型的蒙皮权重: 去掉小权重、限制每个顶点的骨骼数并归一化
+    
+    整个权重矩阵一次读取、向量化处理后一次写入（可撤销），没有变化时不写入。
+    
+    Args:
+        obj: 模型名称
+        prune_threshold: 小于该值的权重置为0
+        max_influences: 每个顶点最多保留的骨骼数，0表示不限制
+        
+    Returns:
+        int: 被修改的顶点数，模型没有蒙皮时返回None
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        return None
+    
+    skin = SkinCluster(skin_cluster)
+    weights, changed = clean_weight_matrix(skin.get_weights(), prune_threshold, max_influences)
+    if changed:
+        skin.set_weights(weights)
+    return changed
+
+def _clean_weights_cmd():
+    """执行清理权重操作"""
+    selection = cmds.ls(selection=True)
+    
+    if not selection:
+        cmds.confirmDialog(
+            title="错误",
+            message="请先选择要清理权重的模型！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    prune_threshold = cmds.floatFieldGrp("cleanPruneThreshold", query=True, value1=True)
+    max_influences = cmds.intFieldGrp("cleanMaxInfluences", query=True, value1=True)
+    
+    cmds.undoInfo(openChunk=True, chunkName="nexusCleanSkinWeights")
+    try:
+        total_changed = 0
+        for obj in selection:
+            changed = clean_skin_weights(obj, prune_threshold, max_influences)
+            
+            if changed is None:
+                cmds.warning(f"{obj} 没有蒙皮，跳过")
+                continue
+            
+            print(f"{obj}: 修改了{changed}个顶点")
+            total_changed += changed
+        
+        cmds.inViewMessage(
+            amg=f"权重清理完成: 修改了{total_changed}个顶点",
+            pos="midCenter",
+            fade=True,
+            fadeOutTime=2.0
+        )
+    except Exception as e:
+        cmds.confirmDialog(
+            title="错误",
+            message=f"清理权重失败: {str(e)}",
+            button=["确定"],
+            defaultButton="确定"
+        )
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+def _snapshot_spill_dir():
+    """快照溢出目录（当前用户的本地数据目录，缓存目录可能在共享盘上；不可用时使用Maya临时目录）"""
+    try:
+        from core.nexus_paths import get_local_data_dir
+    except ImportError:
+        return os.path.join(cmds.internalVar(userTmpDir=True), "nexus_skin_snapshots")
+    return get_local_data_dir("skin_snapshots")
+
+def get_snapshot_store():
+    """获取当前会话的快照存储，退出Maya时删除溢出的快照文件"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        _snapshot_store = SnapshotStore(spill_dir=_snapshot_spill_dir(), on_drop=_snapshot_dropped)
+        cmds.scriptJob(event=["quitApplication", _snapshot_store.clear])
+    return _snapshot_store
+
+def _snapshot_dropped(snapshot):
+    """快照超出内存上限被丢弃时提示用户"""
+    cmds.warning(f"快照 {snapshot.label} 超出内存上限，已丢弃")
+
+def capture_skin_snapshot(obj, label=None):
+    """
+    保存模型当前的蒙皮权重快照
+    
+    Args:
+        obj: 模型名称
+        label: 快照名称，默认为模型名称和时间
+        
+    Returns:
+        Snapshot: 新快照，模型没有蒙皮时返回None
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        return None
+    
+    skin = SkinCluster(skin_cluster)
+    label = label or f"{obj} {time.strftime('%H:%M:%S')}"
+    return get_snapshot_store().capture(label, skin_cluster, skin.get_influences(), skin.get_weights(), obj)
+
+def restore_skin_snapshot(snapshot_id):
+    """
+    把快照中的权重一次写回蒙皮节点（可撤销）
+    
+    快照中的权重是16位量化值，恢复后与保存时的权重相差约1/65535，不是逐位相同。
+    
+    Returns:
+        Snapshot: 恢复的快照
+    """
+    snapshot = get_snapshot_store().get(snapshot_id)
+    skin = SkinCluster(snapshot.skin_cluster)
+    if skin.vertex_count != snapshot.vertex_count:
+        raise ValueError(f"顶点数已改变: 快照 {snapshot.vertex_count}, 模型 {skin.vertex_count}")
+    
+    weights = reorder_influences(snapshot.weights.to_dense(), snapshot.influences, skin.get_influences())
+    skin.set_weights(weights)
+    return snapshot
+
+def diff_skin_snapshots(first_id, second_id, select=True):
+    """
+    比较两个快照，可选择在场景中选中权重不同的顶点
+    
+    Returns:
+        dict: {"vertices", "delta", "max_delta"}，见 skin_snapshots.diff_weights
+    """
+    store = get_snapshot_store()
+    result = store.diff(first_id, second_id)
+    geometry = store.get(second_id).geometry
+    if select and geometry and cmds.objExists(geometry):
+        vertices = result["vertices"]
+        cmds.select([f"{geometry}.vtx[{index}]" for index in vertices] if len(vertices) else geometry, replace=True)
+    return result
+
+def weight_snapshots():
+    """权重快照管理窗口"""
+    if cmds.window("weightSnapshotsWindow", exists=True):
+        cmds.deleteUI("weightSnapshotsWindow")
+    
+    window = cmds.window("weightSnapshotsWindow", title="权重快照", widthHeight=(360, 320))
+    cmds.columnLayout(adjustableColumn=True, rowSpacing=5, columnOffset=["both", 10])
+    
+    cmds.textFieldGrp("snapshotLabel", label="快照名称", text="")
+    cmds.button(label="保存快照", command=lambda x: _capture_snapshot_cmd())
+    cmds.separator(height=5, style="in")
+    
+    cmds.textScrollList("snapshotList", allowMultiSelection=True, numberOfRows=10)
+    cmds.text("snapshotMemory", label="", align="left")
+    cmds.text(label="注意: 快照权重以16位精度保存，恢复后与原权重相差约1/65535，不是逐位相同", align="left", wordWrap=True)
+    
+    cmds.button(label="恢复快照", command=lambda x: _restore_snapshot_cmd())
+    cmds.button(label="比较快照（选择两个）", command=lambda x: _diff_snapshots_cmd())
+    cmds.button(label="删除快照", command=lambda x: _remove_snapshots_cmd())
+    
+    cmds.separator(height=10, style="in")
+    cmds.button(label="关闭", command=lambda x: cmds.deleteUI(window))
+    
+    _refresh_snapshot_list()
+    cmds.showWindow(window)
+
+def _refresh_snapshot_list():
+    """刷新快照列表"""
+    if not cmds.textScrollList("snapshotList", exists=True):
+        return
+    store = get_snapshot_store()
+    cmds.textScrollList("snapshotList", edit=True, removeAll=True)
+    for snapshot in store.snapshots():
+        location = "" if snapshot.in_memory else " (磁盘)"
+        cmds.textScrollList("snapshotList", edit=True,
+                            append=f"{snapshot.label}  [{snapshot.skin_cluster}]  "
+                                   f"{snapshot.nbytes / 1024.0 / 1024.0:.1f}MB{location}")
+    cmds.text("snapshotMemory", edit=True, label=f"内存占用: {store.memory_bytes / 1024.0 / 1024.0:.1f}MB")
+
+def _selected_snapshot_ids():
+    """快照列表中选中的快照ID"""
+    indices = cmds.textScrollList("snapshotList", query=True, selectIndexedItem=True) or []
+    snapshots = get_snapshot_store().snapshots()
+    return [snapshots[index - 1].id for index in indices]
+
+def _capture_snapshot_cmd():
+    """保存选中模型的快照"""
+    selection = cmds.ls(selection=True, objectsOnly=True)
+    
+    if not selection:
+        cmds.confirmDialog(
+            title="错误",
+            message="请先选择要保存快照的模型！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    label = cmds.textFieldGrp("snapshotLabel", query=True, text=True).strip()
+    for obj in selection:
+        try:
+            snapshot = capture_skin_snapshot(obj, f"{label} ({obj})" if label and len(selection) > 1 else label)
+        except ValueError as e:
+            # 例如未归一化的蒙皮权重超出0到1的范围
+            cmds.warning(f"{obj} 保存快照失败: {str(e)}")
+            continue
+        if snapshot is None:
+            cmds.warning(f"{obj} 没有蒙皮，跳过")
+    _refresh_snapshot_list()
+
+def _restore_snapshot_cmd():
+    """恢复选中的快照"""
+    snapshot_ids = _selected_snapshot_ids()
+    
+    if not snapshot_ids:
+        cmds.confirmDialog(
+            title="错误",
+            message="请先在列表中选择快照！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    cmds.undoInfo(openChunk=True, chunkName="nexusRestoreSkinSnapshot")
+    try:
+        for snapshot_id in snapshot_ids:
+            snapshot = restore_skin_snapshot(snapshot_id)
+        
+        cmds.inViewMessage(
+            amg=f"已恢复快照: {snapshot.label}" if len(snapshot_ids) == 1 else f"已恢复{len(snapshot_ids)}个快照",
+            pos="midCenter",
+            fade=True,
+            fadeOutTime=2.0
+        )
+    except Exception as e:
+        cmds.confirmDialog(
+            title="错误",
+            message=f"恢复快照失败: {str(e)}",
+            button=["确定"],
+            defaultButton="确定"
+        )
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    _refresh_snapshot_list()
+
+def _diff_snapshots_cmd():
+    """比较选中的两个快照"""
+    snapshot_ids = _selected_snapshot_ids()
+    
+    if len(snapshot_ids) != 2:
+        cmds.confirmDialog(
+            title="错误",
+            message="请在列表中选择两个快照！",
+            button=["确定"],
+            defaultButton="确定"
+        )
+        return
+    
+    try:
+        result = diff_skin_snapshots(*snapshot_ids)
+        message = f"{len(result['vertices'])}个顶点权重不同，最大变化 {result['max_delta']:.4f}"
+        print(message)
+        cmds.inViewMessage(
+            amg=message,
+            pos="midCenter",
+            fade=True,
+            fadeOutTime=2.0
+        )
+    except Exception as e:
+        cmds.confirmDialog(
+            title="错误",
+            message=f"比较快照失败: {str(e)}",
+            button=["确定"],
+            defaultButton="确定"
+        )
+    _refresh_snapshot_list()
+
+def _remove_snapshots_cmd():
+    """删除选中的快照"""
+    store = get_snapshot_store()
+    for snapshot_id in _selected_snapshot_ids():
+        store.remove(snapshot_id)
+    _refresh_snapshot_list()
+
+def export_weights_file(obj, file_path):
+    """
+    通过OpenMaya一次读取模型的全部权重并写入二进制权重文件
+    
+    Args:
+        obj: 模型名称
+        file_path: 权重文件路径
+        
+    Returns:
+        int: 文件大小（字节），模型没有蒙皮时返回None
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        return None
+    return write_weights(file_path, SkinCluster(skin_cluster).get_data())
+
+def benchmark_weight_export(obj, directory, repeat=3):
+    """
+    比较deformerWeights XML导出和二进制导出的耗时和文件大小
+    
+    Args:
+        obj: 已蒙皮的模型
+        directory: 输出目录
+        repeat: 每种方式重复次数（取最快的一次）
+        
+    Returns:
+        dict: {"xml_ms", "xml_bytes", "binary_ms", "binary_bytes", "speedup"}
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        raise ValueError(f"{obj} 没有蒙皮")
+    
+    xml_name = f"{obj}_weights.xml"
+    binary_path = os.path.join(directory, f"{obj}{FILE_EXTENSION}")
+    
+    xml_times = []
+    binary_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cmds.deformerWeights(xml_name, path=directory, deformer=skin_cluster, export=True)
+        xml_times.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        export_weights_file(obj, binary_path)
+        binary_times.append(time.perf_counter() - start)
+    
+    result = {
+        "xml_ms": min(xml_times) * 1000.0,
+        "xml_bytes": os.path.getsize(os.path.join(directory, xml_name)),
+        "binary_ms": min(binary_times) * 1000.0,
+        "binary_bytes": os.path.getsize(binary_path),
+    }
+    result["speedup"] = result["xml_ms"] / max(result["binary_ms"], 1e-6)
+    print(f"权重导出对比 {obj}: XML {result['xml_ms']:.1f}ms / {result['xml_bytes']}字节, "
+          f"二进制 {result['binary_ms']:.1f}ms / {result['binary_bytes']}字节, "
+          f"速度提升 {result['speedup']:.1f}倍")
+    return result
+
 def export_skin_weights():
-    """导出蒙皮权重"""
+    """导出蒙皮权重（每个选中的模型导出为所选目录中的 <模型名>.nxw）"""
     selection = cmds.ls(selection=True)
     
     if not selection:
@@ -340,39 +805,31 @@ def export_skin_weights():
         )
         return
     
-    # 获取导出路径
-    export_path = cmds.fileDialog2(
-        fileFilter="权重文件 (*.xml);;所有文件 (*.*)",
+    # 获取导出目录
+    export_dir = cmds.fileDialog2(
         dialogStyle=2,
-        caption="导出权重文件",
-        fileMode=0
+        caption="选择权重导出目录",
+        fileMode=3
     )
     
-    if not export_path:
+    if not export_dir:
         return
     
-    export_path = export_path[0]
+    export_dir = export_dir[0]
     
     try:
+        exported = 0
         # 对于每个选中的对象
         for obj in selection:
-            # 检查是否有蒙皮
-            skin_cluster = mel.eval(f'findRelatedSkinCluster("{obj}")')
-            
-            if not skin_cluster:
+            # 导出权重
+            file_path = os.path.join(export_dir, f"{obj.replace('|', '_')}{FILE_EXTENSION}")
+            if export_weights_file(obj, file_path) is None:
                 cmds.warning(f"{obj} 没有蒙皮，跳过")
                 continue
-            
-            # 导出权重
-            cmds.deformerWeights(
-                f"{obj}_weights.xml",
-                path=os.path.dirname(export_path),
-                deformer=skin_cluster,
-                export=True
-            )
+            exported += 1
         
         cmds.inViewMessage(
-            amg="权重导出完成",
+            amg=f"权重导出完成: {exported}个模型",
             pos="midCenter",
             fade=True,
             fadeOutTime=2.0
@@ -385,8 +842,50 @@ def export_skin_weights():
             defaultButton="确定"
         )
 
+def import_weights_file(obj, file_path, method="auto", add_missing=True):
+    """
+    从二进制权重文件导入模型的权重
+    
+    顶点数相同时按顶点序号映射，否则按文件中保存的顶点坐标查找最近点；
+    骨骼按名称（忽略路径和命名空间）映射。所有权重在一个撤销块中一次写入。
+    
+    Args:
+        obj: 模型名称
+        file_path: 权重文件路径
+        method: "auto", "index" 或 "closest"，见 skin_weight_ops.remap_weights
+        add_missing: 目标蒙皮缺少文件中的骨骼时，是否把场景中同名的骨骼加入蒙皮
+        
+    Returns:
+        dict: 映射信息 {"method", "max_distance", "missing"}，模型没有蒙皮时返回None
+    """
+    skin_cluster = find_skin_cluster(obj)
+    if not skin_cluster:
+        return None
+    
+    data = read_weights(file_path)
+    skin = SkinCluster(skin_cluster)
+    
+    cmds.undoInfo(openChunk=True, chunkName="nexusImportSkinWeights")
+    try:
+        # 把场景中存在的缺失骨骼加入蒙皮
+        _, missing = match_influences(data.influences, skin.get_influences())
+        if missing and add_missing:
+            found = [cmds.ls(short_name(name), type="joint") for name in missing]
+            skin.add_influences([joints[0] for joints in found if joints])
+            skin = SkinCluster(skin_cluster)
+        
+        need_points = method == "closest" or (method == "auto" and data.vertex_count != skin.vertex_count)
+        weights, info = remap_weights(data, skin.get_influences(),
+                                      skin.get_points() if need_points else None,
+                                      skin.vertex_count, method)
+        skin.set_weights(weights)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    
+    return info
+
 def import_skin_weights():
-    """导入蒙皮权重"""
+    """导入蒙皮权重（按模型名称匹配所选的 .nxw 文件，只选一个文件时用于所有模型）"""
     selection = cmds.ls(selection=True)
     
     if not selection:
@@ -399,38 +898,40 @@ def import_skin_weights():
         return
     
     # 获取导入路径
-    import_path = cmds.fileDialog2(
-        fileFilter="权重文件 (*.xml);;所有文件 (*.*)",
+    import_paths = cmds.fileDialog2(
+        fileFilter=f"权重文件 (*{FILE_EXTENSION});;所有文件 (*.*)",
         dialogStyle=2,
         caption="导入权重文件",
-        fileMode=1
+        fileMode=4
     )
     
-    if not import_path:
+    if not import_paths:
         return
     
-    import_path = import_path[0]
+    files_by_name = {os.path.splitext(os.path.basename(path))[0]: path for path in import_paths}
     
     try:
+        imported = 0
         # 对于每个选中的对象
         for obj in selection:
-            # 检查是否有蒙皮
-            skin_cluster = mel.eval(f'findRelatedSkinCluster("{obj}")')
-            
-            if not skin_cluster:
-                cmds.warning(f"{obj} 没有蒙皮，跳过")
+            file_path = files_by_name.get(obj.replace('|', '_'))
+            if file_path is None and len(import_paths) == 1:
+                file_path = import_paths[0]
+            if file_path is None:
+                cmds.warning(f"{obj} 没有对应的权重文件，跳过")
                 continue
             
             # 导入权重
-            cmds.deformerWeights(
-                os.path.basename(import_path),
-                path=os.path.dirname(import_path),
-                deformer=skin_cluster,
-                import=True
-            )
+            info = import_weights_file(obj, file_path)
+            if info is None:
+                cmds.warning(f"{obj} 没有蒙皮，跳过")
+                continue
+            if info["method"] == "closest":
+                print(f"{obj}: 顶点数不一致，已按最近点映射（最大距离 {info['max_distance']:.4f}）")
+            imported += 1
         
         cmds.inViewMessage(
-            amg="权重导入完成",
+            amg=f"权重导入完成: {imported}个模型",
             pos="midCenter",
             fade=True,
             fadeOutTime=2.0
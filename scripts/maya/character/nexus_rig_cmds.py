@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Nexus绑定命令插件 - 提供可撤销的批量骨骼创建命令
+
+骨骼通过 MDagModifier 一次创建，再用 MDGModifier 一次设置属性；
+包装成MPxCommand后整个创建过程是Maya撤销队列中的一步。
+由 skeleton_builder.build_skeleton 按需加载，不需要手动使用。
+"""
+
+import maya.api.OpenMaya as om
+
+
+def maya_useNewAPI():
+    """使用Maya Python API 2.0"""
+    pass
+
+
+class BuildSkeletonCommand(om.MPxCommand):
+    """nexusBuildSkeleton: 创建 skeleton_builder 中暂存的骨架"""
+
+    command_name = "nexusBuildSkeleton"
+
+    def __init__(self):
+        super(BuildSkeletonCommand, self).__init__()
+        self.modifiers = []
+
+    @staticmethod
+    def creator():
+        return BuildSkeletonCommand()
+
+    def doIt(self, args):
+        import skeleton_builder
+        pending = skeleton_builder.take_pending_skeleton()
+        if pending is None:
+            raise RuntimeError("没有待创建的骨架，请使用 skeleton_builder.build_skeleton")
+        template, parent, prefix, created = pending
+        self.modifiers = skeleton_builder.create_joints(template, parent, prefix, created)
+
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+    def undoIt(self):
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, "Nexus", "1.0").registerCommand(
+        BuildSkeletonCommand.command_name, BuildSkeletonCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(BuildSkeletonCommand.command_name)
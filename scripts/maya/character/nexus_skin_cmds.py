@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Nexus蒙皮命令插件 - 提供可撤销的批量权重写入命令
+
+MFnSkinCluster.setWeights 直接调用时不会进入Maya的撤销队列，
+这里把它包装成MPxCommand，撤销时写回setWeights返回的旧权重。
+由 skin_api.SkinCluster.set_weights 按需加载，不需要手动使用。
+"""
+
+import maya.api.OpenMaya as om
+
+
+def maya_useNewAPI():
+    """使用Maya Python API 2.0"""
+    pass
+
+
+class SetSkinWeightsCommand(om.MPxCommand):
+    """nexusSetSkinWeights: 写入 skin_api 中暂存的权重"""
+
+    command_name = "nexusSetSkinWeights"
+
+    def __init__(self):
+        super(SetSkinWeightsCommand, self).__init__()
+        self.skin_cluster = None
+        self.new_weights = None
+        self.old_weights = None
+        self.influence_indices = None
+        self.normalize = False
+
+    @staticmethod
+    def creator():
+        return SetSkinWeightsCommand()
+
+    def doIt(self, args):
+        import skin_api
+        pending = skin_api.take_pending_weights()
+        if pending is None:
+            raise RuntimeError("没有待写入的权重，请使用 skin_api.SkinCluster.set_weights")
+        self.skin_cluster, self.new_weights, self.influence_indices, self.normalize = pending
+        self.redoIt()
+
+    def redoIt(self):
+        self.old_weights = self.skin_cluster.apply_weights(self.new_weights, self.influence_indices, self.normalize)
+
+    def undoIt(self):
+        self.skin_cluster.apply_weights(self.old_weights, self.influence_indices, False)
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, "Nexus", "1.0").registerCommand(
+        SetSkinWeightsCommand.command_name, SetSkinWeightsCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(SetSkinWeightsCommand.command_name)
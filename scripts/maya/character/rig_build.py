@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+绑定构建图 - 由声明了输入和输出的步骤组成的有向无环图，不依赖Maya
+
+构建描述（JSON或YAML）:
+    {
+        "name": "hero",
+        "steps": [
+            {"name": "skeleton", "type": "skeleton", "template": "templates/hero_left.json"},
+            {"name": "mirror", "type": "mirror", "inputs": {"joints": "skeleton.joints"},
+             "search": "l_", "replace": "r_"}
+        ]
+    }
+
+mirror步骤用于只包含一侧骨骼的模板（例如上面项目中的 hero_left.json）；内置的 humanoid 和 quadruped
+模板已经包含左右两侧的骨骼，直接使用skeleton步骤即可，不需要再镜像。
+
+每个步骤的 inputs 把步骤声明的输入连接到其他步骤的输出（"步骤名.输出名"），步骤之间的依赖由此确定；
+其余字段是步骤自身的参数。每次执行后把步骤的输入哈希（类型、版本、参数、上游输出、依赖文件内容）
+和输出记录到构建缓存中。重新构建时只执行输入哈希变化、上游步骤被重新执行或上次结果已失效的步骤，
+重新执行前先调用 clean 删除上次的结果；从描述中删除的步骤按缓存中记录的类型和参数创建，调用 clean
+删除其结果。
+
+内置步骤在 rig_build_steps.py 中注册。
+"""
+
+import os
+import json
+import time
+import hashlib
+
+# 已注册的步骤类型 {类型名称: 步骤类}
+STEP_TYPES = {}
+
+
+def register_step(step_class):
+    """注册步骤类型（类装饰器）"""
+    STEP_TYPES[step_class.step_type] = step_class
+    return step_class
+
+
+def file_hash(file_path):
+    """文件内容的SHA1，文件不存在时返回None"""
+    if not file_path or not os.path.isfile(file_path):
+        return None
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RigStep:
+    """
+    构建步骤基类
+
+    子类设置 step_type、inputs（输入名称）和 outputs（输出名称），并实现 run；
+    修改了步骤的执行逻辑时增加 version，使已缓存的结果失效。
+    """
+
+    step_type = None
+    version = 1
+    inputs = ()
+    outputs = ()
+
+    def __init__(self, name, params=None, connections=None, base_dir=None):
+        """
+        Args:
+            name: 步骤名称（在构建图中唯一）
+            params: 步骤参数
+            connections: {输入名称: "步骤名.输出名"}
+            base_dir: 参数中相对路径所相对的目录
+        """
+        self.name = name
+        self.base_dir = base_dir
+        self.params = dict(params or {})
+        self.connections = dict(connections or {})
+        for input_name in self.inputs:
+            if input_name not in self.connections:
+                raise ValueError(f"步骤 {name} 的输入 {input_name} 没有连接")
+        for input_name, source in self.connections.items():
+            if input_name not in self.inputs:
+                raise ValueError(f"步骤 {name} 没有输入 {input_name}")
+            if source.count(".") != 1:
+                raise ValueError(f"步骤 {name} 的输入 {input_name} 格式应为\"步骤名.输出名\": {source}")
+
+    def upstream(self):
+        """上游步骤名称"""
+        return {source.split(".")[0] for source in self.connections.values()}
+
+    def input_files(self):
+        """内容会影响结果的文件（例如模板），参与输入哈希"""
+        return []
+
+    def input_hash(self, inputs):
+        """计算输入哈希"""
+        data = {
+            "type": self.step_type,
+            "version": self.version,
+            "params": self.params,
+            "inputs": inputs,
+            "files": {path: file_hash(path) for path in self.input_files()},
+        }
+        text = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def run(self, inputs):
+        """
+        执行步骤
+        子类应该覆盖这个方法
+
+        Args:
+            inputs: {输入名称: 上游输出的值}
+
+        Returns:
+            dict: {输出名称: 值}，值需要能保存为JSON
+        """
+        return {}
+
+    def clean(self, outputs):
+        """重新执行前删除上次执行的结果"""
+
+    def is_valid(self, outputs):
+        """上次执行的结果是否仍然有效（例如节点仍在场景中）"""
+        return True
+
+
+class BuildCache:
+    """构建缓存 {步骤名称: {"hash", "type", "params", "connections", "outputs", "time"}}，基类只保存在内存中"""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def set(self, name, entry):
+        self.entries[name] = entry
+
+    def remove(self, name):
+        self.entries.pop(name, None)
+
+    def save(self):
+        """持久化缓存，子类实现"""
+
+
+class JsonBuildCache(BuildCache):
+    """保存为JSON文件的构建缓存"""
+
+    def __init__(self, path):
+        self.path = path
+        entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get("steps", {})
+            except (OSError, ValueError) as e:
+                print(f"读取构建缓存失败，将完整重新构建: {path}, 错误: {str(e)}")
+        super().__init__(entries)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"steps": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class RigBuildGraph:
+    """绑定构建图"""
+
+    def __init__(self, steps, name=None):
+        self.name = name
+        self.steps = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"构建图中有重复的步骤名称: {step.name}")
+            self.steps[step.name] = step
+        self._check_connections()
+        self.order = self._sorted_steps()
+
+    @classmethod
+    def from_description(cls, description, base_dir=None):
+        """
+        从构建描述创建构建图
+
+        Args:
+            description: 构建描述字典
+            base_dir: 步骤参数中相对路径所相对的目录
+        """
+        steps = []
+        for data in description.get("steps", []):
+            data = dict(data)
+            step_type = data.pop("type", None)
+            if step_type not in STEP_TYPES:
+                raise ValueError(f"不支持的构建步骤类型: {step_type}")
+            name = data.pop("name", None) or step_type
+            connections = data.pop("inputs", None)
+            steps.append(STEP_TYPES[step_type](name, data, connections, base_dir))
+        return cls(steps, description.get("name"))
+
+    def _check_connections(self):
+        for step in self.steps.values():
+            for input_name, source in step.connections.items():
+                source_step, output_name = source.split(".")
+                if source_step not in self.steps:
+                    raise ValueError(f"步骤 {step.name} 的输入 {input_name} 连接的步骤 {source_step} 不存在")
+                if output_name not in self.steps[source_step].outputs:
+                    raise ValueError(f"步骤 {source_step} 没有输出 {output_name}")
+
+    def _sorted_steps(self):
+        """按上游在前的顺序排列步骤（保持描述中的相对顺序）"""
+        ordered = []
+        placed = set()
+        remaining = list(self.steps.values())
+        while remaining:
+            ready = [step for step in remaining if step.upstream() <= placed]
+            if not ready:
+                raise ValueError(f"构建图中存在循环: {', '.join(step.name for step in remaining)}")
+            ordered.extend(ready)
+            placed.update(step.name for step in ready)
+            remaining = [step for step in remaining if step.name not in placed]
+        return ordered
+
+    def downstream(self, name):
+        """依赖某个步骤的所有下游步骤名称"""
+        result = set()
+        for step in self.order:
+            if step.upstream() & (result | {name}):
+                result.add(step.name)
+        return result
+
+    @staticmethod
+    def _clean_removed(name, entry):
+        """按缓存中记录的类型和参数创建已删除的步骤，删除其上次的结果"""
+        step_class = STEP_TYPES.get(entry.get("type"))
+        if step_class is None:
+            print(f"步骤 {name} 已从描述中删除，但缓存中没有可用的步骤类型（{entry.get('type')}），"
+                  "无法删除其上次的结果")
+            return
+        step = step_class(name, entry.get("params"), entry.get("connections"))
+        step.clean(entry.get("outputs", {}))
+
+    def build(self, cache=None, force=False, rebuild=None, progress=print):
+        """
+        增量构建
+
+        Args:
+            cache: 构建缓存，默认为空（全部执行）
+            force: 忽略缓存，执行所有步骤
+            rebuild: 强制重新执行的步骤名称列表，其下游也会重新执行
+            progress: 输出进度的函数
+
+        Returns:
+            list: 每个步骤的结果 {"step", "status"("executed"/"cached"/"removed"), "reason", "seconds"}
+        """
+        cache = cache if cache is not None else BuildCache()
+        forced = set()
+        for name in rebuild or ():
+            if name not in self.steps:
+                raise ValueError(f"构建图中没有步骤: {name}")
+            forced |= {name} | self.downstream(name)
+
+        # 描述中已删除的步骤: 删除上次的结果，不再保留缓存
+        report = []
+        for name in list(cache.entries):
+            if name not in self.steps:
+                self._clean_removed(name, cache.get(name))
+                cache.remove(name)
+                cache.save()
+                report.append({"step": name, "status": "removed", "reason": "步骤已从描述中删除", "seconds": 0.0})
+                progress(f"步骤 {name}: 已从描述中删除，删除上次的结果")
+
+        outputs = {}
+        executed = set()
+        for step in self.order:
+            inputs = {}
+            for input_name, source in step.connections.items():
+                source_step, output_name = source.split(".")
+                inputs[input_name] = outputs[source_step].get(output_name)
+            key = step.input_hash(inputs)
+            entry = cache.get(step.name)
+
+            if force or step.name in forced:
+                reason = "强制执行"
+            elif entry is None:
+                reason = "没有缓存"
+            elif entry.get("hash") != key:
+                reason = "输入已变化"
+            elif step.upstream() & executed:
+                reason = "上游步骤已重新执行"
+            elif not step.is_valid(entry.get("outputs", {})):
+                reason = "上次的结果已失效"
+            else:
+                outputs[step.name] = entry.get("outputs", {})
+                report.append({"step": step.name, "status": "cached", "reason": None, "seconds": 0.0})
+                progress(f"步骤 {step.name}: 使用缓存")
+                continue
+
+            start = time.perf_counter()
+            if entry is not None:
+                step.clean(entry.get("outputs", {}))
+            # 执行失败时不保留旧缓存，下次构建会重新执行
+            cache.remove(step.name)
+            result = step.run(inputs) or {}
+            unknown = set(result) - set(step.outputs)
+            if unknown:
+                raise ValueError(f"步骤 {step.name} 返回了未声明的输出: {', '.join(sorted(unknown))}")
+            seconds = time.perf_counter() - start
+
+            outputs[step.name] = result
+            executed.add(step.name)
+            cache.set(step.name, {"hash": key, "type": step.step_type, "params": step.params,
+                                  "connections": step.connections, "outputs": result, "time": time.time()})
+            cache.save()
+            report.append({"step": step.name, "status": "executed", "reason": reason, "seconds": seconds})
+            progress(f"步骤 {step.name}: 已执行（{reason}），耗时 {seconds * 1000.0:.1f}ms")
+
+        cache.save()
+        return report
+
+
+def load_description(file_path):
+    """读取构建描述（YAML需要yaml模块）"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            description = yaml.safe_load(f) or {}
+        else:
+            description = json.load(f)
+    description.setdefault("name", os.path.splitext(os.path.basename(file_path))[0])
+    return description
+
+
+def load_graph(file_path):
+    """读取构建描述并创建构建图，步骤参数中的相对路径相对于描述文件所在目录"""
+    return RigBuildGraph.from_description(load_description(file_path),
+                                          os.path.dirname(os.path.abspath(file_path)))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+内置绑定构建步骤 - 骨架创建和骨骼镜像，以及保存在场景中的构建缓存
+
+    skeleton    参数: template（模板名称或文件路径）, prefix, parent
+                输出: joints（全部骨骼）, roots（根骨骼）
+    mirror      输入: joints
+                参数: axis（"YZ"/"XZ"/"XY"）, behavior, search, replace,
+                      roots（要镜像的根骨骼，默认为名称包含search且父骨骼不包含search的骨骼）
+                输出: joints（镜像出的骨骼）, roots（镜像出的根骨骼）
+
+构建缓存默认保存在场景中的network节点上，随场景一起保存，
+因此在Maya中或通过mayapy批处理重新打开场景后都可以增量构建。
+"""
+
+import os
+import re
+import json
+
+import maya.cmds as cmds
+
+from rig_build import BuildCache, JsonBuildCache, RigStep, load_graph, register_step
+from skeleton_builder import build_skeleton, mirror_joints
+from skeleton_template import list_templates, load_template
+
+# 保存构建缓存的节点名称前缀和属性
+CACHE_NODE_PREFIX = "nexusRigBuild_"
+CACHE_ATTRIBUTE = "buildCache"
+
+
+def _existing(nodes):
+    return [node for node in nodes if cmds.objExists(node)]
+
+
+@register_step
+class SkeletonStep(RigStep):
+    """按骨架模板创建骨架"""
+
+    step_type = "skeleton"
+    outputs = ("joints", "roots")
+
+    def template_path(self):
+        template = self.params.get("template")
+        if not template:
+            raise ValueError(f"步骤 {self.name} 没有设置骨架模板")
+        templates = list_templates()
+        if template in templates:
+            return templates[template]
+        path = os.path.join(self.base_dir or "", os.path.expandvars(template))
+        if not os.path.isfile(path):
+            raise ValueError(f"骨架模板不存在: {template}")
+        return path
+
+    def input_files(self):
+        return [self.template_path()]
+
+    def run(self, inputs):
+        template = load_template(self.template_path())
+        joints = build_skeleton(template, self.params.get("parent"), self.params.get("prefix", ""))
+        roots = [joints[index] for index, joint in enumerate(template.joints) if joint["parent"] is None]
+        return {"joints": joints, "roots": roots}
+
+    def clean(self, outputs):
+        roots = _existing(outputs.get("roots", []))
+        if roots:
+            cmds.delete(roots)
+
+    def is_valid(self, outputs):
+        joints = outputs.get("joints", [])
+        return bool(joints) and len(_existing(joints)) == len(joints)
+
+
+@register_step
+class MirrorStep(RigStep):
+    """镜像骨骼链"""
+
+    step_type = "mirror"
+    inputs = ("joints",)
+    outputs = ("joints", "roots")
+
+    def chain_roots(self, joints):
+        """名称包含search、且父骨骼名称不包含search的骨骼"""
+        search = self.params.get("search", "l_")
+        roots = []
+        for joint in _existing(joints):
+            if search not in joint.split("|")[-1]:
+                continue
+            parent = cmds.listRelatives(joint, parent=True, type="joint")
+            if not parent or search not in parent[0]:
+                roots.append(joint)
+        return roots
+
+    def run(self, inputs):
+        roots = self.params.get("roots") or self.chain_roots(inputs.get("joints") or [])
+        if not roots:
+            raise ValueError(f"步骤 {self.name} 没有找到需要镜像的骨骼")
+        mirrored = mirror_joints(
+            roots,
+            self.params.get("axis", "YZ"),
+            self.params.get("behavior", True),
+            self.params.get("search", "l_"),
+            self.params.get("replace", "r_")
+        )
+        return {
+            "joints": [joint for chain in mirrored for joint in chain],
+            "roots": [chain[0] for chain in mirrored if chain],
+        }
+
+    def clean(self, outputs):
+        roots = _existing(outputs.get("roots", []))
+        if roots:
+            cmds.delete(roots)
+
+    def is_valid(self, outputs):
+        joints = outputs.get("joints", [])
+        return bool(joints) and len(_existing(joints)) == len(joints)
+
+
+class SceneBuildCache(BuildCache):
+    """保存在场景network节点字符串属性上的构建缓存"""
+
+    def __init__(self, graph_name):
+        self.node = CACHE_NODE_PREFIX + re.sub(r"\W", "_", graph_name or "rig")
+        entries = {}
+        if cmds.objExists(f"{self.node}.{CACHE_ATTRIBUTE}"):
+            try:
+                entries = json.loads(cmds.getAttr(f"{self.node}.{CACHE_ATTRIBUTE}") or "{}").get("steps", {})
+            except ValueError as e:
+                print(f"读取构建缓存失败，将完整重新构建: {self.node}, 错误: {str(e)}")
+        super().__init__(entries)
+
+    def save(self):
+        if not cmds.objExists(self.node):
+            cmds.createNode("network", name=self.node)
+        if not cmds.attributeQuery(CACHE_ATTRIBUTE, node=self.node, exists=True):
+            cmds.addAttr(self.node, longName=CACHE_ATTRIBUTE, dataType="string")
+        cmds.setAttr(f"{self.node}.{CACHE_ATTRIBUTE}", json.dumps({"steps": self.entries}), type="string")
+
+
+def build_rig(description_path, force=False, rebuild=None, cache_path=None, progress=print):
+    """
+    按构建描述增量构建绑定（一步撤销）
+
+    Args:
+        description_path: 构建描述文件
+        force: 忽略缓存，执行所有步骤
+        rebuild: 强制重新执行的步骤名称列表
+        cache_path: 构建缓存JSON文件，默认保存在场景中
+        progress: 输出进度的函数
+
+    Returns:
+        list: 每个步骤的结果，见 RigBuildGraph.build
+    """
+    graph = load_graph(description_path)
+    cache = JsonBuildCache(cache_path) if cache_path else SceneBuildCache(graph.name)
+    cmds.undoInfo(openChunk=True, chunkName="nexusRigBuild")
+    try:
+        return graph.build(cache, force=force, rebuild=rebuild, progress=progress)
+    finally:
+        cmds.undoInfo(closeChunk=True)
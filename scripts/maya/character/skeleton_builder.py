@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+骨架创建 - 通过OpenMaya一次创建骨架模板中的所有骨骼
+
+所有骨骼由一个 MDagModifier 创建和命名，位移、关节方向和side属性由一个 MDGModifier 设置，
+通过 nexusBuildSkeleton 命令执行，整个骨架的创建可以一步撤销。
+"""
+
+import os
+
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from skeleton_template import SIDES, SkeletonTemplate
+
+# 提供可撤销的骨架创建命令的插件
+COMMAND_PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nexus_rig_cmds.py")
+
+# 等待 nexusBuildSkeleton 命令创建的骨架 (模板, 父节点, 名称前缀, 创建结果列表)
+_pending_skeleton = None
+
+
+def take_pending_skeleton():
+    """取出等待创建的骨架（由 nexusBuildSkeleton 命令调用）"""
+    global _pending_skeleton
+    pending, _pending_skeleton = _pending_skeleton, None
+    return pending
+
+
+def ensure_command_plugin():
+    """按需加载骨架创建命令插件"""
+    if not cmds.pluginInfo("nexus_rig_cmds", query=True, loaded=True):
+        cmds.loadPlugin(COMMAND_PLUGIN, quiet=True)
+
+
+def create_joints(template, parent=None, prefix="", created=None):
+    """
+    直接创建骨架（不可撤销，一般通过build_skeleton调用）
+
+    Args:
+        template: SkeletonTemplate
+        parent: 根骨骼的父节点名称，默认为世界
+        prefix: 骨骼名称前缀
+        created: 用于返回创建的骨骼名称的列表
+
+    Returns:
+        list: 已执行的修改器（撤销时按相反顺序调用undoIt）
+    """
+    parent_object = om.MObject.kNullObj
+    if parent:
+        selection = om.MSelectionList()
+        selection.add(parent)
+        parent_object = selection.getDependNode(0)
+
+    dag_modifier = om.MDagModifier()
+    objects = {}
+    for joint in template.joints:
+        joint_parent = objects[joint["parent"]] if joint["parent"] else parent_object
+        node = dag_modifier.createNode("joint", joint_parent)
+        dag_modifier.renameNode(node, f"{prefix}{joint['name']}")
+        objects[joint["name"]] = node
+    dag_modifier.doIt()
+
+    translations, orientations = template.local_transforms()
+    orientations = np.radians(orientations)
+    dg_modifier = om.MDGModifier()
+    for index, joint in enumerate(template.joints):
+        node = om.MFnDependencyNode(objects[joint["name"]])
+        for axis, value in zip("XYZ", translations[index]):
+            dg_modifier.newPlugValueDouble(node.findPlug(f"translate{axis}", False), float(value))
+        for axis, value in zip("XYZ", orientations[index]):
+            dg_modifier.newPlugValueDouble(node.findPlug(f"jointOrient{axis}", False), float(value))
+        dg_modifier.newPlugValueInt(node.findPlug("side", False), SIDES[joint["side"]])
+    dg_modifier.doIt()
+
+    if created is not None:
+        created.extend(om.MFnDagNode(objects[joint["name"]]).partialPathName() for joint in template.joints)
+    return [dag_modifier, dg_modifier]
+
+
+def build_skeleton(template, parent=None, prefix=""):
+    """
+    按模板创建骨架（一步撤销）
+
+    Returns:
+        list: 创建的骨骼名称，顺序与模板一致
+    """
+    global _pending_skeleton
+    ensure_command_plugin()
+    created = []
+    _pending_skeleton = (template, parent, prefix, created)
+    try:
+        cmds.nexusBuildSkeleton()
+    finally:
+        _pending_skeleton = None
+    return created
+
+
+def _baked_orientation(joint):
+    """
+    骨骼的局部旋转合并为关节方向（度）
+
+    模板只保存关节方向，rotate和rotateAxis不为0的骨骼按 rotateAxis * rotate * jointOrient
+    合成局部旋转（rotate按骨骼的rotateOrder），再分解为XYZ欧拉角，使由模板创建的骨骼朝向与场景中一致。
+    """
+    joint_orient = cmds.getAttr(f"{joint}.jointOrient")[0]
+    rotate = cmds.getAttr(f"{joint}.rotate")[0]
+    rotate_axis = cmds.getAttr(f"{joint}.rotateAxis")[0]
+    if not any(abs(value) > 1e-6 for value in rotate + rotate_axis):
+        return list(joint_orient)
+
+    order = cmds.getAttr(f"{joint}.rotateOrder")
+    matrix = (om.MEulerRotation(*np.radians(rotate_axis)).asMatrix()
+              * om.MEulerRotation(*np.radians(rotate), order).asMatrix()
+              * om.MEulerRotation(*np.radians(joint_orient)).asMatrix())
+    rotation = om.MTransformationMatrix(matrix).rotation()
+    return [float(value) for value in np.degrees([rotation.x, rotation.y, rotation.z])]
+
+
+def read_skeleton(root, name=None, label=None):
+    """
+    把场景中的骨架读取为模板（世界坐标、关节方向和side）
+
+    骨骼的rotate和rotateAxis合并到关节方向中（见 _baked_orientation）。
+
+    Args:
+        root: 根骨骼
+        name: 模板名称，默认为根骨骼名称
+    """
+    joints = [root] + list(reversed(cmds.listRelatives(root, allDescendents=True, type="joint", fullPath=True) or []))
+    sides = {value: key for key, value in SIDES.items()}
+    descriptions = []
+    for joint in joints:
+        parent = cmds.listRelatives(joint, parent=True, type="joint", fullPath=True)
+        descriptions.append({
+            "name": joint.split("|")[-1],
+            "parent": parent[0].split("|")[-1] if parent and joint != root else None,
+            "position": cmds.xform(joint, query=True, translation=True, worldSpace=True),
+            "orientation": _baked_orientation(joint),
+            "side": sides.get(cmds.getAttr(f"{joint}.side"), "none"),
+        })
+    return SkeletonTemplate(name or root.split("|")[-1], descriptions, label)
+
+
+def mirror_joints(roots, axis="YZ", behavior=True, search="l_", replace="r_"):
+    """
+    镜像骨骼链
+
+    Args:
+        roots: 要镜像的根骨骼列表
+        axis: 镜像平面 "YZ", "XZ" 或 "XY"
+        behavior: 是否镜像行为（否则镜像方向）
+        search, replace: 镜像骨骼名称中的替换
+
+    Returns:
+        list: 每个根骨骼镜像出的骨骼名称列表（第一个为镜像出的根骨骼）
+    """
+    if axis not in ("YZ", "XZ", "XY"):
+        raise ValueError(f"无效的镜像平面: {axis}")
+    mirrored = []
+    for root in roots:
+        mirrored.append(cmds.mirrorJoint(
+            root,
+            mirrorYZ=(axis == "YZ"),
+            mirrorXZ=(axis == "XZ"),
+            mirrorXY=(axis == "XY"),
+            mirrorBehavior=behavior,
+            searchReplace=[search, replace]
+        ) or [])
+    return mirrored
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+骨架模板 - 读写数据驱动的骨架描述（JSON/YAML），不依赖Maya
+
+模板格式:
+    {
+        "name": "humanoid",
+        "label": "人形",
+        "joints": [
+            {"name": "root", "parent": null, "position": [0, 0, 0], "orientation": [0, 0, 0], "side": "center"},
+            {"name": "spine1", "parent": "root", "position": [0, 5, 0]},
+            ...
+        ]
+    }
+
+position 为世界坐标，orientation 为关节方向（jointOrient，XYZ欧拉角，单位度，默认为0），
+side 为 "center", "left", "right" 或 "none"，省略时按名称前缀 l_/r_ 判断。
+
+模板目录: ${NEXUS_HOME}/config/skeleton_templates，以及环境变量 NEXUS_SKELETON_TEMPLATES
+中列出的目录（可在 environments.yaml 中按部门设置），后面目录中的同名模板覆盖前面的。
+"""
+
+import os
+import json
+
+import numpy as np
+
+NEXUS_HOME = os.environ.get(
+    "NEXUS_HOME",
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+# 内置模板目录
+TEMPLATE_DIR = os.path.join(NEXUS_HOME, "config", "skeleton_templates")
+
+TEMPLATE_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# 关节side属性的取值
+SIDES = {"center": 0, "left": 1, "right": 2, "none": 3}
+
+
+def euler_to_matrix(degrees):
+    """XYZ欧拉角（度）转换为旋转矩阵（行向量约定，与Maya一致）"""
+    x, y, z = np.radians(degrees)
+    rotate_x = np.array([[1, 0, 0], [0, np.cos(x), np.sin(x)], [0, -np.sin(x), np.cos(x)]])
+    rotate_y = np.array([[np.cos(y), 0, -np.sin(y)], [0, 1, 0], [np.sin(y), 0, np.cos(y)]])
+    rotate_z = np.array([[np.cos(z), np.sin(z), 0], [-np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return rotate_x @ rotate_y @ rotate_z
+
+
+def _infer_side(name):
+    if name.startswith("l_"):
+        return "left"
+    if name.startswith("r_"):
+        return "right"
+    return "center"
+
+
+class SkeletonTemplate:
+    """骨架模板，骨骼按父骨骼在前的顺序排列"""
+
+    def __init__(self, name, joints, label=None):
+        """
+        Args:
+            name: 模板名称
+            joints: 骨骼描述列表 {"name", "parent", "position", "orientation", "side"}
+            label: 显示名称
+        """
+        self.name = name
+        self.label = label or name
+        self.joints = self._sorted_joints([self._normalize(joint) for joint in joints])
+
+    @staticmethod
+    def _normalize(joint):
+        if not joint.get("name"):
+            raise ValueError("骨架模板中有骨骼缺少名称")
+        side = joint.get("side") or _infer_side(joint["name"])
+        if side not in SIDES:
+            raise ValueError(f"骨骼 {joint['name']} 的side无效: {side}")
+        return {
+            "name": joint["name"],
+            "parent": joint.get("parent") or None,
+            "position": [float(value) for value in joint.get("position", (0, 0, 0))],
+            "orientation": [float(value) for value in joint.get("orientation", (0, 0, 0))],
+            "side": side,
+        }
+
+    @staticmethod
+    def _sorted_joints(joints):
+        """检查名称和父子关系，并按父骨骼在前的顺序排列"""
+        by_name = {}
+        for joint in joints:
+            if joint["name"] in by_name:
+                raise ValueError(f"骨架模板中有重复的骨骼名称: {joint['name']}")
+            by_name[joint["name"]] = joint
+        for joint in joints:
+            if joint["parent"] is not None and joint["parent"] not in by_name:
+                raise ValueError(f"骨骼 {joint['name']} 的父骨骼 {joint['parent']} 不存在")
+
+        ordered = []
+        placed = set()
+        remaining = list(joints)
+        while remaining:
+            ready = [joint for joint in remaining if joint["parent"] is None or joint["parent"] in placed]
+            if not ready:
+                raise ValueError(f"骨架模板中存在循环: {', '.join(joint['name'] for joint in remaining)}")
+            ordered.extend(ready)
+            placed.update(joint["name"] for joint in ready)
+            remaining = [joint for joint in remaining if joint["name"] not in placed]
+        return ordered
+
+    def local_transforms(self):
+        """
+        计算每个骨骼相对父骨骼的位移和关节方向
+
+        Returns:
+            tuple: (位移 [骨骼数, 3], 关节方向（度） [骨骼数, 3])，顺序与joints一致
+        """
+        positions = {joint["name"]: np.asarray(joint["position"]) for joint in self.joints}
+        world_rotations = {}
+        translations = np.zeros((len(self.joints), 3))
+        for index, joint in enumerate(self.joints):
+            rotation = euler_to_matrix(joint["orientation"])
+            position = positions[joint["name"]]
+            parent = joint["parent"]
+            if parent is None:
+                translations[index] = position
+                world_rotations[joint["name"]] = rotation
+                continue
+            parent_rotation = world_rotations[parent]
+            # 世界坐标 = 局部坐标 * 父骨骼旋转 + 父骨骼位置
+            translations[index] = (position - positions[parent]) @ parent_rotation.T
+            world_rotations[joint["name"]] = rotation @ parent_rotation
+        orientations = np.array([joint["orientation"] for joint in self.joints]).reshape(-1, 3)
+        return translations, orientations
+
+    def joint(self, name):
+        """按名称查找骨骼"""
+        for joint in self.joints:
+            if joint["name"] == name:
+                return joint
+        raise KeyError(name)
+
+    def to_dict(self):
+        return {"name": self.name, "label": self.label, "joints": self.joints}
+
+
+def template_dirs():
+    """模板目录列表（内置目录在前）"""
+    dirs = [TEMPLATE_DIR]
+    dirs.extend(path for path in os.environ.get("NEXUS_SKELETON_TEMPLATES", "").split(os.pathsep) if path)
+    return dirs
+
+
+def list_templates():
+    """所有可用模板 {模板名称: 文件路径}"""
+    templates = {}
+    for directory in template_dirs():
+        if not os.path.isdir(directory):
+            continue
+        for file_name in sorted(os.listdir(directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension.lower() in TEMPLATE_EXTENSIONS:
+                templates[name] = os.path.join(directory, file_name)
+    return templates
+
+
+def load_template(file_path):
+    """读取骨架模板（YAML需要yaml模块）"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.lower().endswith((".yaml", ".yml")):
+            import yaml
+            data = yaml.safe_load(f) or {}
+        else:
+            data = json.load(f)
+    name = data.get("name") or os.path.splitext(os.path.basename(file_path))[0]
+    return SkeletonTemplate(name, data.get("joints", []), data.get("label"))
+
+
+def save_template(template, file_path):
+    """保存骨架模板为JSON"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(template.to_dict(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮节点API - 通过OpenMaya一次性读取整个蒙皮节点的权重和顶点坐标
+
+权重以numpy数组 [顶点数, 骨骼数] 表示，列顺序与 influenceObjects() 的顺序一致。
+"""
+
+import os
+
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from skin_weight_io import SkinWeightData
+
+# 提供可撤销的批量权重写入命令的插件
+COMMAND_PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nexus_skin_cmds.py")
+
+# 等待 nexusSetSkinWeights 命令写入的权重 (SkinCluster, 权重, 骨骼索引, 是否归一化)
+_pending_weights = None
+
+
+def find_skin_cluster(obj):
+    """查找模型的蒙皮节点，没有时返回None"""
+    skins = cmds.ls(cmds.listHistory(obj, pruneDagObjects=True) or [], type="skinCluster")
+    return skins[0] if skins else None
+
+
+def take_pending_weights():
+    """取出等待写入的权重（由 nexusSetSkinWeights 命令调用）"""
+    global _pending_weights
+    pending, _pending_weights = _pending_weights, None
+    return pending
+
+
+def ensure_command_plugin():
+    """按需加载批量权重写入命令插件"""
+    if not cmds.pluginInfo("nexus_skin_cmds", query=True, loaded=True):
+        cmds.loadPlugin(COMMAND_PLUGIN, quiet=True)
+
+
+def _get_dependency_node(name):
+    selection = om.MSelectionList()
+    selection.add(name)
+    return selection.getDependNode(0)
+
+
+class SkinCluster:
+    """蒙皮节点的OpenMaya封装"""
+
+    def __init__(self, name):
+        self.name = name
+        self.fn = oma.MFnSkinCluster(_get_dependency_node(name))
+
+        # 蒙皮节点驱动的模型（第一个输出）
+        self.shape_path = self.fn.getPathAtIndex(0)
+        self.shape = self.shape_path.partialPathName()
+        self.vertex_count = om.MFnMesh(self.shape_path).numVertices
+
+        # 包含所有顶点的组件
+        component_fn = om.MFnSingleIndexedComponent()
+        self.components = component_fn.create(om.MFn.kMeshVertComponent)
+        component_fn.setCompleteData(self.vertex_count)
+
+    def get_influences(self):
+        """骨骼名称列表（权重矩阵的列顺序）"""
+        return [path.partialPathName() for path in self.fn.influenceObjects()]
+
+    def get_weights(self):
+        """一次读取所有顶点的权重，返回 [顶点数, 骨骼数] 数组"""
+        weights, influence_count = self.fn.getWeights(self.shape_path, self.components)
+        return np.array(weights, dtype=np.float64).reshape(self.vertex_count, influence_count)
+
+    def get_points(self):
+        """所有顶点的世界坐标 [顶点数, 3]"""
+        points = om.MFnMesh(self.shape_path).getPoints(om.MSpace.kWorld)
+        # MPointArray的每个元素为齐次坐标 (x, y, z, w)
+        return np.array(points, dtype=np.float64).reshape(-1, 4)[:, :3]
+
+    def get_triangles(self):
+        """三角化后的三角形顶点索引 [三角形数, 3]"""
+        _, triangle_vertices = om.MFnMesh(self.shape_path).getTriangles()
+        return np.array(triangle_vertices, dtype=np.int64).reshape(-1, 3)
+
+    def get_topology(self):
+        """每个面的顶点数和面顶点索引，用于计算拓扑哈希"""
+        face_counts, face_connects = om.MFnMesh(self.shape_path).getVertices()
+        return np.array(face_counts, dtype=np.int32), np.array(face_connects, dtype=np.int32)
+
+    def get_data(self, with_positions=True):
+        """读取完整的权重数据"""
+        return SkinWeightData(
+            self.get_influences(),
+            self.get_weights(),
+            self.get_points() if with_positions else None,
+            geometry=cmds.listRelatives(self.shape, parent=True)[0],
+            skin_cluster=self.name
+        )
+
+    def apply_weights(self, weights, influence_indices=None, normalize=False):
+        """
+        直接调用setWeights写入所有顶点的权重（不可撤销，一般通过set_weights调用）
+
+        Args:
+            weights: 权重数组 [顶点数, 骨骼数] 或 MDoubleArray
+            influence_indices: 权重列对应的骨骼索引，默认为全部骨骼
+            normalize: 是否归一化
+
+        Returns:
+            MDoubleArray: 写入前的权重
+        """
+        if influence_indices is None:
+            influence_indices = range(len(self.fn.influenceObjects()))
+        if not isinstance(weights, om.MDoubleArray):
+            weights = om.MDoubleArray(np.asarray(weights, dtype=np.float64).ravel().tolist())
+        return self.fn.setWeights(self.shape_path, self.components, om.MIntArray(list(influence_indices)),
+                                  weights, normalize, True)
+
+    def set_weights(self, weights, influence_indices=None, normalize=False):
+        """一次写入所有顶点的权重，可以撤销"""
+        global _pending_weights
+        ensure_command_plugin()
+        _pending_weights = (self, weights, influence_indices, normalize)
+        try:
+            cmds.nexusSetSkinWeights()
+        finally:
+            _pending_weights = None
+
+    def add_influences(self, influences):
+        """添加骨骼（初始权重为0），之后需要重新创建SkinCluster对象读取新的骨骼列表"""
+        for influence in influences:
+            cmds.skinCluster(self.name, edit=True, addInfluence=influence, weight=0.0)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮和绑定批处理工作进程 - 在mayapy中运行，由 core/skin_batch.py 启动
+
+启动后只初始化一次 maya.standalone，然后从标准输入逐行读取任务（JSON），
+每完成一个场景向标准输出写一行以 RESULT_PREFIX 开头的结果（JSON），
+标准输入关闭时退出。Maya自身的输出不以该前缀开头，会被调度进程忽略。
+
+任务字段:
+    id          任务ID
+    scene       场景文件路径
+    operation   "bind", "export", "import" 或 "rig"（按构建描述增量重建绑定）
+    meshes      模型名称匹配模式列表（fnmatch），默认为全部模型
+    joints      绑定使用的骨骼匹配模式列表，默认为全部骨骼
+    bind        传给 cmds.skinCluster 的绑定参数，例如 {"maxInfluences": 4}
+    weights_dir 导出/导入权重文件的目录（每个场景一个子目录）
+    rig_build   绑定构建描述文件（见 rig_build.py），构建缓存保存在场景中
+    force       重建绑定时忽略缓存，执行所有步骤
+    output_dir  保存场景的目录，默认覆盖原场景
+    scene_root  所有场景的共同目录，weights_dir和output_dir中保留场景相对于它的子目录
+"""
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import traceback
+
+RESULT_PREFIX = "NEXUS_BATCH_RESULT "
+
+
+def _initialize():
+    """初始化Maya（每个工作进程一次）"""
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+
+    character_dir = os.path.dirname(os.path.abspath(__file__))
+    if character_dir not in sys.path:
+        sys.path.insert(0, character_dir)
+
+
+def _match(names, patterns):
+    """按匹配模式过滤节点名称（不含路径和命名空间前缀时也能匹配）"""
+    if not patterns:
+        return list(names)
+    return [name for name in names
+            if any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(name.split("|")[-1], pattern)
+                   for pattern in patterns)]
+
+
+def _mesh_transforms(cmds, patterns):
+    """场景中（非中间形状的）模型的变换节点"""
+    shapes = cmds.ls(type="mesh", noIntermediate=True, long=True) or []
+    transforms = []
+    for shape in shapes:
+        transform = cmds.listRelatives(shape, parent=True, fullPath=True)[0]
+        if transform not in transforms:
+            transforms.append(transform)
+    return _match(transforms, patterns)
+
+
+def _relative_scene(task):
+    """场景相对于scene_root的路径，不同目录中的同名场景在输出目录中不会重名"""
+    scene = task["scene"]
+    root = task.get("scene_root")
+    if root:
+        return os.path.relpath(scene, root)
+    # 没有共同目录（例如在不同盘符上）时使用去掉盘符的完整路径
+    return os.path.splitdrive(os.path.abspath(scene))[1].lstrip("\\/")
+
+
+def _weights_path(task, transform):
+    from skin_weight_io import FILE_EXTENSION
+    scene_dir = os.path.splitext(_relative_scene(task))[0]
+    return os.path.join(task["weights_dir"], scene_dir, f"{transform.split('|')[-1]}{FILE_EXTENSION}")
+
+
+def _save_scene(cmds, task):
+    """保存场景（设置了output_dir时另存到该目录）"""
+    output_dir = task.get("output_dir")
+    if output_dir:
+        output_path = os.path.join(output_dir, _relative_scene(task))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        cmds.file(rename=output_path)
+    file_type = "mayaBinary" if task["scene"].lower().endswith(".mb") else "mayaAscii"
+    cmds.file(save=True, force=True, type=file_type)
+
+
+def run_task(task):
+    """
+    处理一个场景
+
+    Returns:
+        dict: {"details": 每个模型的处理结果, "timings": 各阶段耗时（秒）}
+    """
+    import maya.cmds as cmds
+    from character_skin_tools import bind_skin, export_weights_file, import_weights_file
+
+    timings = {}
+    details = {}
+
+    start = time.perf_counter()
+    cmds.file(task["scene"], open=True, force=True, prompt=False)
+    timings["open"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    operation = task["operation"]
+    transforms = _mesh_transforms(cmds, task.get("meshes"))
+    if operation == "bind":
+        joints = _match(cmds.ls(type="joint", long=True) or [], task.get("joints"))
+        if not joints:
+            raise ValueError("场景中没有匹配的骨骼")
+        for skin_cluster in bind_skin(transforms, joints, **task.get("bind", {})):
+            details[skin_cluster] = "bound"
+    elif operation == "export":
+        for transform in transforms:
+            file_path = _weights_path(task, transform)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            size = export_weights_file(transform, file_path)
+            if size is not None:
+                details[transform] = size
+    elif operation == "import":
+        for transform in transforms:
+            file_path = _weights_path(task, transform)
+            if not os.path.exists(file_path):
+                continue
+            info = import_weights_file(transform, file_path)
+            details[transform] = info["method"] if info else "no skinCluster"
+    elif operation == "rig":
+        from rig_build_steps import build_rig
+        for item in build_rig(task["rig_build"], force=task.get("force", False)):
+            details[item["step"]] = item["status"]
+    else:
+        raise ValueError(f"不支持的批处理操作: {operation}")
+    timings["operation"] = time.perf_counter() - start
+
+    if operation == "rig":
+        changed = any(status == "executed" for status in details.values())
+    else:
+        changed = operation in ("bind", "import") and bool(details)
+    if changed:
+        start = time.perf_counter()
+        _save_scene(cmds, task)
+        timings["save"] = time.perf_counter() - start
+
+    return {"details": details, "timings": timings}
+
+
+def main():
+    _initialize()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        task = json.loads(line)
+        start = time.perf_counter()
+        try:
+            result = run_task(task)
+            result["status"] = "done"
+        except Exception as e:
+            result = {"status": "failed", "error": f"{e}\n{traceback.format_exc()}", "timings": {}}
+        result["id"] = task["id"]
+        result["seconds"] = time.perf_counter() - start
+        sys.stdout.write(RESULT_PREFIX + json.dumps(result, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮权重快照 - 在会话中保存和比较蒙皮节点的完整权重，不依赖Maya
+
+快照以稀疏量化格式（skin_weight_io.SparseWeights）保存在内存中，权重量化为16位定点数，
+恢复的权重与原权重相差不超过约1/65535，不是逐位相同。
+超过内存上限时按最近使用顺序把旧快照写入磁盘（设置了溢出目录时）或丢弃。
+"""
+
+import collections
+import ctypes
+import glob
+import itertools
+import os
+import re
+import socket
+import sys
+import time
+
+import numpy as np
+
+from skin_weight_io import FILE_EXTENSION, WEIGHT_SCALE, SkinWeightData, SparseWeights, read_sparse, write_weights
+
+# 默认内存上限（字节）
+SNAPSHOT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# 溢出文件名: snapshot_<主机名>_<进程ID>_<快照ID>.nxw（进程ID只在同一台机器上有意义）
+SPILL_FILE_PATTERN = re.compile(r"snapshot_([\w-]+)_(\d+)_\d+" + re.escape(FILE_EXTENSION) + "$")
+
+
+def _host_name():
+    """溢出文件名中使用的本机名称"""
+    return re.sub(r"[^\w-]", "_", socket.gethostname()) or "localhost"
+
+
+def _process_alive(pid):
+    """进程是否仍在运行"""
+    if sys.platform == "win32":
+        # Windows上os.kill会结束进程，改用OpenProcess查询退出码
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # 没有权限说明进程存在
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clean_stale_spill_files(spill_dir):
+    """
+    删除本机已退出的进程留下的溢出文件（Maya崩溃时不会调用clear），其他机器的文件不处理
+
+    Returns:
+        int: 删除的文件数
+    """
+    removed = 0
+    host = _host_name()
+    for path in glob.glob(os.path.join(spill_dir, "snapshot_*" + FILE_EXTENSION)):
+        match = SPILL_FILE_PATTERN.match(os.path.basename(path))
+        if not match or match.group(1) != host:
+            continue
+        pid = int(match.group(2))
+        if pid == os.getpid() or _process_alive(pid):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"删除过期的快照文件失败: {path}, 错误: {str(e)}")
+    return removed
+
+
+class Snapshot:
+    """一个蒙皮节点在某一时刻的权重"""
+
+    def __init__(self, snapshot_id, label, skin_cluster, influences, weights, geometry=None):
+        self.id = snapshot_id
+        self.label = label
+        self.skin_cluster = skin_cluster
+        self.geometry = geometry
+        self.influences = list(influences)
+        self.weights = weights
+        self.vertex_count = weights.shape[0]
+        self.nbytes = weights.nbytes
+        self.created = time.time()
+        # 溢出到磁盘时的文件路径
+        self.path = None
+
+    @property
+    def in_memory(self):
+        return self.weights is not None
+
+
+class SnapshotStore:
+    """按最近使用顺序限制内存的快照存储"""
+
+    def __init__(self, memory_limit=SNAPSHOT_MEMORY_LIMIT, spill_dir=None, on_drop=None):
+        """
+        Args:
+            memory_limit: 内存中快照的总大小上限（字节）
+            spill_dir: 溢出目录（最好是本地目录），为None时超过上限的快照直接丢弃；创建时清理本机已退出的进程留下的溢出文件
+            on_drop: 快照因超出内存上限被丢弃时调用 on_drop(snapshot)，默认输出提示
+        """
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.on_drop = on_drop
+        if spill_dir and os.path.isdir(spill_dir):
+            clean_stale_spill_files(spill_dir)
+        self._snapshots = {}
+        # 在内存中的快照ID，按最近使用排序
+        self._loaded = collections.OrderedDict()
+        self._ids = itertools.count(1)
+
+    @property
+    def memory_bytes(self):
+        return sum(self._snapshots[snapshot_id].nbytes for snapshot_id in self._loaded)
+
+    def capture(self, label, skin_cluster, influences, weights, geometry=None):
+        """
+        保存快照
+
+        Args:
+            label: 快照名称
+            skin_cluster: 蒙皮节点名称
+            influences: 骨骼名称列表（权重的列顺序）
+            weights: 稠密权重 [顶点数, 骨骼数] 或 SparseWeights
+
+        Returns:
+            Snapshot: 新快照
+        """
+        if not isinstance(weights, SparseWeights):
+            weights = SparseWeights.from_dense(weights)
+        snapshot = Snapshot(next(self._ids), label, skin_cluster, influences, weights, geometry)
+        self._snapshots[snapshot.id] = snapshot
+        self._loaded[snapshot.id] = True
+        self._enforce_limit()
+        return snapshot
+
+    def snapshots(self, skin_cluster=None):
+        """按创建顺序列出快照，可以只列出某个蒙皮节点的快照"""
+        return [snapshot for snapshot in self._snapshots.values()
+                if skin_cluster is None or snapshot.skin_cluster == skin_cluster]
+
+    def get(self, snapshot_id):
+        """获取快照（已溢出到磁盘的快照会重新读入内存）"""
+        snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is None:
+            raise KeyError(f"快照不存在: {snapshot_id}")
+        if snapshot.weights is None:
+            snapshot.weights = read_sparse(snapshot.path)
+        self._loaded[snapshot_id] = True
+        self._loaded.move_to_end(snapshot_id)
+        self._enforce_limit()
+        return snapshot
+
+    def diff(self, first_id, second_id, tolerance=0.5 / WEIGHT_SCALE):
+        """比较两个快照，见 diff_weights"""
+        first = self.get(first_id)
+        first_weights = first.weights
+        second = self.get(second_id)
+        return diff_weights(first.influences, first_weights, second.influences, second.weights, tolerance)
+
+    def remove(self, snapshot_id):
+        """删除快照"""
+        snapshot = self._snapshots.pop(snapshot_id, None)
+        self._loaded.pop(snapshot_id, None)
+        if snapshot is not None and snapshot.path and os.path.exists(snapshot.path):
+            os.remove(snapshot.path)
+
+    def clear(self):
+        """删除所有快照"""
+        for snapshot_id in list(self._snapshots):
+            self.remove(snapshot_id)
+
+    def _enforce_limit(self):
+        """超过内存上限时移出最久未使用的快照（至少保留最近使用的一个）"""
+        while len(self._loaded) > 1 and self.memory_bytes > self.memory_limit:
+            snapshot_id, _ = self._loaded.popitem(last=False)
+            snapshot = self._snapshots[snapshot_id]
+            if self.spill_dir is None:
+                del self._snapshots[snapshot_id]
+                if self.on_drop is not None:
+                    self.on_drop(snapshot)
+                else:
+                    print(f"快照 {snapshot.label} 超出内存上限，已丢弃")
+                continue
+            if snapshot.path is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                file_name = f"snapshot_{_host_name()}_{os.getpid()}_{snapshot.id}{FILE_EXTENSION}"
+                snapshot.path = os.path.join(self.spill_dir, file_name)
+                write_weights(snapshot.path, SkinWeightData(snapshot.influences, snapshot.weights, None,
+                                                            snapshot.geometry, snapshot.skin_cluster))
+            snapshot.weights = None
+
+
+def diff_weights(first_influences, first, second_influences, second, tolerance=0.5 / WEIGHT_SCALE):
+    """
+    比较两组稀疏权重（骨骼按名称对应，只在一组中存在的骨骼权重视为0）
+
+    Args:
+        first_influences, second_influences: 骨骼名称列表
+        first, second: SparseWeights
+        tolerance: 权重变化超过该值的顶点算作改变
+
+    Returns:
+        dict: {"vertices": 改变的顶点索引, "delta": 每个顶点的最大权重变化, "max_delta": 最大变化}
+    """
+    vertex_count = first.shape[0]
+    if vertex_count != second.shape[0]:
+        raise ValueError(f"顶点数不一致: {vertex_count}, {second.shape[0]}")
+
+    columns = {name: column for column, name in enumerate(first_influences)}
+    for name in second_influences:
+        columns.setdefault(name, len(columns))
+    width = len(columns)
+    second_columns = np.array([columns[name] for name in second_influences], dtype=np.int64)
+
+    # 以 (顶点, 骨骼) 为键，在量化后的整数上相减
+    keys = np.concatenate([first.row_ids() * width + first.indices,
+                           second.row_ids() * width + second_columns[second.indices]])
+    values = np.concatenate([first.values.astype(np.int64), -second.values.astype(np.int64)])
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    changes = np.abs(np.bincount(inverse, weights=values, minlength=len(unique_keys))) / WEIGHT_SCALE
+
+    # 键已排序，同一顶点的键连续排列
+    delta = np.zeros(vertex_count)
+    if len(unique_keys):
+        rows = unique_keys // width
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        delta[rows[starts]] = np.maximum.reduceat(changes, starts)
+
+    return {
+        "vertices": np.flatnonzero(delta > tolerance),
+        "delta": delta,
+        "max_delta": float(delta.max()) if len(delta) else 0.0,
+    }
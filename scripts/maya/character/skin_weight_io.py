@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮权重文件格式 - 读写Nexus二进制权重文件（.nxw），不依赖Maya，可在批处理进程中使用
+
+文件布局（小端序）:
+    偏移  类型         说明
+    0     char[4]      魔数 b"NXSW"
+    4     uint16       格式版本
+    6     uint16       保留
+    8     uint32       头部长度 H（字节）
+    12    char[H]      UTF-8 JSON头部
+    ...   填充到16字节对齐
+    ...   数据块，每块从16字节对齐的位置开始
+
+JSON头部:
+    geometry        模型名称
+    skin_cluster    蒙皮节点名称
+    vertex_count    顶点数
+    influences      骨骼名称列表（权重矩阵的列顺序）
+    arrays          {名称: {"offset": 文件偏移, "dtype": numpy类型, "shape": 形状}}
+    weights         版本2: 稀疏权重的编码和分块表（见下）
+
+版本1的数组:
+    positions       float32[vertex_count, 3]  顶点世界坐标
+    weights         float32[vertex_count, influence_count]  稠密权重矩阵
+
+版本2只在arrays中保存positions，权重按CSR稀疏格式分块保存:
+    weights = {"encoding": "csr", "scale": 65535, "codec": "zlib"|"zstd"|"none",
+               "index_dtype": "<u2"|"<u4", "count_dtype": "<u2"|"<u4", "chunk_size": 每块顶点数,
+               "chunks": [{"offset", "size", "start", "rows", "nnz"}, ...]}
+    每块压缩前依次为 count_dtype[rows] 每个顶点的骨骼数、index_dtype[nnz] 骨骼索引、
+    uint16[nnz] 权重（value / scale），每块单独压缩。骨骼数超过65535时count_dtype和index_dtype都为<u4；
+    没有count_dtype的文件为<u2。
+
+数组和数据块都通过文件映射读取，只读取部分顶点时只解压对应的数据块。
+"""
+
+import json
+import mmap
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"NXSW"
+FORMAT_VERSION = 2
+FILE_EXTENSION = ".nxw"
+
+# 权重量化为16位定点数: value / WEIGHT_SCALE
+WEIGHT_SCALE = 65535
+
+# 每个数据块的顶点数
+CHUNK_SIZE = 16384
+
+# 默认压缩方式（安装了zstandard时使用zstd）
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+COMPRESSION_LEVEL = 3
+
+# 归一化误差在该范围内的顶点量化后修正为权重和正好为1
+NORMALIZE_TOLERANCE = 1e-4
+
+_PREFIX = struct.Struct("<4sHHI")
+_ALIGN = 16
+
+
+class SkinWeightData:
+    """一个蒙皮节点的权重数据"""
+
+    def __init__(self, influences, weights, positions=None, geometry=None, skin_cluster=None):
+        """
+        Args:
+            influences: 骨骼名称列表
+            weights: 权重矩阵 [顶点数, 骨骼数] 或 SparseWeights
+            positions: 顶点世界坐标 [顶点数, 3]
+            geometry: 模型名称
+            skin_cluster: 蒙皮节点名称
+        """
+        self.influences = list(influences)
+        self.weights = weights
+        self.positions = positions
+        self.geometry = geometry
+        self.skin_cluster = skin_cluster
+
+    @property
+    def vertex_count(self):
+        return self.weights.shape[0]
+
+
+class SparseWeights:
+    """
+    CSR格式的量化权重: 每个顶点只保存非零的骨骼索引和16位定点权重
+
+    row_pointers[i]:row_pointers[i+1] 是第i个顶点在indices和values中的范围。
+    """
+
+    def __init__(self, row_pointers, indices, values, influence_count):
+        self.row_pointers = np.asarray(row_pointers, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.values = np.asarray(values, dtype=np.uint16)
+        self.influence_count = int(influence_count)
+
+    @classmethod
+    def from_dense(cls, weights):
+        """
+        从稠密权重矩阵量化
+
+        权重和为1（误差在NORMALIZE_TOLERANCE内）的顶点，量化误差加到最大的权重上，
+        使量化后的权重和正好等于WEIGHT_SCALE。
+        16位定点数只能表示0到1的权重，超出范围的权重（例如未归一化的蒙皮）会引发ValueError，而不是被截断。
+        """
+        weights = np.asarray(weights)
+        vertex_count, influence_count = weights.shape
+        if weights.size:
+            low, high = float(weights.min()), float(weights.max())
+            if low < -0.5 / WEIGHT_SCALE or high > 1.0 + 0.5 / WEIGHT_SCALE:
+                raise ValueError(f"权重超出0到1的范围（{low:.6g} ~ {high:.6g}），无法量化保存")
+        rows, columns = np.nonzero(weights >= 0.5 / WEIGHT_SCALE)
+        quantized = np.rint(weights[rows, columns] * WEIGHT_SCALE).astype(np.int64)
+
+        counts = np.bincount(rows, minlength=vertex_count)
+        row_pointers = np.zeros(vertex_count + 1, dtype=np.int64)
+        np.cumsum(counts, out=row_pointers[1:])
+
+        # 归一化修正: 每个顶点最大的权重吸收量化误差
+        if len(quantized):
+            occupied = np.flatnonzero(counts)
+            starts = row_pointers[occupied]
+            row_max = np.maximum.reduceat(quantized, starts)
+            is_max = np.flatnonzero(quantized == np.repeat(row_max, counts[occupied]))
+            first = np.ones(len(is_max), dtype=bool)
+            first[1:] = rows[is_max[1:]] != rows[is_max[:-1]]
+            largest = is_max[first]
+
+            totals = weights.sum(axis=1)[occupied]
+            error = WEIGHT_SCALE - np.add.reduceat(quantized, starts)
+            normalized = np.abs(totals - 1.0) <= NORMALIZE_TOLERANCE
+            quantized[largest[normalized]] += error[normalized]
+            np.clip(quantized, 0, WEIGHT_SCALE, out=quantized)
+
+        index_dtype = np.uint16 if influence_count <= 0xFFFF else np.uint32
+        return cls(row_pointers, columns.astype(index_dtype), quantized.astype(np.uint16), influence_count)
+
+    @property
+    def shape(self):
+        return (len(self.row_pointers) - 1, self.influence_count)
+
+    @property
+    def nbytes(self):
+        return self.row_pointers.nbytes + self.indices.nbytes + self.values.nbytes
+
+    def row_ids(self):
+        """每个非零权重所在的顶点索引"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.row_pointers))
+
+    def slice_rows(self, start, stop):
+        """第start到stop个顶点的权重"""
+        begin, end = self.row_pointers[start], self.row_pointers[stop]
+        return SparseWeights(self.row_pointers[start:stop + 1] - begin, self.indices[begin:end],
+                             self.values[begin:end], self.influence_count)
+
+    def to_dense(self, dtype=np.float32, influences=None):
+        """
+        转换为稠密权重矩阵
+
+        Args:
+            dtype: 结果类型
+            influences: 只取这些骨骼列（索引列表），默认为全部
+        """
+        rows = self.row_ids()
+        columns = self.indices.astype(np.int64)
+        values = self.values
+        if influences is not None:
+            lookup = np.full(self.influence_count, -1, dtype=np.int64)
+            lookup[np.asarray(influences, dtype=np.int64)] = np.arange(len(influences))
+            columns = lookup[columns]
+            selected = columns >= 0
+            rows, columns, values = rows[selected], columns[selected], values[selected]
+            width = len(influences)
+        else:
+            width = self.influence_count
+        dense = np.zeros((self.shape[0], width), dtype=dtype)
+        dense[rows, columns] = values.astype(np.float64) / WEIGHT_SCALE
+        return dense
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _compress(data, codec):
+    if codec == "zlib":
+        return zlib.compress(data, COMPRESSION_LEVEL)
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd压缩需要安装zstandard")
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    if codec == "none":
+        return data
+    raise ValueError(f"不支持的压缩方式: {codec}")
+
+
+def _decompress(data, codec):
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("读取zstd压缩的权重文件需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _encode_chunks(sparse, chunk_size, codec):
+    """按顶点分块编码稀疏权重，返回 (块信息列表, 块数据列表)"""
+    chunks = []
+    blobs = []
+    for start in range(0, sparse.shape[0], chunk_size):
+        stop = min(start + chunk_size, sparse.shape[0])
+        block = sparse.slice_rows(start, stop)
+        # 每个顶点的骨骼数不超过骨骼总数，与骨骼索引使用相同的类型
+        index_dtype = block.indices.dtype.newbyteorder("<")
+        raw = b"".join([np.diff(block.row_pointers).astype(index_dtype).tobytes(),
+                        block.indices.astype(index_dtype).tobytes(),
+                        block.values.astype("<u2").tobytes()])
+        chunks.append({"start": start, "rows": stop - start, "nnz": len(block.values)})
+        blobs.append(_compress(raw, codec))
+    return chunks, blobs
+
+
+def write_weights(file_path, data, codec=None, chunk_size=CHUNK_SIZE):
+    """
+    写入权重文件（版本2，稀疏量化权重）
+
+    Args:
+        file_path: 文件路径
+        data: SkinWeightData
+        codec: 压缩方式 "zlib", "zstd" 或 "none"，默认为DEFAULT_CODEC
+        chunk_size: 每个数据块的顶点数
+
+    Returns:
+        int: 文件大小（字节）
+    """
+    codec = codec or DEFAULT_CODEC
+    sparse = data.weights if isinstance(data.weights, SparseWeights) else SparseWeights.from_dense(data.weights)
+    chunks, blobs = _encode_chunks(sparse, chunk_size, codec)
+
+    arrays = {}
+    if data.positions is not None:
+        arrays["positions"] = np.ascontiguousarray(data.positions, dtype=np.float32)
+
+    header = {
+        "geometry": data.geometry,
+        "skin_cluster": data.skin_cluster,
+        "vertex_count": int(sparse.shape[0]),
+        "influences": data.influences,
+        "arrays": {},
+        "weights": {
+            "encoding": "csr",
+            "scale": WEIGHT_SCALE,
+            "codec": codec,
+            "index_dtype": sparse.indices.dtype.newbyteorder("<").str,
+            "count_dtype": sparse.indices.dtype.newbyteorder("<").str,
+            "chunk_size": chunk_size,
+            "chunks": chunks,
+        },
+    }
+
+    # 头部中的偏移依赖头部长度，重复计算直到长度不再变化
+    header_bytes = b""
+    while True:
+        offset = _aligned(_PREFIX.size + len(header_bytes))
+        for name, array in arrays.items():
+            header["arrays"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset = _aligned(offset + array.nbytes)
+        for chunk, blob in zip(chunks, blobs):
+            chunk["offset"] = offset
+            chunk["size"] = len(blob)
+            offset = _aligned(offset + len(blob))
+        encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        converged = len(encoded) == len(header_bytes)
+        header_bytes = encoded
+        if converged:
+            break
+
+    with open(file_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+        for chunk, blob in zip(chunks, blobs):
+            f.write(b"\0" * (chunk["offset"] - f.tell()))
+            f.write(blob)
+        return f.tell()
+
+
+def read_header(file_path):
+    """读取权重文件头部"""
+    with open(file_path, "rb") as f:
+        magic, version, _, header_length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"不是Nexus权重文件: {file_path}")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"不支持的权重文件版本: {version}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    header["version"] = version
+    return header
+
+
+def _map_array(file_path, info, mmap=True):
+    """按头部中的偏移读取（或映射）一个数组"""
+    dtype = np.dtype(info["dtype"])
+    shape = tuple(info["shape"])
+    if mmap:
+        return np.memmap(file_path, dtype=dtype, mode="r", offset=info["offset"], shape=shape)
+    with open(file_path, "rb") as f:
+        f.seek(info["offset"])
+        return np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _decode_chunk(mapped, chunk, encoding):
+    """解压一个数据块，返回 (每个顶点的骨骼数, 骨骼索引, 权重)"""
+    raw = _decompress(mapped[chunk["offset"]:chunk["offset"] + chunk["size"]], encoding["codec"])
+    index_dtype = np.dtype(encoding["index_dtype"])
+    rows, nnz = chunk["rows"], chunk["nnz"]
+    counts = np.frombuffer(raw, dtype=encoding.get("count_dtype", "<u2"), count=rows)
+    offset = counts.nbytes
+    indices = np.frombuffer(raw, dtype=index_dtype, count=nnz, offset=offset)
+    offset += indices.nbytes
+    values = np.frombuffer(raw, dtype="<u2", count=nnz, offset=offset)
+    return counts, indices, values
+
+
+def read_sparse(file_path, start=0, stop=None, header=None):
+    """
+    读取部分顶点的稀疏权重，只解压与 [start, stop) 重叠的数据块
+
+    Args:
+        file_path: 文件路径
+        start, stop: 顶点范围，stop默认为全部顶点；超出 [0, 顶点数] 的部分被截取，start不小于stop时结果为空
+        header: 已读取的头部，避免重复读取
+
+    Returns:
+        SparseWeights: 第start到stop个顶点的权重
+    """
+    header = header or read_header(file_path)
+    vertex_count = header["vertex_count"]
+    start = min(max(int(start), 0), vertex_count)
+    stop = vertex_count if stop is None else min(max(int(stop), start), vertex_count)
+    influence_count = len(header["influences"])
+
+    # 版本1: 从稠密矩阵中取出对应的行
+    if header["version"] < 2:
+        dense = _map_array(file_path, header["arrays"]["weights"])
+        return SparseWeights.from_dense(dense[start:stop])
+
+    encoding = header["weights"]
+    if encoding.get("scale", WEIGHT_SCALE) != WEIGHT_SCALE:
+        raise ValueError(f"不支持的权重量化比例: {encoding['scale']}")
+
+    counts, indices, values = [], [], []
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for chunk in encoding["chunks"]:
+            chunk_start = chunk["start"]
+            chunk_stop = chunk_start + chunk["rows"]
+            if chunk_stop <= start or chunk_start >= stop:
+                continue
+            chunk_counts, chunk_indices, chunk_values = _decode_chunk(mapped, chunk, encoding)
+            pointers = np.concatenate([[0], np.cumsum(chunk_counts, dtype=np.int64)])
+            first, last = max(start, chunk_start) - chunk_start, min(stop, chunk_stop) - chunk_start
+            counts.append(chunk_counts[first:last])
+            indices.append(chunk_indices[pointers[first]:pointers[last]].copy())
+            values.append(chunk_values[pointers[first]:pointers[last]].copy())
+
+    index_dtype = np.dtype(encoding["index_dtype"])
+    row_pointers = np.zeros(stop - start + 1, dtype=np.int64)
+    if counts:
+        np.cumsum(np.concatenate(counts), out=row_pointers[1:])
+    return SparseWeights(row_pointers,
+                         np.concatenate(indices) if indices else np.zeros(0, dtype=index_dtype),
+                         np.concatenate(values) if values else np.zeros(0, dtype=np.uint16),
+                         influence_count)
+
+
+def read_weight_rows(file_path, start=0, stop=None, influences=None):
+    """
+    读取部分顶点和部分骨骼的稠密权重
+
+    Args:
+        file_path: 文件路径
+        start, stop: 顶点范围
+        influences: 骨骼名称或列索引列表，默认为全部骨骼
+
+    Returns:
+        ndarray: float32权重 [顶点数, 骨骼数]
+    """
+    header = read_header(file_path)
+    columns = None
+    if influences is not None:
+        names = {name: column for column, name in enumerate(header["influences"])}
+        columns = [names[item] if isinstance(item, str) else int(item) for item in influences]
+    return read_sparse(file_path, start, stop, header).to_dense(np.float32, columns)
+
+
+def read_weights(file_path, mmap=False, sparse=False):
+    """
+    读取权重文件
+
+    Args:
+        file_path: 文件路径
+        mmap: 是否只映射文件中的数组而不立即读取（适合只访问部分顶点）
+        sparse: 返回SparseWeights而不是稠密矩阵
+
+    Returns:
+        SkinWeightData: 权重数据
+    """
+    header = read_header(file_path)
+    arrays = header["arrays"]
+    positions = _map_array(file_path, arrays["positions"], mmap) if "positions" in arrays else None
+
+    if header["version"] < 2 and not sparse:
+        weights = _map_array(file_path, arrays["weights"], mmap)
+    else:
+        weights = read_sparse(file_path, header=header)
+        if not sparse:
+            weights = weights.to_dense()
+
+    return SkinWeightData(header["influences"], weights, positions,
+                          header.get("geometry"), header.get("skin_cluster"))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮权重运算 - 对整个权重矩阵 [顶点数, 骨骼数] 做向量化处理，不依赖Maya
+"""
+
+import hashlib
+import collections
+
+import numpy as np
+
+from spatial_index import SpatialIndex
+
+# 对称映射缓存的最大条目数
+SYMMETRY_CACHE_SIZE = 32
+
+# (拓扑哈希, 镜像轴, 容差) -> 对称映射
+_symmetry_cache = collections.OrderedDict()
+
+
+def short_name(name):
+    """去掉DAG路径和命名空间的节点名称，用于按名称匹配骨骼"""
+    return name.split("|")[-1].split(":")[-1]
+
+
+def match_influences(source_influences, target_influences):
+    """
+    按名称（忽略路径和命名空间）把源骨骼匹配到目标骨骼
+
+    Returns:
+        tuple: (每个源骨骼对应的目标列索引，未匹配时为-1, 未匹配的源骨骼名称列表)
+    """
+    target_columns = {}
+    for column, name in enumerate(target_influences):
+        target_columns.setdefault(short_name(name), column)
+
+    columns = np.array([target_columns.get(short_name(name), -1) for name in source_influences], dtype=np.int64)
+    missing = [name for name, column in zip(source_influences, columns) if column < 0]
+    return columns, missing
+
+
+def remap_weights(data, target_influences, target_points=None, target_vertex_count=None, method="auto"):
+    """
+    把权重文件中的权重映射到目标模型和目标骨骼
+
+    Args:
+        data: SkinWeightData
+        target_influences: 目标蒙皮节点的骨骼名称（结果的列顺序）
+        target_points: 目标顶点坐标 [顶点数, 3]，按位置映射时需要
+        target_vertex_count: 目标顶点数，默认取target_points的长度
+        method: "index" 按顶点序号, "closest" 按最近点, "auto" 顶点数相同时按序号否则按最近点
+
+    Returns:
+        tuple: (权重 [目标顶点数, 目标骨骼数], 信息 {"method", "max_distance", "missing"})
+    """
+    if target_vertex_count is None:
+        target_vertex_count = len(target_points)
+    if method == "auto":
+        method = "index" if data.vertex_count == target_vertex_count else "closest"
+
+    info = {"method": method, "max_distance": 0.0}
+    if method == "index":
+        if data.vertex_count != target_vertex_count:
+            raise ValueError(f"顶点数不一致: 文件 {data.vertex_count}, 模型 {target_vertex_count}")
+        source = np.asarray(data.weights)
+    else:
+        if data.positions is None or target_points is None:
+            raise ValueError("按最近点映射需要权重文件和目标模型的顶点坐标")
+        distances, indices = SpatialIndex(data.positions).query(target_points)
+        info["max_distance"] = float(distances.max()) if len(distances) else 0.0
+        source = np.asarray(data.weights)[indices]
+
+    info["missing"] = []
+    return reorder_influences(source, data.influences, target_influences), info
+
+
+def reorder_influences(weights, source_influences, target_influences):
+    """
+    把权重矩阵的列从源骨骼顺序换成目标骨骼顺序
+
+    Returns:
+        ndarray: 权重 [顶点数, 目标骨骼数]
+    """
+    columns, missing = match_influences(source_influences, target_influences)
+    if missing:
+        raise ValueError(f"目标蒙皮中缺少骨骼: {', '.join(missing)}")
+
+    # 多个源骨骼对应同一个目标骨骼时权重相加
+    weights = np.asarray(weights)
+    result = np.zeros((weights.shape[0], len(target_influences)), dtype=np.float64)
+    for source_column, target_column in enumerate(columns):
+        result[:, target_column] += weights[:, source_column]
+    return result
+
+
+def interpolate_weights(weights, vertices, barycentric):
+    """
+    按三角形重心坐标插值源顶点的权重
+
+    Args:
+        weights: 源权重 [源顶点数, 骨骼数]
+        vertices: 每个目标点所在三角形的顶点索引 [目标数, 3]
+        barycentric: 重心坐标 [目标数, 3]
+
+    Returns:
+        ndarray: 权重 [目标数, 骨骼数]
+    """
+    weights = np.asarray(weights)
+    result = weights[vertices[:, 0]] * barycentric[:, 0:1]
+    result += weights[vertices[:, 1]] * barycentric[:, 1:2]
+    result += weights[vertices[:, 2]] * barycentric[:, 2:3]
+    return result
+
+
+def topology_hash(face_counts, face_connects):
+    """根据每个面的顶点数和面顶点索引计算拓扑哈希（顶点位置变化不影响）"""
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(face_counts, dtype=np.int32).tobytes())
+    sha.update(np.ascontiguousarray(face_connects, dtype=np.int32).tobytes())
+    return sha.hexdigest()
+
+
+def build_symmetry_map(points, axis=0, tolerance=0.001):
+    """
+    建立顶点对称映射: 把每个顶点沿镜像轴翻转后查找最近的顶点
+
+    Args:
+        points: 顶点坐标 [顶点数, 3]
+        axis: 镜像轴 0=X(YZ平面), 1=Y(XZ平面), 2=Z(XY平面)
+        tolerance: 翻转后的位置与对称顶点的最大距离
+
+    Returns:
+        ndarray: 每个顶点的对称顶点索引，找不到时为-1
+    """
+    points = np.asarray(points, dtype=np.float64)
+    mirrored = points.copy()
+    mirrored[:, axis] *= -1.0
+    # 只查找容差范围内的点，没有对称顶点的顶点不需要继续向外搜索
+    distances, indices = SpatialIndex(points).query(mirrored, max_distance=np.nextafter(tolerance, np.inf))
+    return np.where(distances <= tolerance, indices, -1)
+
+
+def points_hash(points):
+    """顶点坐标的哈希"""
+    return hashlib.sha1(np.ascontiguousarray(points, dtype=np.float64).tobytes()).hexdigest()
+
+
+def get_symmetry_map(topology_key, points, axis=0, tolerance=0.001):
+    """
+    获取对称映射，拓扑和顶点位置都相同的模型只计算一次
+
+    映射由世界坐标计算，移动、换姿势或修改形状后（以及同一模型的其他实例）顶点位置不同，需要重新计算。
+    """
+    key = (topology_key, points_hash(points), axis, tolerance)
+    symmetry_map = _symmetry_cache.get(key)
+    if symmetry_map is None:
+        symmetry_map = build_symmetry_map(points, axis, tolerance)
+        _symmetry_cache[key] = symmetry_map
+        while len(_symmetry_cache) > SYMMETRY_CACHE_SIZE:
+            _symmetry_cache.popitem(last=False)
+    else:
+        _symmetry_cache.move_to_end(key)
+    return symmetry_map
+
+
+def clear_symmetry_cache():
+    """清空对称映射缓存"""
+    _symmetry_cache.clear()
+
+
+def build_influence_pairs(influences, search="l_", replace="r_"):
+    """
+    按名称替换规则配对左右骨骼
+
+    Returns:
+        ndarray: 每个骨骼对应的镜像骨骼索引，没有配对的骨骼对应自身
+    """
+    columns = {short_name(name): column for column, name in enumerate(influences)}
+    pairs = np.arange(len(influences))
+    if not search or not replace:
+        return pairs
+
+    for column, name in enumerate(influences):
+        name = short_name(name)
+        if search in name:
+            mirrored = name.replace(search, replace)
+        elif replace in name:
+            mirrored = name.replace(replace, search)
+        else:
+            continue
+        pair = columns.get(mirrored)
+        # 只接受双向一致的配对
+        if pair is not None and pairs[pair] == pair:
+            pairs[column] = pair
+            pairs[pair] = column
+    return pairs
+
+
+def mirror_weight_matrix(weights, points, symmetry_map, influence_pairs, axis=0, positive_to_negative=True,
+                   tolerance=0.001):
+    """
+    镜像整个权重矩阵: 目标一侧的顶点使用对称顶点的权重，并交换左右骨骼的列
+
+    Args:
+        weights: 权重 [顶点数, 骨骼数]
+        points: 顶点坐标，用于判断顶点在哪一侧
+        symmetry_map: build_symmetry_map的结果
+        influence_pairs: build_influence_pairs的结果
+        axis: 镜像轴
+        positive_to_negative: 从正方向镜像到负方向，否则相反
+        tolerance: 坐标绝对值不超过容差的顶点视为中线顶点，保持不变
+
+    Returns:
+        tuple: (新的权重, 被修改的顶点数, 找不到对称顶点的目标顶点数)
+    """
+    coordinate = np.asarray(points)[:, axis]
+    destination = coordinate < -tolerance if positive_to_negative else coordinate > tolerance
+    matched = destination & (symmetry_map >= 0)
+
+    result = np.array(weights, dtype=np.float64, copy=True)
+    result[matched] = result[symmetry_map[matched]][:, influence_pairs]
+    return result, int(matched.sum()), int((destination & (symmetry_map < 0)).sum())
+
+
+def clean_weight_matrix(weights, prune_threshold=0.01, max_influences=4, tolerance=1e-6):
+    """
+    清理权重矩阵: 去掉小于阈值的权重，限制每个顶点的最大骨骼数，再归一化
+
+    每个顶点的截断值取阈值和第max_influences大的权重中较大的一个，只对超过数量的顶点做部分排序；
+    所有权重都被去掉的顶点保留原来权重最大的骨骼。
+
+    Args:
+        weights: 权重 [顶点数, 骨骼数]
+        prune_threshold: 小于该值的权重置为0
+        max_influences: 每个顶点最多保留的骨骼数，0表示不限制
+        tolerance: 去掉的权重之和或归一化前后的差超过该值时算作修改
+
+    Returns:
+        tuple: (新权重, 被修改的顶点数)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    influence_count = weights.shape[1]
+    keep = weights >= prune_threshold
+
+    if 0 < max_influences < influence_count:
+        kth = influence_count - max_influences
+        over = np.count_nonzero(keep, axis=1) > max_influences
+        rows = np.flatnonzero(over)
+        if len(rows):
+            cutoff = np.full(len(weights), float(prune_threshold))
+            # 大部分顶点都超过限制时直接对整个矩阵部分排序，省去取出这些行的复制
+            if len(rows) * 2 > len(weights):
+                cutoff[over] = np.partition(weights, kth, axis=1)[over, kth]
+            else:
+                cutoff[rows] = np.partition(weights[rows], kth, axis=1)[:, kth]
+            keep = weights >= cutoff[:, None]
+
+            # 与截断值相等的权重使保留的数量超过限制时，这些顶点再精确截取
+            ties = rows[np.count_nonzero(keep[rows], axis=1) > max_influences]
+            if len(ties):
+                drop = np.argpartition(weights[ties], kth, axis=1)[:, :kth]
+                tie_keep = keep[ties]
+                np.put_along_axis(tie_keep, drop, False, axis=1)
+                keep[ties] = tie_keep
+
+    # 行求和用矩阵乘向量，比sum(axis=1)快
+    ones = np.ones(influence_count)
+    result = np.multiply(weights, keep)
+    original_totals = weights @ ones
+    totals = result @ ones
+    empty = np.flatnonzero((totals <= 0) & (original_totals > 0))
+    if len(empty):
+        result[empty, weights[empty].argmax(axis=1)] = 1.0
+        totals[empty] = 1.0
+
+    # 原地归一化（总和为0的顶点保持为0）
+    scale = np.zeros_like(totals)
+    np.divide(1.0, totals, out=scale, where=totals > 0)
+    result *= scale[:, None]
+    changed = (original_totals - totals > tolerance) | (np.abs(original_totals - 1.0) > tolerance)
+    return result, int(np.count_nonzero(changed & (original_totals > 0)))
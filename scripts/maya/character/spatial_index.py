@@ -0,0 +1,602 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+空间索引 - 批量最近点查询，不依赖Maya
+
+有scipy时使用 scipy.spatial.cKDTree；没有scipy时（Maya自带的Python通常没有）
+使用numpy实现的均匀网格，按立方体环逐层向外搜索，所有查询点一起向量化处理；
+离点集较远的查询点交给格子更大的网格。SurfaceIndex 用多级三角形网格精确查询三角网格表面的最近点。
+"""
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# 均匀网格中平均每个格子的点数
+POINTS_PER_CELL = 1.0
+
+# 超过这么多层仍未确定的目标点（离点集较远）改用格子更大的网格查询
+MAX_RINGS = 3
+
+# 每一级粗网格格子中的点数是上一级的倍数
+COARSE_FACTOR = 64
+
+# 一次展开的候选点数上限（目标点离点集很远、格子很大时分批计算，限制内存）
+MAX_CANDIDATES = 1 << 22
+
+# 三角形网格的格子大小相对于三角形包围盒边长（中位数）的倍数
+TRIANGLE_CELL_SCALE = 1.0
+
+# 包围盒覆盖超过这么多格子的三角形（例如大面积的平面）不登记到三角形网格中，对所有目标点单独检查
+MAX_TRIANGLE_CELLS = 64
+
+# 三角形网格每一级格子的边长是下一级的倍数
+TRIANGLE_LEVEL_SCALE = 2
+
+# 表面查询时目标点的搜索范围最多覆盖这么多格子，超过时从格子更大的一级开始
+MAX_SEARCH_CELLS = 64
+
+# 表面查询时每批一起逐级细分的目标点数
+SEARCH_BATCH = 1024
+
+
+class SpatialIndex:
+    """点集的最近点索引"""
+
+    def __init__(self, points, use_scipy=True, points_per_cell=POINTS_PER_CELL):
+        """
+        Args:
+            points: 点坐标 [点数, 3]
+            use_scipy: 有scipy时是否使用cKDTree
+            points_per_cell: 均匀网格中平均每个格子的点数
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        if len(self.points) == 0:
+            raise ValueError("空间索引至少需要一个点")
+        self.points_per_cell = points_per_cell
+        self._coarse = None
+
+        self._tree = cKDTree(self.points) if (use_scipy and cKDTree is not None) else None
+        if self._tree is None:
+            self._build_grid()
+
+    def _build_grid(self):
+        """建立均匀网格: 按格子编号排序的点索引"""
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+
+        # 平面或直线上的点只按有厚度的轴计算格子大小
+        active = extent > max(float(extent.max()) * 1e-4, 1e-9)
+        if active.any():
+            measure = float(np.prod(extent[active]))
+            cell_size = (measure * self.points_per_cell / len(self.points)) ** (1.0 / active.sum())
+        else:
+            cell_size = 1.0
+        self.cell_size = max(cell_size, float(extent.max()) / 1024.0, 1e-9)
+        self.dims = np.floor(extent / self.cell_size).astype(np.int64) + 1
+
+        # 按格子编号排序的点索引，以及每个格子在其中的起始位置（格子数与点数同一量级）
+        keys = self._cell_keys(self._cell_coords(self.points))
+        self._order = np.argsort(keys, kind="stable")
+        self._cell_starts = np.zeros(int(np.prod(self.dims)) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=len(self._cell_starts) - 1), out=self._cell_starts[1:])
+
+    def _cell_coords(self, points):
+        coords = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(coords, 0, self.dims - 1)
+
+    def _cell_keys(self, coords):
+        return (coords[:, 0] * self.dims[1] + coords[:, 1]) * self.dims[2] + coords[:, 2]
+
+    def query(self, targets, k=1, max_distance=np.inf):
+        """
+        查询每个目标点最近的k个点
+
+        Args:
+            targets: 目标点 [目标数, 3]
+            k: 最近点数量
+            max_distance: 只查找距离小于该值的点，只需要近处结果时（例如对称映射）可以避免远处目标点的搜索
+
+        Returns:
+            tuple: (距离 [目标数, k], 索引 [目标数, k])；k为1时返回一维数组。
+                没有找到的点距离为inf、索引为点数（与cKDTree一致）
+        """
+        targets = np.ascontiguousarray(targets, dtype=np.float64).reshape(-1, 3)
+        k = min(k, len(self.points))
+        if self._tree is not None:
+            distances, indices = self._tree.query(targets, k=k, distance_upper_bound=max_distance)
+            if k > 1:
+                return distances, indices
+            return np.asarray(distances), np.asarray(indices)
+
+        distances, indices = self._query_grid(targets, k, max_distance)
+        missing = (indices < 0) | ~(distances < max_distance)
+        distances[missing] = np.inf
+        indices[missing] = len(self.points)
+        if k == 1:
+            return distances[:, 0], indices[:, 0]
+        return distances, indices
+
+    def _ring_offsets(self, ring):
+        """第ring层立方体环上的格子偏移"""
+        axis = np.arange(-ring, ring + 1)
+        offsets = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+        if ring > 0:
+            offsets = offsets[np.abs(offsets).max(axis=1) == ring]
+        return offsets[np.all(np.abs(offsets) < self.dims, axis=1)]
+
+    def _query_grid(self, targets, k, max_distance=np.inf):
+        count = len(targets)
+        best_distances = np.full((count, k), float(max_distance))
+        best_indices = np.full((count, k), -1, dtype=np.int64)
+        cells = self._cell_coords(targets)
+        pending = np.arange(count)
+
+        ring = 0
+        while len(pending):
+            pending_cells = cells[pending]
+            pending_targets = targets[pending]
+            for offset in self._ring_offsets(ring):
+                # 目标点到格子的最短距离（网格外的目标点也准确），跳过不可能更近的格子
+                lower = self.origin + (pending_cells + offset) * self.cell_size
+                gap = np.maximum(np.maximum(lower - pending_targets, pending_targets - lower - self.cell_size), 0.0)
+                near = np.einsum("ij,ij->i", gap, gap) < np.square(best_distances[pending, k - 1])
+                if not near.any():
+                    continue
+                query_ids, starts, counts = self._cell_ranges(pending_cells[near] + offset, pending[near])
+                for chunk in self._chunks(counts):
+                    point_ids = self._expand(starts[chunk], counts[chunk])
+                    candidates = np.repeat(query_ids[chunk], counts[chunk])
+                    distances = np.linalg.norm(self.points[point_ids] - targets[candidates], axis=1)
+                    if k == 1:
+                        self._merge_nearest(best_distances, best_indices, query_ids[chunk], counts[chunk],
+                                            point_ids, distances)
+                    else:
+                        self._merge(best_distances, best_indices, candidates, point_ids, distances, k)
+
+            # 搜索范围外的点到目标点的最短距离，第k近的点不超过它时结果已确定
+            bound = self._outside_distance(pending_targets, pending_cells, ring)
+            resolved = best_distances[pending, k - 1] <= bound
+            pending = pending[~resolved]
+            ring += 1
+            if ring > MAX_RINGS and len(pending):
+                distances, indices = self._coarse_index()._query_grid(targets[pending], k, max_distance)
+                best_distances[pending] = distances
+                best_indices[pending] = indices
+                break
+
+        return best_distances, best_indices
+
+    def _coarse_index(self):
+        """格子更大的网格（按需建立），用于离点集较远的目标点"""
+        if self._coarse is None:
+            self._coarse = SpatialIndex(self.points, use_scipy=False,
+                                        points_per_cell=self.points_per_cell * COARSE_FACTOR)
+        return self._coarse
+
+    def _cell_ranges(self, neighbor, query_ids):
+        """
+        每个目标点对应格子中的点在排序索引中的范围（只保留非空格子）
+
+        Returns:
+            tuple: (有候选点的目标索引, 起始位置, 点数)
+        """
+        valid = np.all((neighbor >= 0) & (neighbor < self.dims), axis=1)
+        keys = self._cell_keys(neighbor[valid])
+        starts = self._cell_starts[keys]
+        counts = self._cell_starts[keys + 1] - starts
+        nonempty = counts > 0
+        return query_ids[valid][nonempty], starts[nonempty], counts[nonempty]
+
+    @staticmethod
+    def _chunks(counts):
+        """按候选点数上限把目标分批，每批至少一个目标"""
+        ends = np.cumsum(counts)
+        start = 0
+        while start < len(counts):
+            limit = (ends[start - 1] if start else 0) + MAX_CANDIDATES
+            stop = max(int(np.searchsorted(ends, limit, side="right")), start + 1)
+            yield slice(start, stop)
+            start = stop
+
+    def _expand(self, starts, counts):
+        """把每个格子的 [start, start+count) 展开成连续的点索引"""
+        total = int(counts.sum())
+        group_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(starts, counts) + (np.arange(total) - group_offsets)
+        return self._order[positions]
+
+    def _merge_nearest(self, best_distances, best_indices, query_ids, counts, point_ids, distances):
+        """k为1时的合并: 每组取最小值，不需要排序"""
+        group_starts = np.cumsum(counts) - counts
+        group_min = np.minimum.reduceat(distances, group_starts)
+
+        # 每组中第一个等于最小值的候选点
+        is_min = np.flatnonzero(distances == np.repeat(group_min, counts))
+        groups = np.repeat(np.arange(len(counts)), counts)[is_min]
+        first = np.ones(len(groups), dtype=bool)
+        first[1:] = groups[1:] != groups[:-1]
+        group_argmin = point_ids[is_min[first]]
+
+        better = group_min < best_distances[query_ids, 0]
+        best_distances[query_ids[better], 0] = group_min[better]
+        best_indices[query_ids[better], 0] = group_argmin[better]
+
+    def _merge(self, best_distances, best_indices, query_ids, point_ids, distances, k):
+        """把新的候选点与已有的最近k个点合并"""
+        touched = np.unique(query_ids)
+        query_ids = np.concatenate([query_ids, np.repeat(touched, k)])
+        point_ids = np.concatenate([point_ids, best_indices[touched].ravel()])
+        distances = np.concatenate([distances, best_distances[touched].ravel()])
+
+        order = np.lexsort((distances, query_ids))
+        query_ids = query_ids[order]
+        point_ids = point_ids[order]
+        distances = distances[order]
+
+        # 每个目标点内的名次，只保留前k个
+        group_start = np.searchsorted(query_ids, query_ids, side="left")
+        rank = np.arange(len(query_ids)) - group_start
+        keep = rank < k
+        best_distances[query_ids[keep], rank[keep]] = distances[keep]
+        best_indices[query_ids[keep], rank[keep]] = point_ids[keep]
+
+    def _outside_distance(self, targets, cells, ring):
+        """
+        已搜索的立方体之外（网格之内）的点到目标点的最短可能距离，网格已全部搜索时为inf
+
+        网格之内、立方体之外的部分由每个轴上立方体两侧的长方体组成，分别计算目标点到它们的距离，
+        离点集很远的目标点也能得到准确的下界。
+        """
+        grid_lower = self.origin
+        grid_upper = self.origin + self.dims * self.cell_size
+        cube_lower = self.origin + (cells - ring) * self.cell_size
+        cube_upper = self.origin + (cells + ring + 1) * self.cell_size
+
+        # 目标点到网格包围盒在各个轴上的距离
+        axis_gap = np.maximum(np.maximum(grid_lower - targets, targets - grid_upper), 0.0)
+        squared = np.square(axis_gap)
+        total = squared.sum(axis=1)
+
+        result = np.full(len(targets), np.inf)
+        for axis in range(3):
+            others = total - squared[:, axis]
+            value = targets[:, axis]
+            lower_gap = np.maximum(np.maximum(grid_lower[axis] - value, value - cube_lower[:, axis]), 0.0)
+            upper_gap = np.maximum(np.maximum(cube_upper[:, axis] - value, value - grid_upper[axis]), 0.0)
+            result = np.minimum(result, np.where(cells[:, axis] - ring > 0, others + np.square(lower_gap), np.inf))
+            result = np.minimum(result, np.where(cells[:, axis] + ring + 1 < self.dims[axis],
+                                                 others + np.square(upper_gap), np.inf))
+        return np.sqrt(result)
+
+def closest_point_on_triangles(points, a, b, c):
+    """
+    计算每个点到对应三角形的最近点（向量化），返回重心坐标 [点数, 3]
+
+    按点相对三角形所在的区域（顶点、边、内部）分别计算，退化三角形取第一个顶点。
+    """
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+    d1 = np.einsum("ij,ij->i", ab, ap)
+    d2 = np.einsum("ij,ij->i", ac, ap)
+    d3 = np.einsum("ij,ij->i", ab, bp)
+    d4 = np.einsum("ij,ij->i", ac, bp)
+    d5 = np.einsum("ij,ij->i", ab, cp)
+    d6 = np.einsum("ij,ij->i", ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 三角形内部
+        denom = va + vb + vc
+        v = vb / denom
+        w = vc / denom
+        bary = np.stack([1.0 - v - w, v, w], axis=1)
+
+        # 按优先级从低到高覆盖: 边BC、顶点C、边AC、边AB、顶点B、顶点A
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        bary[region] = np.stack([np.zeros_like(t), 1.0 - t, t], axis=1)[region]
+
+        t = d2 / (d2 - d6)
+        region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        bary[region] = np.stack([1.0 - t, np.zeros_like(t), t], axis=1)[region]
+
+        region = (d6 >= 0) & (d5 <= d6)
+        bary[region] = (0.0, 0.0, 1.0)
+
+        t = d1 / (d1 - d3)
+        region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        bary[region] = np.stack([1.0 - t, t, np.zeros_like(t)], axis=1)[region]
+
+        region = (d3 >= 0) & (d4 <= d3)
+        bary[region] = (0.0, 1.0, 0.0)
+
+        region = (d1 <= 0) & (d2 <= 0)
+        bary[region] = (1.0, 0.0, 0.0)
+
+    bary[~np.all(np.isfinite(bary), axis=1)] = (1.0, 0.0, 0.0)
+    return bary
+
+
+def _merge_closest(distances, nearest, query_ids, candidates, candidate_distances):
+    """每个目标点取距离最近的候选（query_ids按目标点连续排列），比已有结果更近时写入"""
+    group_starts = np.flatnonzero(np.r_[True, query_ids[1:] != query_ids[:-1]])
+    minimum = np.minimum.reduceat(candidate_distances, group_starts)
+    is_min = np.flatnonzero(candidate_distances == np.repeat(minimum, np.diff(np.r_[group_starts, len(query_ids)])))
+    first = np.ones(len(is_min), dtype=bool)
+    first[1:] = query_ids[is_min[1:]] != query_ids[is_min[:-1]]
+    best = is_min[first]
+
+    targets = query_ids[best]
+    closer = candidate_distances[best] < distances[targets]
+    distances[targets[closer]] = candidate_distances[best][closer]
+    nearest[targets[closer]] = candidates[best][closer]
+
+
+class _TriangleGrid:
+    """
+    三角形的多级均匀网格（SurfaceIndex内部使用）
+
+    最细一级中每个三角形登记在其包围盒覆盖的所有格子中；上一级格子的边长是下一级的 TRIANGLE_LEVEL_SCALE 倍，
+    只记录哪些格子非空。距离小于上限D的三角形上一定有一个点在 [目标点-D, 目标点+D] 覆盖的格子中:
+    从这个范围不超过 MAX_SEARCH_CELLS 个格子的一级开始，跳过空格子和离目标点不小于D的格子，逐级细分到
+    最细一级，只检查剩下格子中的三角形。离表面较远的目标点也只需要检查最近点附近的少量三角形。
+    """
+
+    def __init__(self, surface, max_cells):
+        """
+        Args:
+            surface: 所属的SurfaceIndex（顶点、三角形和三角形包围盒）
+            max_cells: 包围盒覆盖超过这么多格子的三角形不登记，放在 excluded 中
+        """
+        self.surface = surface
+        lower = surface.triangle_min
+        upper = surface.triangle_max
+        self.origin = lower.min(axis=0)
+        extent = upper.max(axis=0) - self.origin
+        # 每个轴不超过2^20个格子，格子编号不会溢出
+        cell_size = TRIANGLE_CELL_SCALE * float(np.median((upper - lower).max(axis=1)))
+        self.cell_size = max(cell_size, float(extent.max()) / (1 << 20), 1e-9)
+        self.dims = [np.floor(extent / self.cell_size).astype(np.int64) + 1]
+
+        owners, cells = self._box_cells(lower, upper, 0)
+        registered = np.bincount(owners, minlength=len(lower)) <= max_cells
+        self.excluded = np.flatnonzero(~registered)
+        cells = cells[registered[owners]]
+        owners = owners[registered[owners]]
+
+        # 最细一级: 按格子编号排序的三角形索引，以及每个非空格子的编号和起始位置
+        keys = self._cell_keys(cells, 0)
+        order = np.argsort(keys, kind="stable")
+        self._order = owners[order]
+        keys, self._cell_starts = np.unique(keys[order], return_index=True)
+        self._cell_starts = np.append(self._cell_starts, len(owners))
+        self._keys = [keys]
+
+        # 上面各级只记录非空格子，直到整个网格不超过 MAX_SEARCH_CELLS 个格子
+        while np.prod(self.dims[-1]) > MAX_SEARCH_CELLS:
+            dims = self.dims[-1]
+            coords = np.stack([keys // (dims[1] * dims[2]), (keys // dims[2]) % dims[1], keys % dims[2]], axis=1)
+            self.dims.append((dims + TRIANGLE_LEVEL_SCALE - 1) // TRIANGLE_LEVEL_SCALE)
+            keys = np.unique(self._cell_keys(coords // TRIANGLE_LEVEL_SCALE, len(self.dims) - 1))
+            self._keys.append(keys)
+
+        axis = np.arange(TRIANGLE_LEVEL_SCALE)
+        self._children = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    def __len__(self):
+        return len(self.surface.triangles) - len(self.excluded)
+
+    def _cell_coords(self, points, level):
+        size = self.cell_size * TRIANGLE_LEVEL_SCALE ** level
+        return np.clip(np.floor((points - self.origin) / size), 0, self.dims[level] - 1).astype(np.int64)
+
+    def _cell_keys(self, coords, level):
+        dims = self.dims[level]
+        return (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+
+    def _box_cells(self, lower, upper, level):
+        """包围盒 [lower, upper] 覆盖的格子，返回 (包围盒索引, 格子坐标)"""
+        first = self._cell_coords(lower, level)
+        spans = self._cell_coords(upper, level) - first + 1
+        counts = np.prod(spans, axis=1)
+        owners = np.repeat(np.arange(len(lower)), counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        spans = spans[owners]
+        offsets = np.stack([local // (spans[:, 1] * spans[:, 2]), (local // spans[:, 2]) % spans[:, 1],
+                            local % spans[:, 2]], axis=1)
+        return owners, first[owners] + offsets
+
+    def _keep_cells(self, targets, distances, owners, cells, level):
+        """只保留非空、离目标点小于上限的格子，返回 (目标索引, 格子坐标, 格子编号)"""
+        size = self.cell_size * TRIANGLE_LEVEL_SCALE ** level
+        lower = self.origin + cells * size
+        gap = np.maximum(np.maximum(lower - targets[owners], targets[owners] - lower - size), 0.0)
+        near = np.einsum("ij,ij->i", gap, gap) < np.square(distances[owners])
+        owners, cells = owners[near], cells[near]
+
+        keys = self._cell_keys(cells, level)
+        level_keys = self._keys[level]
+        positions = np.minimum(np.searchsorted(level_keys, keys), len(level_keys) - 1)
+        found = level_keys[positions] == keys
+        return owners[found], cells[found], positions[found]
+
+    def query_within(self, targets, bounds):
+        """
+        查找距离小于 bounds 的最近三角形
+
+        Returns:
+            tuple: (距离, 三角形索引)，没有更近的三角形时为 bounds 和 -1
+        """
+        distances = np.array(bounds, dtype=np.float64)
+        nearest = np.full(len(targets), -1, dtype=np.int64)
+
+        # 每个目标点从搜索范围不超过 MAX_SEARCH_CELLS 个格子的一级开始
+        lower = targets - distances[:, None]
+        upper = targets + distances[:, None]
+        start_level = np.full(len(targets), len(self.dims) - 1)
+        for level in range(len(self.dims) - 2, -1, -1):
+            spans = self._cell_coords(upper, level) - self._cell_coords(lower, level) + 1
+            start_level[np.prod(spans, axis=1) <= MAX_SEARCH_CELLS] = level
+
+        for first in range(0, len(targets), SEARCH_BATCH):
+            batch = np.arange(first, min(first + SEARCH_BATCH, len(targets)))
+            owners = np.empty(0, dtype=np.int64)
+            cells = np.empty((0, 3), dtype=np.int64)
+            for level in range(len(self.dims) - 1, -1, -1):
+                if len(owners):
+                    # 上一级剩下的格子细分为这一级的格子
+                    owners = np.repeat(owners, len(self._children))
+                    cells = (cells[:, None, :] * TRIANGLE_LEVEL_SCALE + self._children).reshape(-1, 3)
+                    inside = np.all(cells < self.dims[level], axis=1)
+                    owners, cells = owners[inside], cells[inside]
+                starting = batch[start_level[batch] == level]
+                if len(starting):
+                    box_owners, box_cells = self._box_cells(lower[starting], upper[starting], level)
+                    owners = np.concatenate([owners, starting[box_owners]])
+                    cells = np.concatenate([cells, box_cells])
+                owners, cells, positions = self._keep_cells(targets, distances, owners, cells, level)
+            if len(owners):
+                self._check_cells(targets, distances, nearest, owners, positions)
+        return distances, nearest
+
+    def _check_cells(self, targets, distances, nearest, owners, positions):
+        """检查最细一级格子中的三角形（同一目标点的候选连续排列）"""
+        order = np.argsort(owners, kind="stable")
+        owners, positions = owners[order], positions[order]
+        starts = self._cell_starts[positions]
+        counts = self._cell_starts[positions + 1] - starts
+        group_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        triangle_ids = self._order[np.repeat(starts, counts) + (np.arange(int(counts.sum())) - group_offsets)]
+        query_ids = np.repeat(owners, counts)
+
+        # 先用包围盒距离排除不可能更近的三角形，只对剩下的计算精确距离
+        gap = np.maximum(np.maximum(self.surface.triangle_min[triangle_ids] - targets[query_ids],
+                                    targets[query_ids] - self.surface.triangle_max[triangle_ids]), 0.0)
+        near = np.einsum("ij,ij->i", gap, gap) < np.square(distances[query_ids])
+        triangle_ids, query_ids = triangle_ids[near], query_ids[near]
+        if len(query_ids):
+            _merge_closest(distances, nearest, query_ids, triangle_ids,
+                           self.surface.triangle_distances(triangle_ids, targets[query_ids]))
+
+
+class SurfaceIndex:
+    """
+    三角网格表面的最近点索引
+
+    先在最近顶点相邻的三角形中找到一个最近点，再以它的距离为上限在三角形网格中查找更近的三角形，
+    结果是精确的最近点。包围盒特别大的三角形不登记到网格中，对所有目标点单独检查。
+    同一个源模型建立一次，可以给任意多个目标模型查询。
+    """
+
+    def __init__(self, points, triangles, batch_size=50000):
+        """
+        Args:
+            points: 顶点坐标 [顶点数, 3]
+            triangles: 三角形顶点索引 [三角形数, 3]
+            batch_size: 每批处理的目标点数
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int64).reshape(-1, 3)
+        if not len(self.triangles):
+            raise ValueError("表面索引至少需要一个三角形")
+        self.batch_size = batch_size
+
+        # 只索引属于三角形的顶点，孤立顶点没有相邻三角形，不能作为候选
+        self._indexed_vertices = np.unique(self.triangles)
+        self.vertex_index = SpatialIndex(self.points[self._indexed_vertices])
+
+        # 顶点 -> 相邻三角形（按顶点排序的三角形索引和每个顶点的起始位置）
+        corners = self.triangles.ravel()
+        order = np.argsort(corners, kind="stable")
+        self._vertex_triangles = order // 3
+        self._vertex_starts = np.zeros(len(self.points) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(corners, minlength=len(self.points)), out=self._vertex_starts[1:])
+
+        corners = self.points[self.triangles]
+        self.triangle_min = corners.min(axis=1)
+        self.triangle_max = corners.max(axis=1)
+        self.grid = _TriangleGrid(self, MAX_TRIANGLE_CELLS)
+
+    def triangle_distances(self, triangle_ids, targets):
+        """目标点到对应三角形的距离"""
+        return np.linalg.norm(targets - self._closest_points(triangle_ids, targets)[1], axis=1)
+
+    def _closest_points(self, triangle_ids, targets):
+        """目标点在对应三角形上的最近点，返回 (重心坐标, 最近点)"""
+        corners = self.triangles[triangle_ids]
+        a = self.points[corners[:, 0]]
+        b = self.points[corners[:, 1]]
+        c = self.points[corners[:, 2]]
+        bary = closest_point_on_triangles(targets, a, b, c)
+        return bary, bary[:, 0:1] * a + bary[:, 1:2] * b + bary[:, 2:3] * c
+
+    def query(self, targets):
+        """
+        查询每个目标点在表面上的最近点
+
+        Returns:
+            tuple: (三角形顶点索引 [目标数, 3], 重心坐标 [目标数, 3], 距离 [目标数])
+        """
+        targets = np.ascontiguousarray(targets, dtype=np.float64).reshape(-1, 3)
+        vertices = np.empty((len(targets), 3), dtype=np.int64)
+        bary = np.empty((len(targets), 3))
+        distances = np.empty(len(targets))
+        for start in range(0, len(targets), self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            vertices[batch], bary[batch], distances[batch] = self._query_batch(targets[batch])
+        return vertices, bary, distances
+
+    def _query_batch(self, targets):
+        distances, nearest = self._nearest_vertex_triangles(targets)
+
+        # 在网格中查找比上限更近的三角形
+        if len(self.grid):
+            distances, closer = self.grid.query_within(targets, distances)
+            nearest = np.where(closer >= 0, closer, nearest)
+        if len(self.grid.excluded):
+            self._check_large_triangles(targets, distances, nearest)
+
+        bary, closest = self._closest_points(nearest, targets)
+        return self.triangles[nearest], bary, np.linalg.norm(targets - closest, axis=1)
+
+    def _nearest_vertex_triangles(self, targets):
+        """最近顶点相邻的三角形中最近的一个，返回 (距离, 三角形索引)"""
+        _, nearest = self.vertex_index.query(targets)
+        nearest = self._indexed_vertices[nearest]
+
+        # 展开每个目标点的候选三角形（按目标点分组，每个顶点至少有一个三角形）
+        starts = self._vertex_starts[nearest]
+        counts = self._vertex_starts[nearest + 1] - starts
+        group_starts = np.cumsum(counts) - counts
+        triangle_ids = self._vertex_triangles[np.repeat(starts, counts) + (np.arange(int(counts.sum())) -
+                                                                           np.repeat(group_starts, counts))]
+        query_ids = np.repeat(np.arange(len(targets)), counts)
+
+        distances = np.full(len(targets), np.inf)
+        nearest = np.zeros(len(targets), dtype=np.int64)
+        _merge_closest(distances, nearest, query_ids, triangle_ids,
+                       self.triangle_distances(triangle_ids, targets[query_ids]))
+        return distances, nearest
+
+    def _check_large_triangles(self, targets, distances, nearest):
+        """逐个检查不在网格中的大三角形，包围盒距离不小于当前最近距离的跳过"""
+        large = self.grid.excluded
+        step = max(1, MAX_CANDIDATES // (4 * len(large)))
+        for first in range(0, len(targets), step):
+            batch = slice(first, first + step)
+            points = targets[batch, None, :]
+            gap = np.maximum(np.maximum(self.triangle_min[large] - points, points - self.triangle_max[large]), 0.0)
+            rows, columns = np.nonzero(np.einsum("ijk,ijk->ij", gap, gap) < np.square(distances[batch, None]))
+            if not len(rows):
+                continue
+            rows += first
+            _merge_closest(distances, nearest, rows, large[columns], self.triangle_distances(large[columns], targets[rows]))
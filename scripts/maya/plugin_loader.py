@@ -7,9 +7,23 @@ Nexus插件加载器 - 为Maya加载Nexus插件
 import os
 import sys
 import json
+import shutil
+import zipfile
+import threading
+import importlib.util
 import maya.cmds as cmds
+import maya.utils
 from maya import OpenMayaUI as omui
 
+# 确保可以导入Nexus核心模块
+NEXUS_HOME = os.environ.get("NEXUS_HOME", os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if NEXUS_HOME not in sys.path:
+    sys.path.append(NEXUS_HOME)
+
+from core.nexus_paths import load_settings as load_nexus_settings
+from core.plugin_package import (InstallCancelled, activate_staged, get_retention, read_package_config,
+                                 resolve_plugin_dir, stage_package)
+
 try:
     from PySide2.QtCore import *
     from PySide2.QtGui import *
@@ -19,6 +33,7 @@ except ImportError:
     from PyQt5.QtCore import *
     from PyQt5.QtGui import *
     from PyQt5.QtWidgets import *
+    from PyQt5.QtCore import pyqtSignal as Signal
     from shiboken2 import wrapInstance
 
 def maya_main_window():
@@ -26,6 +41,184 @@ def maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
     return wrapInstance(int(main_window_ptr), QWidget)
 
+def get_plugin_status(config):
+    """根据入口模块是否已导入判断插件状态"""
+    entry_point = config.get("entry_point", "")
+    if entry_point and entry_point.split(".")[0] in sys.modules:
+        return "已加载"
+    return "未加载"
+
+class PluginScanThread(QThread):
+    """在后台线程中扫描插件目录，分批发送读取到的插件"""
+    
+    # 一批插件信息 (扫描序号, [{"id", "path", "config"}])
+    plugins_found = Signal(int, list)
+    
+    # 每读取多少个插件发送一次
+    BATCH_SIZE = 16
+    
+    def __init__(self, plugins_dir, generation=0, parent=None):
+        super(PluginScanThread, self).__init__(parent)
+        self.plugins_dir = plugins_dir
+        self.generation = generation
+    
+    def run(self):
+        if not os.path.isdir(self.plugins_dir):
+            return
+        
+        batch = []
+        for entry in os.scandir(self.plugins_dir):
+            if self.isInterruptionRequested():
+                return
+            
+            # 跳过暂存目录等隐藏目录，以及旧版本遗留的备份目录
+            plugin_dir = entry.name
+            if plugin_dir.startswith(".") or plugin_dir.endswith(".bak") or ".bak." in plugin_dir \
+                    or not entry.is_dir():
+                continue
+            
+            # 获取插件当前版本所在的目录
+            plugin_path = resolve_plugin_dir(entry.path)
+            if not plugin_path:
+                continue
+            
+            config_file = os.path.join(plugin_path, "plugin.json")
+            try:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except Exception as e:
+                print(f"读取插件配置失败: {config_file}, 错误: {str(e)}")
+                continue
+            
+            # 检查是否是Maya插件
+            if "software" in config and "Maya" not in config["software"]:
+                continue
+            
+            batch.append({"id": plugin_dir, "path": plugin_path, "config": config})
+            if len(batch) >= self.BATCH_SIZE:
+                self.plugins_found.emit(self.generation, batch)
+                batch = []
+        
+        if batch:
+            self.plugins_found.emit(self.generation, batch)
+
+class PluginTableModel(QAbstractTableModel):
+    """插件列表模型，每个插件只保存一份路径和配置"""
+    
+    HEADERS = ["名称", "版本", "作者", "状态"]
+    
+    def __init__(self, parent=None):
+        super(PluginTableModel, self).__init__(parent)
+        self.plugins = []  # [{"id", "path", "config", "status"}]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.plugins)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        
+        plugin = self.plugins[index.row()]
+        if role == Qt.UserRole:
+            return plugin
+        
+        config = plugin["config"]
+        column = index.column()
+        if column == 0:
+            return config.get("name", plugin["id"])
+        if column == 1:
+            return config.get("version", "1.0.0")
+        if column == 2:
+            return config.get("author", "未知")
+        return plugin["status"]
+    
+    def clear(self):
+        """清空列表"""
+        self.beginResetModel()
+        self.plugins = []
+        self.endResetModel()
+    
+    def append_plugins(self, plugins):
+        """追加一批插件（扫描线程读取到后逐批加入）"""
+        if not plugins:
+            return
+        for plugin in plugins:
+            plugin["status"] = get_plugin_status(plugin["config"])
+        first = len(self.plugins)
+        self.beginInsertRows(QModelIndex(), first, first + len(plugins) - 1)
+        self.plugins.extend(plugins)
+        self.endInsertRows()
+    
+    def set_status(self, row, status):
+        """更新插件状态"""
+        self.plugins[row]["status"] = status
+        index = self.index(row, 3)
+        self.dataChanged.emit(index, index)
+
+class PluginInstallThread(QThread):
+    """
+    在后台线程中解压插件包，只有最后的激活步骤在Maya主线程中执行
+    """
+    
+    # 解压进度 (百分比)
+    progress_changed = Signal(int)
+    # 安装完成 (plugin_id, config)
+    install_finished = Signal(str, dict)
+    # 安装失败或取消 (错误信息, 是否为取消)
+    install_failed = Signal(str, bool)
+    
+    def __init__(self, package_path, plugins_dir, keep=5, parent=None):
+        super(PluginInstallThread, self).__init__(parent)
+        self.package_path = package_path
+        self.plugins_dir = plugins_dir
+        self.keep = keep
+        self.cancel_event = threading.Event()
+        self._percent = -1
+    
+    def cancel(self):
+        """请求取消安装（解压过程中的下一个数据块时生效）"""
+        self.cancel_event.set()
+    
+    def _on_progress(self, done_bytes, total_bytes):
+        percent = int(done_bytes * 100 / total_bytes) if total_bytes else 100
+        if percent != self._percent:
+            self._percent = percent
+            self.progress_changed.emit(percent)
+    
+    def run(self):
+        try:
+            # 直接从ZIP中央目录读取插件信息，检查是否是Maya插件
+            with zipfile.ZipFile(self.package_path, 'r') as zip_ref:
+                config = read_package_config(zip_ref)
+            if "software" in config and "Maya" not in config["software"]:
+                raise ValueError("插件不兼容: 此插件不支持Maya")
+            
+            # 流式解压到暂存目录（后台线程）
+            plugin_id, config, staging_path = stage_package(
+                self.package_path, self.plugins_dir, self._on_progress, self.cancel_event, lower_id=True)
+            
+            if self.cancel_event.is_set():
+                shutil.rmtree(staging_path, ignore_errors=True)
+                raise InstallCancelled(f"安装已取消: {plugin_id}")
+            
+            # 切换到新版本（主线程）
+            maya.utils.executeInMainThreadWithResult(
+                activate_staged, self.plugins_dir, plugin_id, config, staging_path, self.keep)
+            
+            self.install_finished.emit(plugin_id, config)
+        except InstallCancelled as e:
+            self.install_failed.emit(str(e), True)
+        except Exception as e:
+            self.install_failed.emit(str(e), False)
+
 class PluginLoaderUI(QDialog):
     def __init__(self, parent=maya_main_window()):
         super(PluginLoaderUI, self).__init__(parent)
@@ -36,6 +229,11 @@ class PluginLoaderUI(QDialog):
         # 插件目录
         self.plugins_dir = os.path.join(self.nexus_home, "plugins", "maya")
         
+        # 后台扫描线程和安装线程
+        self.scan_thread = None
+        self.scan_generation = 0  # 每次停止扫描时递增，旧扫描线程残留在事件队列中的批次被丢弃
+        self.install_thread = None
+        
         # 初始化UI
         self.setWindowTitle("Nexus插件加载器")
         self.setMinimumWidth(500)
@@ -51,10 +249,21 @@ class PluginLoaderUI(QDialog):
     
     def create_widgets(self):
         """创建控件"""
-        # 插件列表
-        self.plugin_list = QTableWidget()
-        self.plugin_list.setColumnCount(4)
-        self.plugin_list.setHorizontalHeaderLabels(["名称", "版本", "作者", "状态"])
+        # 插件列表（模型/视图，搜索框通过代理模型过滤所有列）
+        self.plugin_model = PluginTableModel(self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.plugin_model)
+        self.proxy_model.setFilterKeyColumn(-1)
+        self.proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索插件...")
+        self.search_edit.setClearButtonEnabled(True)
+        
+        self.plugin_list = QTableView()
+        self.plugin_list.setModel(self.proxy_model)
+        self.plugin_list.setSortingEnabled(True)
+        self.plugin_list.sortByColumn(0, Qt.AscendingOrder)
         self.plugin_list.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.plugin_list.setSelectionMode(QAbstractItemView.SingleSelection)
         self.plugin_list.setEditTriggers(QAbstractItemView.NoEditTriggers)
@@ -68,6 +277,14 @@ class PluginLoaderUI(QDialog):
         self.install_button = QPushButton("安装插件")
         self.close_button = QPushButton("关闭")
         
+        # 安装进度
+        self.install_progress = QProgressBar()
+        self.install_progress.setRange(0, 100)
+        self.install_progress.setFormat("正在安装: %p%")
+        self.cancel_install_button = QPushButton("取消安装")
+        self.install_progress.hide()
+        self.cancel_install_button.hide()
+        
         # 插件详情
         self.plugin_details = QTextEdit()
         self.plugin_details.setReadOnly(True)
@@ -80,6 +297,7 @@ class PluginLoaderUI(QDialog):
         # 插件列表区域
         list_group = QGroupBox("可用插件")
         list_layout = QVBoxLayout(list_group)
+        list_layout.addWidget(self.search_edit)
         list_layout.addWidget(self.plugin_list)
         
         # 按钮区域
@@ -90,6 +308,11 @@ class PluginLoaderUI(QDialog):
         button_layout.addWidget(self.install_button)
         button_layout.addWidget(self.close_button)
         
+        # 安装进度区域
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.install_progress)
+        progress_layout.addWidget(self.cancel_install_button)
+        
         # 详情区域
         details_group = QGroupBox("插件详情")
         details_layout = QVBoxLayout(details_group)
@@ -98,93 +321,76 @@ class PluginLoaderUI(QDialog):
         # 添加到主布局
         main_layout.addWidget(list_group)
         main_layout.addWidget(details_group)
+        main_layout.addLayout(progress_layout)
         main_layout.addLayout(button_layout)
     
     def create_connections(self):
         """创建信号连接"""
-        self.plugin_list.itemSelectionChanged.connect(self.update_plugin_details)
+        self.plugin_list.selectionModel().selectionChanged.connect(self.update_plugin_details)
+        self.search_edit.textChanged.connect(self.proxy_model.setFilterFixedString)
         self.load_button.clicked.connect(self.load_plugin)
         self.unload_button.clicked.connect(self.unload_plugin)
         self.refresh_button.clicked.connect(self.refresh_plugin_list)
         self.install_button.clicked.connect(self.install_plugin)
+        self.cancel_install_button.clicked.connect(self.cancel_install)
         self.close_button.clicked.connect(self.close)
     
     def refresh_plugin_list(self):
-        """刷新插件列表"""
-        self.plugin_list.setRowCount(0)
-        
-        # 检查插件目录是否存在
-        if not os.path.exists(self.plugins_dir):
+        """刷新插件列表（在后台线程中扫描，读取到的插件逐批加入列表）"""
+        self.stop_scan()
+        self.plugin_model.clear()
+        self.plugin_details.clear()
+        
+        self.scan_thread = PluginScanThread(self.plugins_dir, self.scan_generation, self)
+        self.scan_thread.plugins_found.connect(self.on_plugins_found)
+        self.scan_thread.finished.connect(self.plugin_list.resizeColumnsToContents)
+        self.scan_thread.start()
+    
+    def on_plugins_found(self, generation, plugins):
+        """扫描线程读取到一批插件"""
+        # 已停止的扫描线程发出的批次可能在清空列表后才送达
+        if generation != self.scan_generation:
             return
-        
-        # 扫描插件目录
-        row = 0
-        for plugin_dir in os.listdir(self.plugins_dir):
-            plugin_path = os.path.join(self.plugins_dir, plugin_dir)
-            
-            # 检查是否是目录
-            if not os.path.isdir(plugin_path):
-                continue
-            
-            # 检查是否有plugin.json文件
-            config_file = os.path.join(plugin_path, "plugin.json")
-            if not os.path.exists(config_file):
-                continue
-            
-            # 读取配置
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                
-                # 检查是否是Maya插件
-                if "software" in config and "Maya" not in config["software"]:
-                    continue
-                
-                # 添加到列表
-                self.plugin_list.insertRow(row)
-                
-                # 设置单元格内容
-                self.plugin_list.setItem(row, 0, QTableWidgetItem(config.get("name", plugin_dir)))
-                self.plugin_list.setItem(row, 1, QTableWidgetItem(config.get("version", "1.0.0")))
-                self.plugin_list.setItem(row, 2, QTableWidgetItem(config.get("author", "未知")))
-                
-                # 检查插件状态
-                status = "未加载"
-                try:
-                    # 检查初始化模块是否已导入
-                    entry_point = config.get("entry_point", "")
-                    if entry_point:
-                        module_path = entry_point.split(".")[0]
-                        if module_path in sys.modules:
-                            status = "已加载"
-                except:
-                    pass
-                
-                self.plugin_list.setItem(row, 3, QTableWidgetItem(status))
-                
-                # 存储插件路径和配置
-                for col in range(4):
-                    item = self.plugin_list.item(row, col)
-                    item.setData(Qt.UserRole, {"path": plugin_path, "config": config})
-                
-                row += 1
-            except Exception as e:
-                cmds.warning(f"读取插件配置失败: {config_file}, 错误: {str(e)}")
-        
-        # 调整列宽
-        self.plugin_list.resizeColumnsToContents()
+        self.plugin_model.append_plugins(plugins)
     
-    def update_plugin_details(self):
-        """更新插件详情"""
-        selected_items = self.plugin_list.selectedItems()
-        if not selected_items:
-            self.plugin_details.clear()
+    def stop_scan(self):
+        """停止正在进行的扫描并释放扫描线程"""
+        self.scan_generation += 1
+        thread, self.scan_thread = self.scan_thread, None
+        if thread is None:
             return
-        
-        # 获取选中行的第一个单元格
-        item = selected_items[0]
-        data = item.data(Qt.UserRole)
-        
+        try:
+            thread.plugins_found.disconnect(self.on_plugins_found)
+            thread.finished.disconnect(self.plugin_list.resizeColumnsToContents)
+        except (RuntimeError, TypeError):
+            pass
+        if thread.isRunning():
+            thread.requestInterruption()
+            thread.wait()
+        thread.deleteLater()
+    
+    def closeEvent(self, event):
+        self.stop_scan()
+        # 安装线程的激活步骤需要主线程，这里只请求取消而不等待
+        self.cancel_install()
+        super(PluginLoaderUI, self).closeEvent(event)
+    
+    def selected_plugin(self):
+        """
+        获取选中的插件
+        
+        Returns:
+            tuple: (模型中的行号, 插件信息)，没有选中时返回 (None, None)
+        """
+        indexes = self.plugin_list.selectionModel().selectedRows()
+        if not indexes:
+            return None, None
+        source_index = self.proxy_model.mapToSource(indexes[0])
+        return source_index.row(), self.plugin_model.plugins[source_index.row()]
+    
+    def update_plugin_details(self, *args):
+        """更新插件详情"""
+        _, data = self.selected_plugin()
         if not data:
             self.plugin_details.clear()
             return
@@ -226,17 +432,9 @@ class PluginLoaderUI(QDialog):
     
     def load_plugin(self):
         """加载选中的插件"""
-        selected_items = self.plugin_list.selectedItems()
-        if not selected_items:
-            cmds.warning("请先选择要加载的插件")
-            return
-        
-        # 获取选中行的第一个单元格
-        item = selected_items[0]
-        data = item.data(Qt.UserRole)
-        
+        row, data = self.selected_plugin()
         if not data:
-            cmds.warning("无法获取插件信息")
+            cmds.warning("请先选择要加载的插件")
             return
         
         config = data["config"]
@@ -285,9 +483,7 @@ class PluginLoaderUI(QDialog):
                 plugin_instance.initialize()
             
             # 更新状态
-            for i in range(len(selected_items)):
-                row = selected_items[i].row()
-                self.plugin_list.item(row, 3).setText("已加载")
+            self.plugin_model.set_status(row, "已加载")
             
             # 显示成功消息
             cmds.inViewMessage(
@@ -301,17 +497,9 @@ class PluginLoaderUI(QDialog):
     
     def unload_plugin(self):
         """卸载选中的插件"""
-        selected_items = self.plugin_list.selectedItems()
-        if not selected_items:
-            cmds.warning("请先选择要卸载的插件")
-            return
-        
-        # 获取选中行的第一个单元格
-        item = selected_items[0]
-        data = item.data(Qt.UserRole)
-        
+        row, data = self.selected_plugin()
         if not data:
-            cmds.warning("无法获取插件信息")
+            cmds.warning("请先选择要卸载的插件")
             return
         
         config = data["config"]
@@ -346,9 +534,7 @@ class PluginLoaderUI(QDialog):
                 del sys.modules[module_path]
             
             # 更新状态
-            for i in range(len(selected_items)):
-                row = selected_items[i].row()
-                self.plugin_list.item(row, 3).setText("未加载")
+            self.plugin_model.set_status(row, "未加载")
             
             # 显示成功消息
             cmds.inViewMessage(
@@ -388,70 +574,51 @@ class PluginLoaderUI(QDialog):
         if result != "确定":
             return
         
-        try:
-            # 创建临时目录
-            temp_dir = os.path.join(tempfile.gettempdir(), "nexus_plugin_temp")
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            os.makedirs(temp_dir)
-            
-            # 解压插件包
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-            
-            # 查找plugin.json文件
-            plugin_json = None
-            for root, dirs, files in os.walk(temp_dir):
-                if "plugin.json" in files:
-                    plugin_json = os.path.join(root, "plugin.json")
-                    break
-            
-            if not plugin_json:
-                cmds.warning("无效的插件包: 找不到plugin.json文件")
-                return
-            
-            # 读取插件信息
-            with open(plugin_json, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            # 检查是否是Maya插件
-            if "software" in config and "Maya" not in config["software"]:
-                cmds.warning(f"插件不兼容: 此插件不支持Maya")
-                return
-            
-            # 获取插件ID或名称
-            plugin_id = config.get("id", "").lower()
-            if not plugin_id:
-                plugin_id = config.get("name", "unknown").lower().replace(" ", "_")
-            
-            # 目标目录
-            target_dir = os.path.join(self.plugins_dir, plugin_id)
-            
-            # 如果目标目录已存在，先备份
-            if os.path.exists(target_dir):
-                backup_dir = f"{target_dir}.bak.{int(time.time())}"
-                shutil.move(target_dir, backup_dir)
-            
-            # 创建插件目录
-            if not os.path.exists(self.plugins_dir):
-                os.makedirs(self.plugins_dir)
-            
-            # 复制插件文件
-            plugin_root = os.path.dirname(plugin_json)
-            shutil.copytree(plugin_root, target_dir)
-            
-            # 刷新插件列表
-            self.refresh_plugin_list()
-            
-            # 显示成功消息
-            cmds.inViewMessage(
-                amg=f"插件 '{config.get('name', plugin_id)}' 已成功安装",
-                pos="midCenter",
-                fade=True,
-                fadeOutTime=2.0
-            )
-        except Exception as e:
-            cmds.warning(f"安装插件失败: {str(e)}")
+        # 在后台线程中安装，安装期间可以继续在Maya中工作
+        self.install_thread = PluginInstallThread(file_path, self.plugins_dir,
+                                                  get_retention(load_nexus_settings()), self)
+        self.install_thread.progress_changed.connect(self.install_progress.setValue)
+        self.install_thread.install_finished.connect(self.on_install_finished)
+        self.install_thread.install_failed.connect(self.on_install_failed)
+        self.install_thread.finished.connect(self.on_install_thread_finished)
+        
+        self.install_button.setEnabled(False)
+        self.install_progress.setValue(0)
+        self.install_progress.show()
+        self.cancel_install_button.show()
+        self.install_thread.start()
+    
+    def cancel_install(self):
+        """取消正在进行的安装"""
+        if self.install_thread is not None and self.install_thread.isRunning():
+            self.install_thread.cancel()
+    
+    def on_install_finished(self, plugin_id, config):
+        """安装完成"""
+        # 刷新插件列表
+        self.refresh_plugin_list()
+        
+        # 显示成功消息
+        cmds.inViewMessage(
+            amg=f"插件 '{config.get('name', plugin_id)}' 已成功安装",
+            pos="midCenter",
+            fade=True,
+            fadeOutTime=2.0
+        )
+    
+    def on_install_failed(self, error, cancelled):
+        """安装失败或被取消"""
+        if cancelled:
+            cmds.inViewMessage(amg=error, pos="midCenter", fade=True, fadeOutTime=2.0)
+        else:
+            cmds.warning(f"安装插件失败: {error}")
+    
+    def on_install_thread_finished(self):
+        """恢复安装按钮并隐藏进度条"""
+        self.install_thread = None
+        self.install_button.setEnabled(True)
+        self.install_progress.hide()
+        self.cancel_install_button.hide()
 
 def show_ui():
     """显示插件加载器UI"""
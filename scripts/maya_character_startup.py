@@ -6,9 +6,116 @@ Maya角色部门启动脚本 - 为Maya配置角色制作环境
 
 import os
 import sys
+import time
+import importlib
 import maya.cmds as cmds
 import maya.mel as mel
 
+# 确保可以导入Nexus核心模块
+NEXUS_HOME = os.environ.get("NEXUS_HOME", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if NEXUS_HOME not in sys.path:
+    sys.path.append(NEXUS_HOME)
+
+from core.nexus_paths import get_cache_dir, get_local_data_dir, load_settings
+from core.usage_tracker import MAYA_PLUGIN, MENU_TOOL, UsageTracker, get_current_user, usage_export_path
+
+# 角色部门常用的Maya插件
+CHARACTER_PLUGINS = [
+    "mgear_solvers.mll",  # 假设使用mgear作为绑定工具
+    "matrixNodes.mll"     # 矩阵节点插件
+]
+
+# 角色工具菜单（None为分隔线）；plugins为工具依赖的Maya插件，第一次使用工具时按需加载；
+# preload为False的工具模块不在启动时预导入。
+# 目前的角色工具都不依赖CHARACTER_PLUGINS，这些插件由用到它们的场景按需加载（见record_scene_plugin_usage）
+CHARACTER_TOOLS = [
+    {"name": "create_skeleton", "label": "创建骨架", "module": "character_rig_tools",
+     "function": "create_skeleton", "plugins": []},
+    {"name": "mirror_skeleton", "label": "骨骼镜像", "module": "character_rig_tools",
+     "function": "mirror_skeleton", "plugins": []},
+    {"name": "rig_build", "label": "绑定构建", "module": "character_rig_tools",
+     "function": "rig_build", "plugins": []},
+    None,
+    {"name": "skin_tools", "label": "蒙皮工具", "module": "character_skin_tools",
+     "function": "skin_tools_ui", "plugins": []},
+    {"name": "mirror_weights", "label": "权重镜像", "module": "character_skin_tools",
+     "function": "mirror_weights", "plugins": []},
+    None,
+    {"name": "plugin_loader", "label": "加载插件", "module": "plugin_loader",
+     "function": "show_ui", "plugins": [], "preload": False},
+]
+
+TOOLS_BY_NAME = {tool["name"]: tool for tool in CHARACTER_TOOLS if tool}
+
+# 当前会话的使用统计
+_usage = {"tracker": None, "session_id": None}
+
+class StartupScheduler:
+    """
+    分阶段启动调度器
+    
+    立即执行的阶段在run_now中同步运行；其余阶段通过
+    cmds.evalDeferred(lowestPriority=True) 逐个在Maya空闲时运行，
+    每个阶段之间Maya可以处理界面事件。每个阶段都会记录耗时。
+    """
+    
+    def __init__(self):
+        self.stages = []  # 等待执行的阶段 [(名称, 函数, 参数)]
+        self.timings = []  # 已执行的阶段 [(名称, 毫秒)]
+        self.started_at = time.perf_counter()
+        self.interactive_ms = None
+    
+    def run_now(self, name, func, *args):
+        """立即执行一个阶段"""
+        return self._run_stage(name, func, args)
+    
+    def defer(self, name, func, *args):
+        """添加一个在空闲时执行的阶段"""
+        self.stages.append((name, func, args))
+    
+    def _run_stage(self, name, func, args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as e:
+            print(f"启动阶段失败: {name}, 错误: {str(e)}")
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            self.timings.append((name, elapsed_ms))
+            print(f"启动阶段 {name}: {elapsed_ms:.1f}ms")
+    
+    def start(self):
+        """同步阶段结束、界面可用后调用，开始在空闲时执行延迟阶段"""
+        self.interactive_ms = (time.perf_counter() - self.started_at) * 1000.0
+        print(f"角色环境可交互耗时: {self.interactive_ms:.1f}ms")
+        self._schedule_next()
+    
+    def _schedule_next(self):
+        if self.stages:
+            cmds.evalDeferred(self._run_next, lowestPriority=True)
+        else:
+            self.report()
+    
+    def _run_next(self):
+        name, func, args = self.stages.pop(0)
+        self._run_stage(name, func, args)
+        self._schedule_next()
+    
+    def run_all(self):
+        """同步执行所有延迟阶段（批处理模式下没有空闲事件）"""
+        self.interactive_ms = (time.perf_counter() - self.started_at) * 1000.0
+        while self.stages:
+            name, func, args = self.stages.pop(0)
+            self._run_stage(name, func, args)
+        self.report()
+    
+    def report(self):
+        """打印启动耗时汇总"""
+        total_ms = (time.perf_counter() - self.started_at) * 1000.0
+        stage_ms = sum(elapsed for _, elapsed in self.timings)
+        print(f"角色环境启动完成: 总计{total_ms:.1f}ms，各阶段合计{stage_ms:.1f}ms")
+        return self.timings
+
 def setup_environment():
     """设置Maya环境变量和路径"""
     # 获取Nexus主目录
@@ -28,7 +135,7 @@ def setup_environment():
     return True
 
 def create_character_menu():
-    """创建角色工具菜单"""
+    """创建角色工具菜单（菜单命令在点击时才导入工具模块和加载依赖的插件）"""
     # 如果菜单已存在，先删除
     if cmds.menu("nexusCharacterMenu", exists=True):
         cmds.deleteUI("nexusCharacterMenu")
@@ -38,30 +145,132 @@ def create_character_menu():
     character_menu = cmds.menu("nexusCharacterMenu", label="角色工具", parent=gMainWindow, tearOff=True)
     
     # 添加菜单项
-    cmds.menuItem(parent=character_menu, label="创建骨架", 
-                 command="import character_rig_tools; character_rig_tools.create_skeleton()")
+    for tool in CHARACTER_TOOLS:
+        if tool is None:
+            cmds.menuItem(parent=character_menu, divider=True)
+        else:
+            cmds.menuItem(parent=character_menu, label=tool["label"],
+                          command=lambda *args, name=tool["name"]: run_tool(name))
     
-    cmds.menuItem(parent=character_menu, label="骨骼镜像", 
-                 command="import character_rig_tools; character_rig_tools.mirror_skeleton()")
+    print("已创建角色工具菜单")
+    return True
+
+def run_tool(name):
+    """运行菜单工具: 按需加载依赖的插件，记录使用情况，然后调用工具函数"""
+    tool = TOOLS_BY_NAME[name]
+    for plugin in tool["plugins"]:
+        load_character_plugin(plugin)
+        record_usage(MAYA_PLUGIN, plugin)
+    record_usage(MENU_TOOL, name)
     
-    cmds.menuItem(parent=character_menu, divider=True)
+    module = importlib.import_module(tool["module"])
+    return getattr(module, tool["function"])()
+
+def start_usage_session():
+    """
+    开始记录本次会话的使用统计
     
-    cmds.menuItem(parent=character_menu, label="蒙皮工具", 
-                 command="import character_skin_tools; character_skin_tools.skin_tools_ui()")
+    数据库保存在本机的用户数据目录中（SQLite的WAL模式不能用于网络共享）；
+    同时把自己最近的会话导出到共享缓存目录，供部门统计汇总。
+    """
+    try:
+        settings = load_settings()
+        tracker = UsageTracker(os.path.join(get_local_data_dir(), "usage.db"))
+        _usage["tracker"] = tracker
+        _usage["session_id"] = tracker.start_session(get_department(), get_current_user(), "Maya")
+        
+        # 保存场景或打开场景时记录场景中实际用到的插件
+        if not cmds.about(batch=True):
+            cmds.scriptJob(event=["SceneSaved", record_scene_plugin_usage])
+            cmds.scriptJob(event=["SceneOpened", record_scene_plugin_usage])
+    except Exception as e:
+        print(f"警告: 无法记录使用统计: {str(e)}")
+        return False
     
-    cmds.menuItem(parent=character_menu, label="权重镜像", 
-                 command="import character_skin_tools; character_skin_tools.mirror_weights()")
+    try:
+        tracker.export_usage(usage_export_path(get_usage_export_dir(settings)),
+                             window_days=settings.get("autoload_window_days", 30))
+    except Exception as e:
+        print(f"警告: 无法导出使用统计: {str(e)}")
+    return True
+
+def get_usage_export_dir(settings=None):
+    """共享的使用统计导出目录（每个用户一个文件）"""
+    return get_cache_dir(settings or load_settings(), "usage")
+
+def get_department():
+    """当前部门（由Nexus启动时设置）"""
+    return os.environ.get("NEXUS_DEPARTMENT", "Character")
+
+def record_usage(kind, name):
+    """记录一次使用，统计失败不影响工具运行"""
+    if _usage["tracker"] is None:
+        return
+    try:
+        _usage["tracker"].record_use(_usage["session_id"], kind, name)
+    except Exception as e:
+        print(f"警告: 记录使用统计失败: {str(e)}")
+
+def get_scene_plugins():
+    """
+    当前场景需要的插件名称（不含扩展名）
     
-    cmds.menuItem(parent=character_menu, divider=True)
+    包括节点正在使用的已加载插件，以及场景引用了但没有加载的插件（节点为unknown）。
+    """
+    try:
+        in_use = cmds.pluginInfo(query=True, pluginsInUse=True) or []
+        names = set(in_use[0::2])  # [名称, 版本, 名称, 版本, ...]
+        names.update(cmds.unknownPlugin(query=True, list=True) or [])
+        return names
+    except Exception:
+        return set()
+
+def record_scene_plugin_usage():
+    """
+    记录场景用到的角色插件，并按需加载场景需要但还没有加载的插件
     
-    cmds.menuItem(parent=character_menu, label="加载插件", 
-                 command="import plugin_loader; plugin_loader.show_ui()")
+    按场景需要的插件统计，而不是只检查已加载的插件，否则按需加载的插件不会再被统计到，
+    会一直留在按需加载中。
+    """
+    scene_plugins = get_scene_plugins()
+    for plugin in CHARACTER_PLUGINS:
+        if os.path.splitext(plugin)[0] not in scene_plugins:
+            continue
+        record_usage(MAYA_PLUGIN, plugin)
+        try:
+            if not cmds.pluginInfo(plugin, query=True, loaded=True):
+                if load_character_plugin(plugin):
+                    cmds.warning(f"场景需要的插件 {plugin} 已加载，请重新打开场景以恢复未知节点")
+        except Exception:
+            pass
+
+def get_autoload_profile():
+    """
+    根据使用统计生成自动加载配置
     
-    print("已创建角色工具菜单")
-    return True
+    Returns:
+        dict: 见UsageTracker.build_profile，没有足够的统计时返回None
+    """
+    if _usage["tracker"] is None:
+        return None
+    settings = load_settings()
+    profile = _usage["tracker"].build_profile(
+        get_department(), get_current_user(),
+        candidates={MAYA_PLUGIN: CHARACTER_PLUGINS, MENU_TOOL: list(TOOLS_BY_NAME)},
+        min_ratio=settings.get("autoload_min_ratio", 0.3),
+        window_days=settings.get("autoload_window_days", 30),
+        min_sessions=settings.get("autoload_min_sessions", 5),
+        export_dir=get_usage_export_dir(settings)
+    )
+    if profile:
+        eager = profile["eager"].get(MAYA_PLUGIN, [])
+        lazy = profile["lazy"].get(MAYA_PLUGIN, [])
+        print(f"自动加载配置({profile['source']}, {profile['sessions']}次会话): "
+              f"立即加载 {', '.join(eager) or '无'}; 按需加载 {', '.join(lazy) or '无'}")
+    return profile
 
-def load_character_plugins():
-    """加载角色相关的Maya插件"""
+def setup_plugin_path():
+    """把Nexus的Maya插件目录加入MAYA_PLUG_IN_PATH"""
     # 获取Nexus主目录
     nexus_home = os.environ.get("NEXUS_HOME", os.path.dirname(os.path.dirname(__file__)))
     
@@ -75,44 +284,93 @@ def load_character_plugins():
         if plugins_dir not in plugin_path:
             os.environ["MAYA_PLUG_IN_PATH"] = plugins_dir + os.pathsep + plugin_path
     
-    # 加载常用插件
-    character_plugins = [
-        "mgear_solvers.mll",  # 假设使用mgear作为绑定工具
-        "matrixNodes.mll"     # 矩阵节点插件
-    ]
+    return True
+
+def load_character_plugin(plugin):
+    """加载单个Maya插件"""
+    try:
+        if not cmds.pluginInfo(plugin, query=True, loaded=True):
+            cmds.loadPlugin(plugin)
+            print(f"已加载插件: {plugin}")
+        return True
+    except:
+        print(f"警告: 无法加载插件 {plugin}")
+        return False
+
+def preload_module(module_name):
+    """预先导入工具模块，避免第一次点击菜单时等待"""
+    importlib.import_module(module_name)
+    return True
+
+def load_character_plugins():
+    """加载角色相关的Maya插件"""
+    setup_plugin_path()
     
-    for plugin in character_plugins:
-        try:
-            if not cmds.pluginInfo(plugin, query=True, loaded=True):
-                cmds.loadPlugin(plugin)
-                print(f"已加载插件: {plugin}")
-        except:
-            print(f"警告: 无法加载插件 {plugin}")
+    # 加载常用插件
+    for plugin in CHARACTER_PLUGINS:
+        load_character_plugin(plugin)
     
     return True
 
-def initialize():
-    """初始化角色环境"""
+def print_welcome():
+    """打印欢迎信息"""
+    print("=" * 50)
+    print("欢迎使用Nexus Maya角色环境")
+    print("版本: 1.0.0")
+    print("=" * 50)
+
+def initialize(deferred=True):
+    """
+    初始化角色环境
+    
+    路径设置和菜单（菜单命令在点击时才导入工具模块）立即完成，
+    按使用统计经常用到的插件和模块在Maya空闲时逐个加载，其余在第一次使用相关菜单时加载。
+    
+    Args:
+        deferred: 是否延迟执行耗时阶段，批处理模式下总是同步执行
+        
+    Returns:
+        StartupScheduler: 启动调度器，失败时返回None
+    """
     try:
-        # 设置环境
-        setup_environment()
+        scheduler = StartupScheduler()
         
-        # 加载插件
-        load_character_plugins()
+        # 设置环境
+        scheduler.run_now("设置路径", setup_environment)
+        scheduler.run_now("设置插件路径", setup_plugin_path)
         
         # 创建菜单
-        create_character_menu()
+        if not cmds.about(batch=True):
+            scheduler.run_now("创建菜单", create_character_menu)
         
-        # 打印欢迎信息
-        print("=" * 50)
-        print("欢迎使用Nexus Maya角色环境")
-        print("版本: 1.0.0")
-        print("=" * 50)
+        # 按使用统计决定启动时加载的插件和预导入的模块，没有统计时全部加载
+        scheduler.run_now("使用统计", start_usage_session)
+        profile = scheduler.run_now("自动加载配置", get_autoload_profile)
+        if profile:
+            eager_plugins = profile["eager"].get(MAYA_PLUGIN, [])
+            eager_tools = profile["eager"].get(MENU_TOOL, [])
+        else:
+            eager_plugins = CHARACTER_PLUGINS
+            eager_tools = list(TOOLS_BY_NAME)
         
-        return True
+        # 加载插件和预导入模块
+        for plugin in CHARACTER_PLUGINS:
+            if plugin in eager_plugins:
+                scheduler.defer(f"加载插件 {plugin}", load_character_plugin, plugin)
+        preload_tools = [TOOLS_BY_NAME[name] for name in eager_tools if name in TOOLS_BY_NAME]
+        for module_name in dict.fromkeys(tool["module"] for tool in preload_tools if tool.get("preload", True)):
+            scheduler.defer(f"导入模块 {module_name}", preload_module, module_name)
+        scheduler.defer("欢迎信息", print_welcome)
+        
+        if deferred and not cmds.about(batch=True):
+            scheduler.start()
+        else:
+            scheduler.run_all()
+        
+        return scheduler
     except Exception as e:
         print(f"初始化角色环境失败: {str(e)}")
-        return False
+        return None
 
 # 当脚本被直接执行时调用初始化
 if __name__ == "__main__":
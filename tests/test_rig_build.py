@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+绑定构建图测试 - 增量构建和删除步骤
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "scripts", "maya", "character"))
+
+from rig_build import BuildCache, RigBuildGraph, RigStep, register_step  # noqa: E402
+
+# 模拟的场景: 节点名称集合
+SCENE = set()
+
+
+@register_step
+class NodeStep(RigStep):
+    """创建名为 <prefix><name> 的节点"""
+
+    step_type = "test_node"
+    outputs = ("nodes",)
+
+    def run(self, inputs):
+        node = self.params.get("prefix", "") + self.name
+        SCENE.add(node)
+        return {"nodes": [node]}
+
+    def clean(self, outputs):
+        SCENE.difference_update(outputs.get("nodes", []))
+
+    def is_valid(self, outputs):
+        return all(node in SCENE for node in outputs.get("nodes", []))
+
+
+@register_step
+class ChildStep(NodeStep):
+    """依赖上游节点的步骤"""
+
+    step_type = "test_child"
+    inputs = ("parent",)
+
+
+def _graph(*steps):
+    return RigBuildGraph.from_description({"name": "test", "steps": list(steps)})
+
+
+def test_cached_steps_are_skipped():
+    SCENE.clear()
+    cache = BuildCache()
+    graph = _graph({"name": "root", "type": "test_node"},
+                   {"name": "arm", "type": "test_child", "inputs": {"parent": "root.nodes"}})
+    graph.build(cache, progress=lambda message: None)
+    report = graph.build(cache, progress=lambda message: None)
+    assert [item["status"] for item in report] == ["cached", "cached"]
+    assert SCENE == {"root", "arm"}
+
+
+def test_removed_step_outputs_are_cleaned():
+    SCENE.clear()
+    cache = BuildCache()
+    _graph({"name": "root", "type": "test_node"},
+           {"name": "arm", "type": "test_child", "prefix": "l_", "inputs": {"parent": "root.nodes"}}
+           ).build(cache, progress=lambda message: None)
+    assert SCENE == {"root", "l_arm"}
+
+    # 第二次构建时删除了arm步骤: 它创建的节点也要删除
+    report = _graph({"name": "root", "type": "test_node"}).build(cache, progress=lambda message: None)
+    assert {"step": "arm", "status": "removed"}.items() <= report[0].items()
+    assert SCENE == {"root"}
+    assert set(cache.entries) == {"root"}
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+蒙皮权重运算测试 - 权重清理的结果和大矩阵上的耗时
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "scripts", "maya", "character"))
+
+from skin_weight_ops import clean_weight_matrix  # noqa: E402
+
+
+def _reference(weights, prune_threshold=0.01, max_influences=4):
+    """逐个顶点排序的清理结果"""
+    result = np.zeros_like(weights)
+    for i, row in enumerate(weights):
+        order = np.argsort(-row, kind="stable")
+        kept = [j for j in order if row[j] >= prune_threshold]
+        if max_influences:
+            kept = kept[:max_influences]
+        if not kept and row.sum() > 0:
+            kept = [order[0]]
+            result[i, order[0]] = 1.0
+            continue
+        result[i, kept] = row[kept]
+        total = result[i].sum()
+        if total > 0:
+            result[i] /= total
+    return result
+
+
+def _best_time(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def test_clean_limits_influences_and_normalizes():
+    rng = np.random.default_rng(0)
+    weights = rng.random((500, 12)) ** 3
+    weights[rng.random(weights.shape) < 0.5] = 0.0
+    result, count = clean_weight_matrix(weights)
+
+    np.testing.assert_allclose(result, _reference(weights), rtol=0, atol=1e-12)
+    assert (np.count_nonzero(result, axis=1) <= 4).all()
+    assert count == np.count_nonzero(weights.sum(axis=1) > 0)
+
+
+def test_clean_equal_weights():
+    # 相等的权重不能使保留的数量超过限制
+    weights = np.array([[0.2, 0.2, 0.2, 0.2, 0.2, 0.0],
+                        [0.1, 0.3, 0.1, 0.1, 0.3, 0.1]])
+    result, _ = clean_weight_matrix(weights)
+    assert (np.count_nonzero(result, axis=1) == 4).all()
+    np.testing.assert_allclose(result.sum(axis=1), 1.0)
+    assert result[1, 1] == result[1, 4] == result.max()
+
+
+def test_clean_keeps_largest_when_all_pruned():
+    weights = np.array([[0.004, 0.006, 0.002],
+                        [0.0, 0.0, 0.0],
+                        [0.5, 0.5, 0.0]])
+    result, count = clean_weight_matrix(weights)
+    np.testing.assert_array_equal(result, [[0.0, 1.0, 0.0], [0.0, 0.0, 0.0], [0.5, 0.5, 0.0]])
+    assert count == 1
+
+
+def test_clean_large_matrix_speed():
+    # 清理的耗时应该只比一次部分排序多几次逐元素运算
+    rng = np.random.default_rng(1)
+    weights = rng.random((200000, 60))
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    partition_time = _best_time(lambda: np.partition(weights, 56, axis=1))
+    clean_time = _best_time(lambda: clean_weight_matrix(weights))
+    assert clean_time < partition_time * 4.0, (clean_time, partition_time)
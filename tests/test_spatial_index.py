@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+表面最近点索引测试 - 与逐个三角形计算的结果比较
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "scripts", "maya", "character"))
+
+from spatial_index import SurfaceIndex, closest_point_on_triangles  # noqa: E402
+
+
+def _bumpy_grid(size=40, seed=0):
+    """起伏不平、三角形大小不一的网格"""
+    rng = np.random.default_rng(seed)
+    axis = np.cumsum(rng.uniform(0.2, 1.8, size))
+    x, z = np.meshgrid(axis, axis, indexing="ij")
+    y = rng.normal(0.0, 0.6, x.shape)
+    points = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1)
+
+    ids = np.arange(size * size).reshape(size, size)
+    a, b = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel()
+    c, d = ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+    triangles = np.concatenate([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)])
+    return points, triangles
+
+
+def _brute_force(points, triangles, targets):
+    """逐个三角形计算每个目标点的最近距离"""
+    a, b, c = (points[triangles[:, i]] for i in range(3))
+    distances = np.empty(len(targets))
+    for i, target in enumerate(targets):
+        query = np.repeat(target[None], len(triangles), axis=0)
+        bary = closest_point_on_triangles(query, a, b, c)
+        closest = bary[:, 0:1] * a + bary[:, 1:2] * b + bary[:, 2:3] * c
+        distances[i] = np.linalg.norm(query - closest, axis=1).min()
+    return distances
+
+
+def _check(points, triangles, targets):
+    vertices, bary, distances = SurfaceIndex(points, triangles).query(targets)
+    expected = _brute_force(points, triangles, targets)
+    np.testing.assert_allclose(distances, expected, rtol=0, atol=1e-9)
+
+    # 返回的三角形和重心坐标给出的点与距离一致
+    closest = np.einsum("ij,ijk->ik", bary, points[vertices])
+    np.testing.assert_allclose(np.linalg.norm(targets - closest, axis=1), distances, rtol=0, atol=1e-9)
+
+
+def test_surface_index_matches_brute_force():
+    points, triangles = _bumpy_grid()
+    rng = np.random.default_rng(1)
+    lower, upper = points.min(axis=0), points.max(axis=0)
+    targets = rng.uniform(lower - 1.0, upper + 1.0, (2000, 3))
+    _check(points, triangles, targets)
+
+
+def test_surface_index_far_targets():
+    points, triangles = _bumpy_grid(size=20)
+    rng = np.random.default_rng(2)
+    targets = rng.normal(0.0, 200.0, (300, 3))
+    _check(points, triangles, targets)
+
+
+def test_surface_index_long_triangles():
+    # 小三角形组成的网格加上一个很大的三角形
+    points, triangles = _bumpy_grid(size=20)
+    extra = np.array([[-50.0, -5.0, -50.0], [80.0, -5.0, -50.0], [-50.0, -5.0, 80.0]])
+    triangles = np.concatenate([triangles, [np.arange(3) + len(points)]])
+    points = np.concatenate([points, extra])
+    rng = np.random.default_rng(3)
+    targets = rng.uniform(-20.0, 40.0, (1000, 3))
+    _check(points, triangles, targets)